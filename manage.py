@@ -10,8 +10,12 @@ import logging
 import os
 import tempfile
 import json
+from contextlib import contextmanager
 logging.basicConfig(level=logging.INFO, format='[%(levelname)s] %(message)s')
 
+# Commands that call OpenAI or GitHub; they check their credentials up front, the rest run without them
+CREDENTIALED_COMMANDS = {"new-trivia", "daily", "fill-queue", "process-answers", "update-readme", "render-site", "serve-webhooks"}
+
 def print_db():
     from src.core.database import TriviaDatabase
     print("[PRINT-DB] Decrypting and loading database...")
@@ -37,8 +41,12 @@ def update_db(from_json=None):
                     with open(json_file) as f:
                         data = json.load(f)
                         logging.info(f"[UPDATE-DB] Loaded data from {json_file}: {type(data)}")
+                        # Detect and append a job's run log (see write_run_log)
+                        if isinstance(data, dict) and "answer_events" in data and "model_usage" in data:
+                            db.apply_run_log(data)
+                            logging.info(f"[UPDATE-DB] Appended {len(data['answer_events'])} answer events and {len(data['model_usage'])} model calls from {json_file}")
                         # Detect and update trivia
-                        if isinstance(data, dict) and "question" in data and "options" in data:
+                        elif isinstance(data, dict) and "question" in data and "options" in data:
                             trivia_data = db.get_trivia_questions()
                             trivia_data[data["timestamp"]] = data
                             db.update_trivia_questions(trivia_data)
@@ -71,6 +79,26 @@ def update_db(from_json=None):
     except Exception as e:
         logging.error("[manage.py] [update_db] Error updating DB: %s", e)
 
+@contextmanager
+def write_run_log(log_out=None):
+    """
+    Write the answer events, model usage and processed issues journal the command adds to log_out.
+    Workflow jobs run on throwaway copies of the database; update-db --from-json merges their logs.
+    """
+    if not log_out:
+        yield
+        return
+    from src.core.database import TriviaDatabase
+    db = TriviaDatabase()
+    marks = db.get_run_marks()
+    try:
+        yield
+    finally:
+        run_log = db.get_run_log(marks)
+        with open(log_out, 'w') as f:
+            json.dump(run_log, f)
+        logging.info(f"[RUN-LOG] Wrote {len(run_log['answer_events'])} answer events and {len(run_log['model_usage'])} model calls to {log_out}")
+
 def import_db():
     from src.core.database import TriviaDatabase
     print("[IMPORT-DB] Importing and decrypting database...")
@@ -91,7 +119,7 @@ def export_db():
 
 def new_trivia(json_out=None):
     try:
-        from src.core.daily_trivia import generate_unique_trivia, load_trivia_data, save_trivia_data, get_utc_today
+        from src.core.daily_trivia import next_trivia_question, load_trivia_data, save_trivia_data, get_utc_today, TriviaGenerationError
         from datetime import datetime
         trivia_data = load_trivia_data()
         today = get_utc_today()
@@ -117,10 +145,14 @@ def new_trivia(json_out=None):
                     json.dump(current_trivia, f)
             return
         logging.info("[DEBUG] No trivia for today found, will generate new.")
-        logging.info("[NEW-TRIVIA] Generating new trivia (with retry if identical)...")
+        logging.info("[NEW-TRIVIA] Taking the next trivia from the queue (generating one if it is empty)...")
         new_trivia = None
         for attempt in range(3):
-            new_trivia = generate_unique_trivia(current_trivia, max_tries=1)
+            try:
+                new_trivia = next_trivia_question(current_trivia)
+            except TriviaGenerationError as e:
+                logging.error("[manage.py] [new_trivia] Trivia queue is empty and generation failed: %s", e)
+                sys.exit(1)
             if not current_trivia or new_trivia['question'] != current_trivia.get('question'):
                 break
             else:
@@ -141,6 +173,39 @@ def new_trivia(json_out=None):
     except Exception as e:
         logging.error("[manage.py] [new_trivia] Error generating new trivia: %s", e)
 
+def daily(deadline=None, call_timeout=None):
+    try:
+        from src.core.daily_run import run_daily, TriviaGenerationError
+        from src.core.config import DAILY_RUN_DEADLINE, DAILY_CALL_TIMEOUT
+        deadline = deadline or DAILY_RUN_DEADLINE
+        call_timeout = call_timeout or DAILY_CALL_TIMEOUT
+        print(f"[DAILY] Fetching today's trivia, fact and Wikipedia link concurrently (deadline {deadline}s, {call_timeout}s per call)...")
+        try:
+            summary = run_daily(deadline=deadline, call_timeout=call_timeout)
+        except TriviaGenerationError as e:
+            logging.error("[manage.py] [daily] %s", e)
+            sys.exit(1)
+        print(f"[DAILY] Trivia: {summary['trivia']}, fact: {summary['fact']}, Wikipedia link: {summary['link']} ({summary['seconds']:.1f}s)")
+    except Exception as e:
+        logging.error("[manage.py] [daily] Error running daily update: %s", e)
+        sys.exit(1)
+
+def fill_queue(days=None, concurrency=None):
+    try:
+        from src.core.daily_trivia import fill_trivia_queue
+        from src.core.config import TRIVIA_QUEUE_DAYS, TRIVIA_QUEUE_CONCURRENCY
+        days = days or TRIVIA_QUEUE_DAYS
+        concurrency = concurrency or TRIVIA_QUEUE_CONCURRENCY
+        print(f"[FILL-QUEUE] Topping the trivia queue up to {days} questions ({concurrency} concurrent requests)...")
+        summary = fill_trivia_queue(days=days, concurrency=concurrency)
+        print(f"[FILL-QUEUE] Added {summary['added']} of {summary['requested']} requested questions "
+              f"({summary['rejected']} rejected, {summary['failed']} failed); {summary['queued_after']} queued")
+        if summary['requested'] and not summary['added']:
+            sys.exit(1)
+    except Exception as e:
+        logging.error("[manage.py] [fill_queue] Error filling trivia queue: %s", e)
+        sys.exit(1)
+
 def new_fact(json_out=None):
     try:
         from src.core.daily_facts import get_todays_fact, load_daily_facts, save_daily_facts
@@ -163,10 +228,11 @@ def new_fact(json_out=None):
     except Exception as e:
         logging.error("[manage.py] [new_fact] Error generating new fact: %s", e)
 
-def process_answers(json_out=None):
+def process_answers(json_out=None, workers=None):
     try:
         from src.core.process_answers import process_answers as process, load_leaderboard
-        process()
+        from src.core.config import PROCESS_ANSWERS_WORKERS
+        process(workers=workers or PROCESS_ANSWERS_WORKERS)
         if json_out:
             leaderboard = load_leaderboard()
             with open(json_out, 'w') as f:
@@ -174,16 +240,28 @@ def process_answers(json_out=None):
     except Exception as e:
         logging.error("[manage.py] [process_answers] Error processing answers: %s", e)
 
-def update_readme():
+def update_readme(show_diff=False):
     try:
         from src.core.daily_trivia import load_trivia_data, load_leaderboard, update_readme
         trivia_data = load_trivia_data()
         leaderboard = load_leaderboard()
-        update_readme(trivia_data, leaderboard)
+        update_readme(trivia_data, leaderboard, show_diff=show_diff)
         # Do not print '[UPDATE-README] README updated.' here; the real function already prints the correct message.
     except Exception as e:
         logging.error("[manage.py] [update_readme] Error updating README: %s", e)
 
+def render_site(targets=None, show_diff=False):
+    try:
+        from src.core.daily_trivia import load_trivia_data, load_leaderboard
+        from src.core.site_render import render_site as render, RENDER_TARGETS
+        written = render(load_trivia_data(), load_leaderboard(), targets=targets or RENDER_TARGETS, show_diff=show_diff)
+        if written is None:
+            sys.exit(1)
+        print(f"[RENDER-SITE] {len(written)} file(s) written.")
+    except Exception as e:
+        logging.error("[manage.py] [render_site] Error rendering outputs: %s", e)
+        sys.exit(1)
+
 def encrypt_db():
     try:
         from src.core.database import TriviaDatabase
@@ -206,13 +284,208 @@ def encrypt_db():
     except Exception as e:
         logging.error("[manage.py] [encrypt_db] Error encrypting DB: %s", e)
 
-def prune_db(trivia_days=90, facts_days=90, leaderboard_days=180):
+def prune_db(trivia_days=90, facts_days=90, leaderboard_days=180, journal_days=30, usage_days=180):
     from src.core.database import TriviaDatabase
     db = TriviaDatabase()
     db.prune_trivia_questions(days=trivia_days)
     db.prune_daily_facts(days=facts_days)
     db.prune_leaderboard(min_last_answered_days=leaderboard_days)
-    logging.info(f"[manage.py] [prune_db] Pruned trivia (> {trivia_days}d), facts (> {facts_days}d), leaderboard (> {leaderboard_days}d)")
+    db.prune_processed_issues(days=journal_days)
+    db.prune_model_usage(days=usage_days)
+    logging.info(f"[manage.py] [prune_db] Pruned trivia (> {trivia_days}d), facts (> {facts_days}d), leaderboard (> {leaderboard_days}d), processed issues (> {journal_days}d), model usage (> {usage_days}d)")
+
+def serve_webhooks(host, port, workers, batch_size, flush_interval):
+    try:
+        from src.core.webhook_server import serve_webhooks as serve
+        serve(host=host, port=port, workers=workers, batch_size=batch_size, flush_interval=flush_interval)
+    except Exception as e:
+        logging.error("[manage.py] [serve_webhooks] Error running webhook server: %s", e)
+        sys.exit(1)
+
+def rebuild_leaderboard(full=False, dry_run=False, chunk_size=5000, force=False):
+    try:
+        from src.core.leaderboard_events import rebuild_leaderboard as rebuild
+        print(f"[REBUILD-LEADERBOARD] Replaying answer events{' from the base checkpoint' if full else ''}...")
+        summary = rebuild(full=full, dry_run=dry_run, chunk_size=chunk_size, force=force)
+        print(f"[REBUILD-LEADERBOARD] Replayed {summary['events']} events (#{summary['from_event_id']} to #{summary['to_event_id']}) under rules v{summary['rules_version']}")
+        print(f"[REBUILD-LEADERBOARD] {summary['changed_users']} of {summary['users']} users changed{' (dry run, nothing written)' if dry_run else ''}")
+        if summary['lost_users']:
+            print(f"[REBUILD-LEADERBOARD] {summary['lost_users']} current user(s) dropped or lost answers in the replay")
+        print("[REBUILD-LEADERBOARD] Done.")
+    except Exception as e:
+        logging.error("[manage.py] [rebuild_leaderboard] Error rebuilding leaderboard: %s", e)
+        sys.exit(1)
+
+def openai_cache(prune=False, clear=False):
+    try:
+        from src.core.openai_cache import ResponseCache
+        from src.core.config import OPENAI_CACHE_PATH, OPENAI_CACHE_MODE, OPENAI_CACHE_TTL
+        # Opened in record mode whatever OPENAI_CACHE_MODE says, so the file can be inspected and pruned
+        cache = ResponseCache(path=OPENAI_CACHE_PATH, mode='record')
+        if prune or clear:
+            removed = cache.prune(ttl=-1 if clear else OPENAI_CACHE_TTL)
+            print(f"[OPENAI-CACHE] Removed {removed} {'responses' if clear else 'expired responses'}.")
+        print(f"[OPENAI-CACHE] {cache.count()} recorded responses in {OPENAI_CACHE_PATH} (mode: {OPENAI_CACHE_MODE}, TTL: {OPENAI_CACHE_TTL}s)")
+    except Exception as e:
+        logging.error("[manage.py] [openai_cache] Error maintaining OpenAI cache: %s", e)
+        sys.exit(1)
+
+def model_usage(days=None, as_json=False):
+    try:
+        from src.core.model_usage import usage_report
+        from src.core.config import MODEL_USAGE_REPORT_DAYS
+        days = MODEL_USAGE_REPORT_DAYS if days is None else days
+        report = usage_report(days=days)
+        if as_json:
+            print(json.dumps(report, indent=2))
+            return
+        print(f"[MODEL-USAGE] Chat completions over the last {days} days" if days else "[MODEL-USAGE] All recorded chat completions")
+        if not report:
+            print("[MODEL-USAGE] No calls recorded.")
+        def fmt(summary, unit=""):
+            return " ".join(f"{name}={value:.0f}{unit}" if value is not None else f"{name}=-" for name, value in summary.items())
+        for call_site, stats in report.items():
+            cost = f"${stats['cost_usd']:.4f}" if stats['cost_usd'] is not None else "unknown"
+            print(f"[MODEL-USAGE] {call_site}: {stats['calls']} calls ({stats['cached']} cached, {stats['errors']} failed), "
+                  f"{stats['retries']} retries over {stats['retried_calls']} calls, models {stats['models']}")
+            print(f"[MODEL-USAGE]   latency      {fmt(stats['latency_ms'], 'ms')}")
+            print(f"[MODEL-USAGE]   prompt       {fmt(stats['prompt_tokens'])} tokens")
+            print(f"[MODEL-USAGE]   completion   {fmt(stats['completion_tokens'])} tokens")
+            print(f"[MODEL-USAGE]   total        {stats['total_tokens']} tokens, estimated cost {cost}")
+    except Exception as e:
+        logging.error("[manage.py] [model_usage] Error reporting model usage: %s", e)
+        sys.exit(1)
+
+def run_all(names=None, steps=None, workers=None, list_only=False):
+    try:
+        from src.core.tenants import load_tenants, missing_credentials, run_all as run_tenants, RUN_ALL_STEPS
+        from src.core.config import TENANTS_FILE, RUN_ALL_WORKERS
+        tenants = load_tenants(TENANTS_FILE)
+        if names:
+            unknown = set(names) - {tenant.name for tenant in tenants}
+            if unknown:
+                raise ValueError(f"Unknown tenant(s) {', '.join(sorted(unknown))} in {TENANTS_FILE}")
+            tenants = [tenant for tenant in tenants if tenant.name in names]
+        if list_only:
+            for tenant in tenants:
+                print(f"[RUN-ALL] {tenant.name}: {tenant.github_username}/{tenant.github_repo}, db {tenant.db_path}, outputs {tenant.output_dir}")
+            return
+        # Steps always run in pipeline order, whatever order they were given in
+        steps = [step for step in RUN_ALL_STEPS if step in (steps or RUN_ALL_STEPS)]
+        missing = {tenant.name: missing_credentials(tenant, steps) for tenant in tenants}
+        missing = {name: variables for name, variables in missing.items() if variables}
+        if missing:
+            for name, variables in missing.items():
+                logging.error("[manage.py] [run_all] Tenant %s is missing %s", name, ", ".join(variables))
+            sys.exit(1)
+        workers = RUN_ALL_WORKERS if workers is None else workers
+        print(f"[RUN-ALL] Running {', '.join(steps)} for {len(tenants)} tenant(s), {workers} at a time...")
+        results = run_tenants(tenants, steps, workers)
+        for result in results:
+            detail = result['error'] or ", ".join(f"{step} {seconds:.1f}s" for step, seconds in result['steps'].items())
+            print(f"[RUN-ALL] {result['tenant']}: {result['status']} in {result['seconds']:.1f}s ({detail})")
+        failed = [result['tenant'] for result in results if result['status'] != 'ok']
+        if failed:
+            logging.error("[manage.py] [run_all] %s of %s tenant(s) failed: %s", len(failed), len(results), ", ".join(failed))
+            sys.exit(1)
+    except Exception as e:
+        logging.error("[manage.py] [run_all] Error running tenants: %s", e)
+        sys.exit(1)
+
+def compile_fallback_bank(sample=0):
+    try:
+        from src.core.fallback_bank import compile_bank, FallbackBank
+        from src.core.config import FALLBACK_BANK_SOURCE, FALLBACK_BANK_PATH
+        stats = compile_bank()
+        print(f"[COMPILE-FALLBACK-BANK] {stats['questions']} questions in {stats['categories']} categories "
+              f"from {FALLBACK_BANK_SOURCE} -> {FALLBACK_BANK_PATH} ({stats['bytes']} bytes)")
+        bank = FallbackBank()
+        for category, (_, count) in bank.categories.items():
+            print(f"[COMPILE-FALLBACK-BANK]   {category}: {count}")
+        for _ in range(sample):
+            trivia = bank.sample()
+            print(f"[COMPILE-FALLBACK-BANK] ({trivia['category']}) {trivia['question']} -> {trivia['correct_answer']}) {trivia['options'][trivia['correct_answer']]}")
+    except Exception as e:
+        logging.error("[manage.py] [compile_fallback_bank] Error compiling fallback bank: %s", e)
+        sys.exit(1)
+
+def rebuild_similarity_index():
+    try:
+        from src.core.database import TriviaDatabase
+        print("[REBUILD-SIMILARITY-INDEX] Re-signing trivia questions and daily facts...")
+        indexed = TriviaDatabase().rebuild_similarity_index()
+        print(f"[REBUILD-SIMILARITY-INDEX] Indexed {indexed} items.")
+    except Exception as e:
+        logging.error("[manage.py] [rebuild_similarity_index] Error rebuilding similarity index: %s", e)
+        sys.exit(1)
+
+def find_similar(text, kind='trivia', threshold=None):
+    try:
+        from src.core.database import TriviaDatabase
+        from src.core.similarity_index import find_near_duplicates
+        from src.core.config import SIMILARITY_THRESHOLD
+        db = TriviaDatabase()
+        matches = find_near_duplicates(db, kind, text, threshold=SIMILARITY_THRESHOLD if threshold is None else threshold)
+        texts = db.get_similarity_texts().get(kind, {}) if matches else {}
+        for item_key, similarity in matches:
+            print(f"[FIND-SIMILAR] {similarity:.2f} {item_key}: {texts.get(item_key, '')}")
+        print(f"[FIND-SIMILAR] {len(matches)} similar {kind} item(s) found.")
+    except Exception as e:
+        logging.error("[manage.py] [find_similar] Error searching similarity index: %s", e)
+        sys.exit(1)
+
+def simulate(users=500, issues=1000, days=7, latency_ms=5.0, rate_limit=0.01, seed=42, keep_db=False, workers=1):
+    try:
+        from src.core.simulate import run_simulation
+        print(f"[SIMULATE] {issues} issues from {users} users over {days} days (latency {latency_ms} ms, 429 rate {rate_limit:.1%}, {workers} worker(s))...")
+        result = run_simulation(n_users=users, n_issues=issues, days=days, latency=latency_ms / 1000,
+                                rate_limit=rate_limit, seed=seed, keep_dir=keep_db, workers=workers)
+        github = result['github']
+        print(f"[SIMULATE] process_answers took {result['seconds']:.2f}s ({result['issues_per_second']:,.0f} issues/s)")
+        print(f"[SIMULATE] Outcomes: {result['outcomes']}")
+        print(f"[SIMULATE] Journal: {result['journal_status']}, leaderboard users: {result['leaderboard_users']}")
+        print(f"[SIMULATE] GitHub requests: {github['requests']}, 429s: {github['rate_limited']}, "
+              f"connections: {github['connections']}, malformed: {github['malformed']}")
+        print(f"[SIMULATE] Issues closed: {github['closed']}, left open: {github['open']}, commented twice: {github['issues_commented_twice']}")
+        if result['workdir']:
+            print(f"[SIMULATE] Database kept in {result['workdir']}")
+        print("[SIMULATE] Done.")
+    except Exception as e:
+        logging.error("[manage.py] [simulate] Error running simulation: %s", e)
+        sys.exit(1)
+
+def bench_parser(issues=10000, repeat=5, min_rate=0):
+    from src.core.benchmarks import bench_issue_parser
+    print(f"[BENCH-PARSER] Parsing {issues} issues, best of {repeat} runs...")
+    result = bench_issue_parser(n_issues=issues, repeat=repeat)
+    print(f"[BENCH-PARSER] {result['issues_per_second']:,.0f} issues/s ({result['us_per_issue']:.1f} us/issue, best {result['best_seconds']:.3f}s)")
+    print(f"[BENCH-PARSER] Matched formats: {result['formats']}")
+    if result['issues_per_second'] < min_rate:
+        logging.error("[manage.py] [bench_parser] %.0f issues/s is below the required %s issues/s", result['issues_per_second'], min_rate)
+        sys.exit(1)
+    print("[BENCH-PARSER] Done.")
+
+def bench_scoring(answers=100000, repeat=3):
+    from src.core.benchmarks import bench_batch_scoring
+    print(f"[BENCH-SCORING] Scoring {answers} answers, best of {repeat} runs...")
+    result = bench_batch_scoring(n_answers=answers, repeat=repeat)
+    print(f"[BENCH-SCORING] {result['best_seconds'] * 1000:.1f} ms ({result['answers_per_second']:,.0f} answers/s)")
+    print(f"[BENCH-SCORING] Statuses: {result['statuses']}")
+    print("[BENCH-SCORING] Done.")
+
+def bench_startup(commands=None, repeat=3):
+    try:
+        from src.core.benchmarks import bench_startup as bench
+        print(f"[BENCH-STARTUP] Importing what each command loads, best of {repeat} runs...")
+        result = bench(__file__, commands=commands, repeat=repeat)
+        print(f"[BENCH-STARTUP] Bare interpreter: {result['baseline_ms']:.0f} ms (subtracted below)")
+        for entry in sorted(result['commands'], key=lambda entry: -entry['wall_ms']):
+            heaviest = ", ".join(f"{name} {ms:.0f} ms" for name, ms in entry['heaviest'])
+            print(f"[BENCH-STARTUP] {entry['command']:<26} {entry['wall_ms']:7.0f} ms  (imports {entry['import_ms']:.0f} ms: {heaviest})")
+        print("[BENCH-STARTUP] Done.")
+    except Exception as e:
+        logging.error("[manage.py] [bench_startup] Error benchmarking start-up: %s", e)
+        sys.exit(1)
 
 def main():
     parser = argparse.ArgumentParser(description="Daily Trivia System Management CLI")
@@ -222,11 +495,25 @@ def main():
     subparsers.add_parser("export-db", help="Export and encrypt DB to compressed file")
     new_trivia_parser = subparsers.add_parser("new-trivia", help="Create new daily trivia and validate")
     new_trivia_parser.add_argument('--json-out', type=str, help='Path to output JSON file')
+    new_trivia_parser.add_argument('--log-out', type=str, help='Path to write the rows this run appends, for update-db --from-json')
     new_fact_parser = subparsers.add_parser("new-fact", help="Create new daily fact and validate")
     new_fact_parser.add_argument('--json-out', type=str, help='Path to output JSON file')
+    new_fact_parser.add_argument('--log-out', type=str, help='Path to write the rows this run appends, for update-db --from-json')
+    daily_parser = subparsers.add_parser("daily", help="Fetch today's trivia, fact and yesterday's Wikipedia link concurrently")
+    daily_parser.add_argument("--deadline", type=float, help="Seconds for the whole run (default: DAILY_RUN_DEADLINE)")
+    daily_parser.add_argument("--call-timeout", type=float, help="Seconds for each call, retries included (default: DAILY_CALL_TIMEOUT)")
+    fill_queue_parser = subparsers.add_parser("fill-queue", help="Generate trivia questions ahead of time into the trivia queue")
+    fill_queue_parser.add_argument("--days", type=int, help="Questions to keep queued (default: TRIVIA_QUEUE_DAYS)")
+    fill_queue_parser.add_argument("--concurrency", type=int, help="Concurrent OpenAI requests (default: TRIVIA_QUEUE_CONCURRENCY)")
     process_answers_parser = subparsers.add_parser("process-answers", help="Process answers")
     process_answers_parser.add_argument('--json-out', type=str, help='Path to output JSON file')
-    subparsers.add_parser("update-readme", help="Update README")
+    process_answers_parser.add_argument('--log-out', type=str, help='Path to write the rows this run appends, for update-db --from-json')
+    process_answers_parser.add_argument('--workers', type=int, help='Worker processes to score and close answers in, sharded by username')
+    update_readme_parser = subparsers.add_parser("update-readme", help="Update README")
+    update_readme_parser.add_argument("--diff", action="store_true", help="Log a summary of what changed in the README")
+    render_site_parser = subparsers.add_parser("render-site", help="Render README, leaderboard.json and the HTML pages from one view model")
+    render_site_parser.add_argument("--targets", nargs="+", choices=["readme", "json", "html"], help="Outputs to render (default: all)")
+    render_site_parser.add_argument("--diff", action="store_true", help="Log a summary of what changed in the README")
     subparsers.add_parser("encrypt-db", help="Update and encrypt DB")
     subparsers.add_parser("print-db", help="Print trivia, fact, and leaderboard with logs")
     update_db_parser = subparsers.add_parser("update-db", help="Import, update, and export DB with logs")
@@ -235,20 +522,87 @@ def main():
     prune_parser.add_argument("--trivia-days", type=int, default=90, help="Days to keep trivia questions (default: 90)")
     prune_parser.add_argument("--facts-days", type=int, default=90, help="Days to keep daily facts (default: 90)")
     prune_parser.add_argument("--leaderboard-days", type=int, default=180, help="Days to keep leaderboard entries since last answered (default: 180)")
+    prune_parser.add_argument("--journal-days", type=int, default=30, help="Days to keep closed entries of the processed issues journal (default: 30)")
+    prune_parser.add_argument("--usage-days", type=int, default=180, help="Days to keep model usage records (default: 180)")
+    webhooks_parser = subparsers.add_parser("serve-webhooks", help="Score answers in real time from GitHub issues webhooks")
+    webhooks_parser.add_argument("--host", type=str, default="127.0.0.1", help="Address to listen on (default: 127.0.0.1)")
+    webhooks_parser.add_argument("--port", type=int, default=8080, help="Port to listen on (default: 8080)")
+    webhooks_parser.add_argument("--workers", type=int, default=4, help="Number of scoring worker threads (default: 4)")
+    webhooks_parser.add_argument("--batch-size", type=int, default=20, help="Save the leaderboard after this many answers (default: 20)")
+    webhooks_parser.add_argument("--flush-interval", type=float, default=5, help="Seconds between saves of pending answers (default: 5)")
+    rebuild_parser = subparsers.add_parser("rebuild-leaderboard", help="Recompute the leaderboard by replaying answer events")
+    rebuild_parser.add_argument("--full", action="store_true", help="Replay from the base checkpoint, ignoring checkpoints of the current rules")
+    rebuild_parser.add_argument("--dry-run", action="store_true", help="Report how many users would change without writing")
+    rebuild_parser.add_argument("--chunk-size", type=int, default=5000, help="Events read per batch (default: 5000)")
+    rebuild_parser.add_argument("--force", action="store_true", help="Replace the leaderboard even if the replay drops current users or loses answers")
+    openai_cache_parser = subparsers.add_parser("openai-cache", help="Show or prune the recorded OpenAI responses")
+    openai_cache_parser.add_argument("--prune", action="store_true", help="Remove responses older than OPENAI_CACHE_TTL")
+    openai_cache_parser.add_argument("--clear", action="store_true", help="Remove all recorded responses")
+    model_usage_parser = subparsers.add_parser("model-usage", help="Report tokens, latency percentiles, retries and cost of OpenAI calls per call site")
+    model_usage_parser.add_argument("--days", type=int, help="Days to summarize, 0 for all (default: MODEL_USAGE_REPORT_DAYS)")
+    model_usage_parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    run_all_parser = subparsers.add_parser("run-all", help="Run the daily pipeline for every tenant in the tenant registry")
+    run_all_parser.add_argument("--tenants", nargs="+", help="Tenants to run (default: all in TRIVIA_TENANTS_FILE)")
+    run_all_parser.add_argument("--steps", nargs="+", choices=["import-db", "daily", "process-answers", "render-site", "export-db"],
+                                help="Steps to run for each tenant, in pipeline order (default: all)")
+    run_all_parser.add_argument("--workers", type=int, help="Tenants to run at the same time (default: RUN_ALL_WORKERS)")
+    run_all_parser.add_argument("--list", action="store_true", help="List the registered tenants and exit")
+    compile_bank_parser = subparsers.add_parser("compile-fallback-bank", help="Compile the fallback trivia questions into the memory-mapped bank")
+    compile_bank_parser.add_argument("--sample", type=int, default=0, help="Print this many randomly sampled questions (default: 0)")
+    subparsers.add_parser("rebuild-similarity-index", help="Re-sign all trivia questions and daily facts for near-duplicate checks")
+    find_similar_parser = subparsers.add_parser("find-similar", help="List indexed trivia questions or daily facts similar to a text")
+    find_similar_parser.add_argument("text", help="Question or fact to look up")
+    find_similar_parser.add_argument("--kind", choices=["trivia", "fact"], default="trivia", help="Index to search (default: trivia)")
+    find_similar_parser.add_argument("--threshold", type=float, help="Minimum estimated similarity (default: SIMILARITY_THRESHOLD)")
+    simulate_parser = subparsers.add_parser("simulate", help="Load-test process-answers against an offline GitHub stand-in")
+    simulate_parser.add_argument("--users", type=int, default=500, help="Number of distinct users (default: 500)")
+    simulate_parser.add_argument("--issues", type=int, default=1000, help="Number of open issues (default: 1000)")
+    simulate_parser.add_argument("--days", type=int, default=7, help="Number of trivia days the answers cover (default: 7)")
+    simulate_parser.add_argument("--latency-ms", type=float, default=5.0, help="Mean latency of each GitHub request (default: 5)")
+    simulate_parser.add_argument("--rate-limit", type=float, default=0.01, help="Share of GitHub requests answered with 429 (default: 0.01)")
+    simulate_parser.add_argument("--seed", type=int, default=42, help="Random seed for the generated issues (default: 42)")
+    simulate_parser.add_argument("--keep-db", action="store_true", help="Keep the temporary database for inspection")
+    simulate_parser.add_argument("--workers", type=int, default=1, help="Worker processes for process_answers (default: 1)")
+    bench_parser_parser = subparsers.add_parser("bench-parser", help="Benchmark issue body parsing throughput")
+    bench_parser_parser.add_argument("--issues", type=int, default=10000, help="Number of issues in the corpus (default: 10000)")
+    bench_parser_parser.add_argument("--repeat", type=int, default=5, help="Number of timed runs, best is reported (default: 5)")
+    bench_parser_parser.add_argument("--min-rate", type=float, default=0, help="Exit with an error below this many issues/s, for regression checks on a known machine (default: 0, report only)")
+    bench_scoring_parser = subparsers.add_parser("bench-scoring", help="Benchmark batch answer scoring")
+    bench_scoring_parser.add_argument("--answers", type=int, default=100000, help="Number of answers to score (default: 100000)")
+    bench_scoring_parser.add_argument("--repeat", type=int, default=3, help="Number of timed runs, best is reported (default: 3)")
+    bench_startup_parser = subparsers.add_parser("bench-startup", help="Report the import time each subcommand pays before it starts working")
+    bench_startup_parser.add_argument("commands", nargs="*", help="Subcommands to measure (default: all)")
+    bench_startup_parser.add_argument("--repeat", type=int, default=3, help="Number of timed runs, best is reported (default: 3)")
 
     args = parser.parse_args()
+    if args.command in CREDENTIALED_COMMANDS:
+        from src.core.config import validate_config
+        try:
+            validate_config()
+        except RuntimeError as e:
+            logging.error("[manage.py] [main] %s", e)
+            sys.exit(1)
     if args.command == "import-db":
         import_db()
     elif args.command == "export-db":
         export_db()
     elif args.command == "new-trivia":
-        new_trivia(json_out=getattr(args, 'json_out', None))
+        with write_run_log(args.log_out):
+            new_trivia(json_out=getattr(args, 'json_out', None))
     elif args.command == "new-fact":
-        new_fact(json_out=getattr(args, 'json_out', None))
+        with write_run_log(args.log_out):
+            new_fact(json_out=getattr(args, 'json_out', None))
+    elif args.command == "daily":
+        daily(deadline=args.deadline, call_timeout=args.call_timeout)
+    elif args.command == "fill-queue":
+        fill_queue(days=args.days, concurrency=args.concurrency)
     elif args.command == "process-answers":
-        process_answers(json_out=getattr(args, 'json_out', None))
+        with write_run_log(args.log_out):
+            process_answers(json_out=getattr(args, 'json_out', None), workers=getattr(args, 'workers', None))
     elif args.command == "update-readme":
-        update_readme()
+        update_readme(show_diff=args.diff)
+    elif args.command == "render-site":
+        render_site(targets=args.targets, show_diff=args.diff)
     elif args.command == "encrypt-db":
         encrypt_db()
     elif args.command == "print-db":
@@ -256,7 +610,33 @@ def main():
     elif args.command == "update-db":
         update_db(from_json=getattr(args, 'from_json', None))
     elif args.command == "prune-db":
-        prune_db(trivia_days=args.trivia_days, facts_days=args.facts_days, leaderboard_days=args.leaderboard_days)
+        prune_db(trivia_days=args.trivia_days, facts_days=args.facts_days, leaderboard_days=args.leaderboard_days, journal_days=args.journal_days,
+                 usage_days=args.usage_days)
+    elif args.command == "serve-webhooks":
+        serve_webhooks(host=args.host, port=args.port, workers=args.workers, batch_size=args.batch_size, flush_interval=args.flush_interval)
+    elif args.command == "rebuild-leaderboard":
+        rebuild_leaderboard(full=args.full, dry_run=args.dry_run, chunk_size=args.chunk_size, force=args.force)
+    elif args.command == "openai-cache":
+        openai_cache(prune=args.prune, clear=args.clear)
+    elif args.command == "model-usage":
+        model_usage(days=args.days, as_json=args.json)
+    elif args.command == "run-all":
+        run_all(names=args.tenants, steps=args.steps, workers=args.workers, list_only=args.list)
+    elif args.command == "compile-fallback-bank":
+        compile_fallback_bank(sample=args.sample)
+    elif args.command == "rebuild-similarity-index":
+        rebuild_similarity_index()
+    elif args.command == "find-similar":
+        find_similar(args.text, kind=args.kind, threshold=args.threshold)
+    elif args.command == "simulate":
+        simulate(users=args.users, issues=args.issues, days=args.days, latency_ms=args.latency_ms,
+                 rate_limit=args.rate_limit, seed=args.seed, keep_db=args.keep_db, workers=args.workers)
+    elif args.command == "bench-parser":
+        bench_parser(issues=args.issues, repeat=args.repeat, min_rate=args.min_rate)
+    elif args.command == "bench-scoring":
+        bench_scoring(answers=args.answers, repeat=args.repeat)
+    elif args.command == "bench-startup":
+        bench_startup(commands=args.commands, repeat=args.repeat)
     else:
         parser.print_help()
 
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Batch Scoring Module - Scores a whole day's answers at once, separate from GitHub I/O
+"""
+
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from core.config import GRACE_PERIOD_HOURS, DATE_FORMAT
+from core.points_system import calculate_points_for_streaks, np
+import logging
+logging.basicConfig(level=logging.INFO, format='[%(levelname)s] %(message)s')
+
+# Columnar input: one entry per parsed answer, in issue order
+AnswerColumns = namedtuple('AnswerColumns', ['issue_numbers', 'usernames', 'trivia_dates', 'answers'])
+
+# Columnar output, aligned with the input. status is 'unknown_date', 'duplicate', 'rejected',
+# 'correct' or 'incorrect'; reason explains 'rejected'; streak and points are the user's streak
+# after the answer and the points it earned. changed_users are the users whose rows changed.
+BatchScores = namedtuple('BatchScores', ['status', 'reason', 'streak', 'points', 'changed_users'])
+
+def _answered_recently(user_stats, username, now, grace):
+    """Grace period check of can_user_answer_today, evaluated once per user"""
+    last_answered = user_stats.get('last_answered')
+    if not last_answered:
+        return False
+    try:
+        last_time = datetime.fromisoformat(last_answered)
+        return now - last_time < grace and last_time.date() == now.date()
+    except Exception as e:
+        logging.error("[batch_scoring.py] [_answered_recently] Error parsing last_answered time for %s: %s", username, e)
+        return False
+
+def score_answers(columns, leaderboard, trivia_questions_by_date, now=None):
+    """
+    Score a batch of parsed answers and apply them to the leaderboard.
+
+    Produces the same leaderboard as calling process_answers.score_issue for each answer in
+    order: an answer for a date the user already answered is a duplicate, and once a user has
+    answered in this run every further answer falls inside the grace period. So each user has at
+    most one recorded answer per batch, which lets correctness, streaks and points be computed
+    for the whole batch with vector operations (NumPy when installed).
+    """
+    now = now or datetime.now()
+    now_iso = now.isoformat()
+    utc_today = datetime.now(timezone.utc).strftime(DATE_FORMAT)
+    grace = timedelta(hours=GRACE_PERIOD_HOURS)
+    n = len(columns.issue_numbers)
+
+    # Correctness for every answer with a known trivia date
+    correct_answers = [
+        trivia_questions_by_date[date]['correct_answer'] if date in trivia_questions_by_date else None
+        for date in columns.trivia_dates
+    ]
+    if np is not None:
+        is_correct = (np.array(columns.answers, dtype=object) == np.array(correct_answers, dtype=object)).tolist()
+    else:
+        is_correct = [answer == correct for answer, correct in zip(columns.answers, correct_answers)]
+
+    # Selection pass: dedupe by (user, date) and apply the grace period, O(n).
+    # Per-user state is [on leaderboard, last trivia date, answered within grace period].
+    status = [None] * n
+    reason = [None] * n
+    recorded = []  # indices of answers that change the leaderboard
+    states = {}
+    usernames = columns.usernames
+    trivia_dates = columns.trivia_dates
+    rejected_reason = f"Answered recently (within {GRACE_PERIOD_HOURS} hours grace period)"
+    for i in range(n):
+        if correct_answers[i] is None:
+            status[i] = 'unknown_date'
+            continue
+        username = usernames[i]
+        date = trivia_dates[i]
+        state = states.get(username)
+        if state is None:
+            user_stats = leaderboard.get(username)
+            if user_stats is None:
+                state = states[username] = [False, None, False]
+            else:
+                state = states[username] = [True, user_stats.get('last_trivia_date'),
+                                            _answered_recently(user_stats, username, now, grace)]
+        if state[1] == date:
+            status[i] = 'duplicate'
+        elif state[2]:
+            status[i] = 'rejected'
+            reason[i] = rejected_reason
+        elif is_correct[i]:
+            status[i] = 'correct'
+            state[:] = (True, date, True)
+            recorded.append(i)
+        else:
+            status[i] = 'incorrect'
+            # Wrong answers of users not on the leaderboard are not recorded
+            if state[0]:
+                state[1] = date
+                state[2] = True
+                recorded.append(i)
+
+    # Streak transitions and points for all recorded answers at once
+    streak = [0] * n
+    points = [0] * n
+    streaks_before = [leaderboard[columns.usernames[i]]['current_streak'] if columns.usernames[i] in leaderboard else 0 for i in recorded]
+    recorded_correct = [is_correct[i] for i in recorded]
+    if np is not None:
+        correct_vector = np.array(recorded_correct, dtype=bool)
+        streaks_after = np.where(correct_vector, np.array(streaks_before, dtype=np.int64) + 1, 0)
+        points_earned = np.where(correct_vector, calculate_points_for_streaks(streaks_after), 0).tolist()
+        streaks_after = streaks_after.tolist()
+    else:
+        streaks_after = [before + 1 if correct else 0 for before, correct in zip(streaks_before, recorded_correct)]
+        points_earned = [p if correct else 0 for p, correct in zip(calculate_points_for_streaks(streaks_after), recorded_correct)]
+
+    # Apply to the leaderboard, one recorded answer per user
+    changed_users = set()
+    for k, i in enumerate(recorded):
+        username = columns.usernames[i]
+        correct = recorded_correct[k]
+        user_stats = leaderboard.get(username)
+        if user_stats is None:
+            user_stats = leaderboard[username] = {
+                'current_streak': 0,
+                'total_correct': 0,
+                'total_points': 0,
+                'total_answered': 0,
+                'last_answered': None,
+                'last_trivia_date': None,
+                'answer_history': [],
+                'first_correct_date': None,
+            }
+        user_stats['total_answered'] += 1
+        user_stats['last_answered'] = now_iso
+        user_stats['last_trivia_date'] = columns.trivia_dates[i]
+        user_stats['answer_history'].append({'date': columns.trivia_dates[i], 'timestamp': now_iso, 'correct': correct})
+        if len(user_stats['answer_history']) > 30:
+            user_stats['answer_history'] = user_stats['answer_history'][-30:]
+        user_stats['current_streak'] = streaks_after[k]
+        if correct:
+            user_stats['total_correct'] += 1
+            if not user_stats.get('first_correct_date'):
+                user_stats['first_correct_date'] = utc_today
+            user_stats['total_points'] += points_earned[k]
+        streak[i] = streaks_after[k]
+        points[i] = points_earned[k]
+        changed_users.add(username)
+
+    return BatchScores(status, reason, streak, points, changed_users)
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Benchmarks Module - Micro-benchmarks for hot paths of the daily trivia system
+"""
+
+import ast
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import Counter
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from core.config import ISSUE_TEMPLATE
+from core.issue_parser import AnswerMatcher, parse_issue
+from core.batch_scoring import AnswerColumns, score_answers
+
+BENCH_OPTIONS = {"A": "Jupiter", "B": "Saturn", "C": "Neptune"}
+BENCH_TRIVIA_DATE = "2025-01-01"
+
+# Bodies as GitHub stores them for each format parse_issue accepts
+REAL_ISSUE_BODIES = [
+    ("Trivia Answer A", ISSUE_TEMPLATE.format(answer_text="Jupiter") + f"\n\n**Trivia Date:** {BENCH_TRIVIA_DATE}"),
+    ("Trivia Answer", ISSUE_TEMPLATE.format(answer_text="Saturn") + f"\n\n**Trivia Date:** {BENCH_TRIVIA_DATE}"),
+    ("Trivia Answer", f"**Answer:** C\n\nTrivia Date: {BENCH_TRIVIA_DATE}"),
+    ("Trivia Answer", "I choose B\n\nTrivia Date: 01.01.2025"),
+    ("Trivia Answer B", f"Submitted from my phone on {BENCH_TRIVIA_DATE}"),
+    ("Trivia Answer", "**Answer:** Neptune\r\n**Trivia Date:** 01.01.2025"),
+]
+
+_FILLER_WORDS = ["trivia", "answer", "streak", "leaderboard", "jupiter", "planet", "question", "daily", "points", "bonus"]
+
+def build_issue_corpus(n_issues, seed=42):
+    """Mix of real issue bodies and synthetic ones padded with free text, as issue dicts"""
+    rng = random.Random(seed)
+    corpus = []
+    for number in range(1, n_issues + 1):
+        title, body = rng.choice(REAL_ISSUE_BODIES)
+        if number % 2 == 0:
+            # Synthetic: the same tokens surrounded by user-written noise
+            noise = " ".join(rng.choice(_FILLER_WORDS) for _ in range(rng.randint(20, 200)))
+            body = f"{noise}\n\n{body}\n\n{noise}"
+        corpus.append({"number": number, "title": title, "body": body, "user": {"login": f"user{number % 500}"}})
+    return corpus
+
+def bench_issue_parser(n_issues=10000, repeat=5, seed=42):
+    """Time parse_issue over a corpus; returns best-of-repeat throughput and the matched formats"""
+    corpus = build_issue_corpus(n_issues, seed)
+    matcher = AnswerMatcher({BENCH_TRIVIA_DATE: {"options": BENCH_OPTIONS}})
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for issue in corpus:
+            parse_issue(issue, matcher)
+        timings.append(time.perf_counter() - start)
+    formats = Counter(parse_issue(issue, matcher).answer_format for issue in corpus)
+    best = min(timings)
+    return {
+        "issues": n_issues,
+        "repeat": repeat,
+        "best_seconds": best,
+        "issues_per_second": n_issues / best if best else float("inf"),
+        "us_per_issue": best / n_issues * 1e6,
+        "formats": dict(formats),
+    }
+
+def build_answer_columns(n_answers, n_users=None, n_days=7, seed=42):
+    """Synthetic day of parsed answers plus the matching trivia lookup"""
+    rng = random.Random(seed)
+    n_users = n_users or max(1, n_answers // 2)
+    dates = [f"2025-01-{day:02d}" for day in range(1, n_days + 1)]
+    trivia_questions_by_date = {date: {"correct_answer": rng.choice("ABC")} for date in dates}
+    columns = AnswerColumns(
+        list(range(1, n_answers + 1)),
+        [f"user{rng.randrange(n_users)}" for _ in range(n_answers)],
+        [rng.choice(dates) for _ in range(n_answers)],
+        [rng.choice("ABC") for _ in range(n_answers)],
+    )
+    return columns, trivia_questions_by_date
+
+def bench_batch_scoring(n_answers=100000, repeat=3, seed=42):
+    """Time score_answers on a fresh leaderboard; returns best-of-repeat timing"""
+    columns, trivia_questions_by_date = build_answer_columns(n_answers, seed=seed)
+    timings = []
+    for _ in range(repeat):
+        leaderboard = {}
+        start = time.perf_counter()
+        scores = score_answers(columns, leaderboard, trivia_questions_by_date)
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+    return {
+        "answers": n_answers,
+        "repeat": repeat,
+        "best_seconds": best,
+        "answers_per_second": n_answers / best if best else float("inf"),
+        "statuses": dict(Counter(scores.status)),
+    }
+
+def command_imports(script_path):
+    """
+    {subcommand: [src.core modules its handler imports]} read from manage.py itself, so the benchmark
+    follows the lazy imports of each handler without a second list to keep in sync
+    """
+    with open(script_path) as f:
+        tree = ast.parse(f.read())
+    handler_imports = {}
+    for node in tree.body:
+        if isinstance(node, ast.FunctionDef):
+            handler_imports[node.name] = sorted({child.module for child in ast.walk(node)
+                                                 if isinstance(child, ast.ImportFrom) and (child.module or '').startswith('src.core.')})
+    commands = {}
+    for node in ast.walk(tree):
+        # if/elif args.command == "name": handler(...)
+        if (isinstance(node, ast.If) and isinstance(node.test, ast.Compare) and isinstance(node.test.left, ast.Attribute)
+                and node.test.left.attr == 'command' and isinstance(node.test.comparators[0], ast.Constant)):
+            calls = [child.func.id for child in ast.walk(node.body[0]) if isinstance(child, ast.Call) and isinstance(child.func, ast.Name)]
+            if calls:
+                commands[node.test.comparators[0].value] = handler_imports.get(calls[0], [])
+    return commands
+
+def parse_importtime(stderr):
+    """(total import microseconds, {top-level module: cumulative microseconds}) from -X importtime output"""
+    total, top_level = 0, {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        total += int(self_us)
+        # Nesting is shown by two spaces per level; the first level is what the command itself imported
+        if len(name) - len(name.lstrip()) <= 1:
+            top_level[name.strip()] = int(cumulative_us)
+    return total, top_level
+
+def _time_imports(statements, cwd, env, skip=frozenset()):
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', '; '.join(statements) or 'pass'],
+                            cwd=cwd, env=env, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {statements} failed: {result.stderr.strip().splitlines()[-1]}")
+    total, top_level = parse_importtime(result.stderr)
+    # Modules every interpreter loads at start-up (site, encodings, ...) are not the command's doing
+    return wall, total - sum(top_level[name] for name in skip if name in top_level), \
+        {name: us for name, us in top_level.items() if name not in skip}
+
+def bench_startup(script_path, commands=None, repeat=3, top=3):
+    """
+    Start-up cost of each manage.py subcommand: a fresh interpreter imports manage and then the modules
+    the subcommand's handler imports, under -X importtime. Nothing is run, so no credentials or network
+    are needed. Best of repeat runs; the heaviest top-level imports come from the best run.
+    """
+    script_path = os.path.abspath(script_path)
+    root = os.path.dirname(script_path)
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [os.path.join(root, 'src'), os.environ.get('PYTHONPATH')])))
+    available = command_imports(script_path)
+    results = []
+    baseline_runs = [_time_imports([], root, env) for _ in range(repeat)]
+    baseline = min(run[0] for run in baseline_runs)
+    interpreter_modules = frozenset(baseline_runs[0][2])
+    for command in commands or sorted(available):
+        if command not in available:
+            raise ValueError(f"Unknown command {command!r}")
+        modules = available[command]
+        statements = [f"import {os.path.splitext(os.path.basename(script_path))[0]}"] + [f"import {module}" for module in modules]
+        runs = [_time_imports(statements, root, env, interpreter_modules) for _ in range(repeat)]
+        wall, total, top_level = min(runs, key=lambda run: run[0])
+        results.append({
+            "command": command,
+            "modules": modules,
+            "wall_ms": (wall - baseline) * 1000,
+            "import_ms": total / 1000,
+            "heaviest": [(name, us / 1000) for name, us in sorted(top_level.items(), key=lambda item: -item[1])[:top]],
+        })
+    return {"repeat": repeat, "baseline_ms": baseline * 1000, "commands": results}
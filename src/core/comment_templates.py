@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Comment Templates Module - Pre-rendered answer comments filled in with per-user fields
+"""
+
+import random
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from core.config import CORRECT_MESSAGES, INCORRECT_MESSAGES
+from core.points_system import get_streak_bonus_info, format_points_display
+
+DUPLICATE_ANSWER_COMMENT = "@{username} You have already submitted an answer for today's trivia. Only one answer per user per day is allowed!"
+REJECTED_ANSWER_COMMENT = "@{username} {reason}! Come back tomorrow for a new question."
+
+def _bonus_section(streak):
+    """Streak bonus part of a correct answer comment; it only depends on streak % 6"""
+    bonus_info = get_streak_bonus_info(streak)
+    section = ""
+    if bonus_info['has_3_day_bonus'] or bonus_info['has_6_day_bonus']:
+        section += "\n\n🎉 **Streak Bonuses:**\n"
+        if bonus_info['has_3_day_bonus']:
+            section += "• +1 point for 3-day streak! 🏆\n"
+        if bonus_info['has_6_day_bonus']:
+            section += "• +1 point for 6-day streak! 🏆\n"
+    if bonus_info['next_3_day_bonus'] > 0:
+        section += f"\n🎯 **Next 3-day bonus:** {bonus_info['next_3_day_bonus']} more day(s)\n"
+    if bonus_info['next_6_day_bonus'] > 0:
+        section += f"🎯 **Next 6-day bonus:** {bonus_info['next_6_day_bonus']} more day(s)\n"
+    section += "\nAt 6, 12, 18, ... you get both bonuses for a total of 3 points!"
+    section += "\nCome back tomorrow for another AMAZING question!"
+    return section
+
+# Indexed by streak % 6; a correct answer always has a streak of at least 1
+BONUS_SECTIONS = [_bonus_section(residue or 6) for residue in range(6)]
+POINTS_DISPLAYS = {points: format_points_display(points) for points in range(4)}
+
+class CommentTemplates:
+    """
+    Answer comment templates for one run.
+
+    The parts of a comment that only depend on the trivia, the chosen option and the message
+    variant are rendered once per (trivia date, answer, correct) on first use; each comment then
+    only fills in the username and the user's streak and point totals.
+    """
+
+    def __init__(self, trivia_questions_by_date):
+        self.trivia_questions_by_date = trivia_questions_by_date
+        self._templates = {}
+
+    def _render(self, trivia_date, answer, is_correct):
+        """Static fragments around the per-user fields, one tuple per message variant"""
+        trivia = self.trivia_questions_by_date[trivia_date]
+        chosen = f"{answer}) {trivia['options'][answer]}"
+        if is_correct:
+            return [(
+                f"{message} @",
+                f"\n\nYour answer **{chosen}** is absolutely right!\n\n"
+                f"**Explanation:** {trivia['explanation']}\n\n"
+                "🔥 Your current streak: **",
+                "**\n✅ Total correct answers: **",
+                "**\n🏆 Points earned: **",
+                "**\n💎 Total points: **",
+                "**",
+            ) for message in CORRECT_MESSAGES]
+        correct_answer = trivia['correct_answer']
+        return [(
+            f"{message} @",
+            f"\n\nYour answer **{chosen}** was wrong.\n\n"
+            f"**Correct Answer:** {correct_answer}) {trivia['options'][correct_answer]}\n\n"
+            f"**Explanation:** {trivia['explanation']}\n\n"
+            "💔 Your streak has reset to 0, but don't give up!\n\n"
+            "Come back tomorrow for another chance!",
+        ) for message in INCORRECT_MESSAGES]
+
+    def answer_comment(self, username, trivia_date, answer, is_correct, streak=0, total_correct=0,
+                       points=0, total_points=0, message_index=None):
+        """Comment for a scored answer; message_index picks the message variant (random if None)"""
+        key = (trivia_date, answer, is_correct)
+        templates = self._templates.get(key)
+        if templates is None:
+            templates = self._templates[key] = self._render(trivia_date, answer, is_correct)
+        parts = random.choice(templates) if message_index is None else templates[message_index]
+        if not is_correct:
+            return f"{parts[0]}{username}{parts[1]}"
+        points_display = POINTS_DISPLAYS.get(points) or format_points_display(points)
+        return (f"{parts[0]}{username}{parts[1]}{streak}{parts[2]}{total_correct}{parts[3]}{points_display}"
+                f"{parts[4]}{total_points}{parts[5]}{BONUS_SECTIONS[streak % 6]}")
+
+    def answer_comments(self, rows):
+        """
+        Comments for many scored answers at once, in row order, for batched GitHub backends.
+        rows: iterables of answer_comment arguments
+        (username, trivia_date, answer, is_correct, streak, total_correct, points, total_points).
+        """
+        answer_comment = self.answer_comment
+        return [answer_comment(*row) for row in rows]
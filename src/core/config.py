@@ -7,6 +7,8 @@ OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 GITHUB_TOKEN = os.getenv('GITHUB_TOKEN')
 GITHUB_USERNAME = os.getenv('GITHUB_USERNAME')
 GITHUB_REPO = os.getenv('GITHUB_REPO')
+GITHUB_WEBHOOK_SECRET = os.getenv('GITHUB_WEBHOOK_SECRET')  # Only needed for manage.py serve-webhooks
+GITHUB_API_URL = os.getenv('GITHUB_API_URL', 'https://api.github.com').rstrip('/')  # Overridden by manage.py simulate
 
 # Config validation
 REQUIRED_ENV_VARS = [
@@ -17,12 +19,11 @@ REQUIRED_ENV_VARS = [
 ]
 
 def validate_config():
+    """Fail fast on missing credentials; called by the commands that talk to OpenAI or GitHub, not on import"""
     missing = [name for name, value in REQUIRED_ENV_VARS if not value]
     if missing:
         raise RuntimeError(f"Missing required environment variables: {', '.join(missing)}")
 
-validate_config()
-
 # Daily "Did You Know?" Fact Sources
 DAILY_FACT_SOURCES = {
     "random_facts": "https://uselessfacts.jsph.pl/api/v2/facts/random",
@@ -60,8 +61,8 @@ DAILY_FACTS_FILE = os.path.join(os.path.dirname(__file__), "..", "data", "daily_
 
 # Centralized file paths and flag names
 DB_DIR = os.path.join(os.path.dirname(__file__), "..", "data")
-DB_PATH = os.path.join(DB_DIR, "trivia.db")
-DB_COMPRESSED_PATH = os.path.join(DB_DIR, "trivia_database.db.gz")
+DB_PATH = os.getenv('TRIVIA_DB_PATH') or os.path.join(DB_DIR, "trivia.db")
+DB_COMPRESSED_PATH = os.getenv('TRIVIA_DB_COMPRESSED_PATH') or os.path.join(DB_DIR, "trivia_database.db.gz")
 DB_CHANGED_FLAG = os.path.join(os.path.dirname(__file__), "..", ".db_changed")
 README_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "README.md")
 
@@ -71,14 +72,78 @@ MAX_LEADERBOARD_ENTRIES = 10
 
 # API Request Configuration
 API_TIMEOUT = 10  # seconds
-MAX_RETRIES = 3
+MAX_RETRIES = 3  # Attempts per call, including the first
+RETRY_BASE_WAIT = 2  # seconds, doubled per attempt when the server gives no Retry-After hint
+RETRY_MAX_WAIT = 60  # seconds; longer server hints open the circuit instead of sleeping
+RETRY_JITTER = 1  # seconds of random jitter added to server hints
+CIRCUIT_BREAKER_THRESHOLD = 5  # Consecutive failed attempts before a host is skipped
+CIRCUIT_BREAKER_COOLDOWN = 60  # seconds a tripped host is skipped
+
+# README Update Settings
+README_DIFF_MAX_HUNKS = 3  # Hunks shown by update-readme --diff
+
+# Static Output Settings
+# Rendered next to README.md, i.e. relative to the working directory the workflows run in
+SITE_DIR = os.getenv('SITE_DIR') or "site"
+SITE_PAGE_SIZE = 50  # Leaderboard rows per HTML page
+
+# Wikipedia Link Settings
+WIKIPEDIA_LINK_VALIDATE = True  # Only accept model answers shaped like https://<lang>.wikipedia.org/wiki/<title>
+
+# Trivia Queue Settings
+TRIVIA_QUEUE_DAYS = 14  # Questions fill-queue keeps generated ahead; two weeks covers a missed weekly refill
+TRIVIA_QUEUE_CONCURRENCY = 4  # Concurrent OpenAI requests while filling the queue
+
+# Fallback Question Bank (fallback_bank.py; manage.py compile-fallback-bank)
+FALLBACK_BANK_SOURCE = os.path.join(DB_DIR, "fallback_trivia.jsonl")  # One question per line; append to grow the bank
+FALLBACK_BANK_PATH = os.getenv('FALLBACK_BANK_PATH') or os.path.join(DB_DIR, "fallback_trivia.bank")  # Compiled on first use when missing or stale
+FALLBACK_SAMPLE_TRIES = 8  # Random draws before the sampler scans a category for an unused question
+FALLBACK_ON_OUTAGE = True  # Use a bank question when OpenAI cannot produce one instead of failing the run
+
+# OpenAI Response Cache (openai_cache.py): passthrough, record or replay
+OPENAI_CACHE_MODE = os.getenv('OPENAI_CACHE_MODE', 'passthrough')
+OPENAI_CACHE_PATH = os.getenv('OPENAI_CACHE_PATH') or os.path.join(DB_DIR, "openai_cache.db")
+OPENAI_CACHE_TTL = int(os.getenv('OPENAI_CACHE_TTL', 7 * 24 * 3600))  # seconds a recorded response is reused in record mode; 0 keeps them forever
+
+# Daily Run Settings (manage.py daily)
+DAILY_CALL_TIMEOUT = 60  # seconds for each of trivia, fact and Wikipedia link, retries included
+DAILY_RUN_DEADLINE = 90  # seconds for all of them together; late results fall back or fail the run
+
+# Similarity Index Settings (changing the shingle size, bands or rows needs manage.py rebuild-similarity-index)
+SIMILARITY_SHINGLE_SIZE = 3  # Characters per shingle
+SIMILARITY_BANDS = 20  # LSH bands; more bands find less similar candidates
+SIMILARITY_ROWS = 3  # MinHash values per band; more rows make candidates stricter
+SIMILARITY_THRESHOLD = 0.5  # Estimated similarity at which a question or fact counts as a repeat
 
 # Trivia Generation Settings
 MAX_TOKENS = 400
 TEMPERATURE = 0.8
+DEFAULT_MODEL = "gpt-4o-mini"
+OPENAI_MODEL = os.getenv('OPENAI_MODEL')  # Skips model detection entirely when set
+MODEL_CACHE_PATH = os.getenv('MODEL_CACHE_PATH') or os.path.join(DB_DIR, "model_cache.json")
+MODEL_CACHE_TTL = 7 * 24 * 3600  # seconds a detected model is reused before asking the API again
+
+# Model Usage Settings (manage.py model-usage)
+# USD per million (prompt, completion) tokens, matched by the longest model name prefix; models
+# not listed are reported without a cost. Check https://openai.com/api/pricing/ when tuning.
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-3.5-turbo": (0.50, 1.50),
+}
+MODEL_USAGE_REPORT_DAYS = 30  # Days model-usage summarizes by default
+
+# Multi-Tenant Settings (manage.py run-all, tenants.py)
+TENANTS_FILE = os.getenv('TRIVIA_TENANTS_FILE') or os.path.join(DB_DIR, "tenants.json")
+TENANTS_DIR = os.getenv('TRIVIA_TENANTS_DIR') or os.path.join(DB_DIR, "tenants")  # Default home of each tenant's database, snapshot and outputs
+RUN_ALL_WORKERS = 4  # Tenants run-all works on at the same time
+
 # Auto-detect latest model
 def get_latest_model():
-    """Get the latest available GPT model"""
+    """Get the latest available GPT model, or None if the API could not be asked"""
     try:
         from openai import OpenAI
         client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
@@ -98,14 +163,71 @@ def get_latest_model():
             if model in available_models:
                 return model
         
-        return "gpt-4o-mini"  # Default fallback
-    except:
-        return "gpt-4o-mini"  # Fallback if API call fails
-
-MODEL = get_latest_model()
+        return DEFAULT_MODEL
+    except Exception:
+        return None
+
+_resolved_model = None
+
+def get_model():
+    """
+    Model for chat completions, resolved on first use: OPENAI_MODEL if set, else the model detected
+    by get_latest_model, cached in MODEL_CACHE_PATH for MODEL_CACHE_TTL seconds. A failed detection
+    falls back to DEFAULT_MODEL for this process only, so the next run asks again.
+    """
+    global _resolved_model
+    if _resolved_model:
+        return _resolved_model
+    if OPENAI_MODEL:
+        _resolved_model = OPENAI_MODEL
+        return _resolved_model
+    import json
+    import time
+    try:
+        with open(MODEL_CACHE_PATH, encoding='utf-8') as f:
+            cached = json.load(f)
+        if time.time() - cached['resolved_at'] < MODEL_CACHE_TTL and cached.get('model'):
+            _resolved_model = cached['model']
+            return _resolved_model
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    detected = get_latest_model()
+    if detected is None:
+        _resolved_model = DEFAULT_MODEL
+        return _resolved_model
+    _resolved_model = detected
+    try:
+        os.makedirs(os.path.dirname(MODEL_CACHE_PATH), exist_ok=True)
+        with open(MODEL_CACHE_PATH, 'w', encoding='utf-8') as f:
+            json.dump({'model': detected, 'resolved_at': time.time()}, f)
+    except OSError:
+        pass
+    return _resolved_model
+
+def __getattr__(name):
+    # MODEL stays importable by name but is only resolved when first read; note that
+    # `from core.config import *` does not include it, use get_model() in function bodies
+    if name == 'MODEL':
+        return get_model()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Webhook Server Configuration
+WEBHOOK_HOST = "127.0.0.1"
+WEBHOOK_PORT = 8080
+WEBHOOK_WORKERS = 4
+WEBHOOK_BATCH_SIZE = 20  # Export the database snapshot after this many scored answers (each answer is saved as it is scored)
+WEBHOOK_FLUSH_INTERVAL = 5  # seconds; export after new answers at least this often
+WEBHOOK_MAX_BODY_BYTES = 1024 * 1024
+
+# Leaderboard Rebuild Configuration
+LEADERBOARD_REPLAY_CHUNK_SIZE = 5000  # Answer events read per batch while replaying
+LEADERBOARD_CHECKPOINTS_KEPT = 3  # Newest checkpoints kept per scoring rules version
 
 # GitHub Issue Configuration
 ISSUE_LABEL = "trivia"
+DUPLICATE_ISSUE_LABEL = "duplicate"  # Added to duplicate answers when they are closed
+DUPLICATE_CLOSE_BATCH_SIZE = 25  # Duplicate issues closed per GitHub GraphQL request
+PROCESS_ANSWERS_WORKERS = 1  # Worker processes for process-answers; answers are sharded by username
 ISSUE_TEMPLATE = "🎯 Just click 'Submit new issue' to submit your answer! No need to change anything else - your choice is already in the title! 🚀\n\n**Answer:** {answer_text}"
 
 # Display Configuration
@@ -173,19 +295,25 @@ DAILY_FACT_TEMPLATES = [
 ]
 
 # README Content Templates
-README_TEMPLATE = """
+# The README is rendered as named sections (see readme_sections.py), in this order:
+# header, daily_fact, trivia, leaderboard, yesterday_stats, how_to_play, points_system, footer
+README_HEADER_TEMPLATE = """
 # 🧠 Daily trivia. Unknown facts. One leaderboard.
 
 👋 Welcome to my GitHub! Every day, unlock a surprising fact and test your brain with a fresh trivia challenge — beat the streak, top the leaderboard! 🧠🔥
 
 ---
+"""
 
+DAILY_FACT_SECTION_TEMPLATE = """
 ## 💡 Did You Know? • {today}
 
 {daily_fact}
 
 ---
+"""
 
+TRIVIA_SECTION_TEMPLATE = """
 ## 🎯 Today's Trivia • {today}
 
 **{question}**
@@ -198,19 +326,18 @@ README_TEMPLATE = """
 📝 *Click a button above to submit your answer!*
 
 ---
+"""
 
+LEADERBOARD_SECTION_TEMPLATE = """
 ## 🏆 Leaderboard
 
 | Rank | User | Streak | Points | Total Correct | Day Joined |
 |------|------|--------|--------|---------------|------------|
-{leaderboard_rows}
-{no_participants_row}
+{leaderboard_rows}{no_participants_row}
 ---
+"""
 
-{yesterday_stats}
-{how_to_play}
-{points_system}
-
+README_FOOTER_TEMPLATE = """
 *Questions and facts are automatically generated daily at 12:00 AM UTC!*"""
 
 YESTERDAY_STATS_TEMPLATE = """
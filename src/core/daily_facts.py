@@ -3,7 +3,6 @@
 Daily Facts Module - Fetches interesting daily facts for "Did You Know?" section
 """
 
-import requests
 import random
 import json
 import os
@@ -18,12 +17,11 @@ from core.database import TriviaDatabase
 import logging
 logging.basicConfig(level=logging.INFO, format='[%(levelname)s] %(message)s')
 
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+from core.retry_policy import http_request
+from core.similarity_index import find_near_duplicates
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=2, min=2, max=10), retry=retry_if_exception_type(Exception))
-def requests_get_with_retries(*args, **kwargs):
-    import requests
-    return requests.get(*args, **kwargs)
+def requests_get_with_retries(url, **kwargs):
+    return http_request('get', url, **kwargs)
 
 def fetch_random_fact() -> Optional[str]:
     """Fetch a random fact from uselessfacts API"""
@@ -156,6 +154,30 @@ def save_daily_facts(facts):
     except Exception as e:
         logging.error("[daily_facts.py] [save_daily_facts] Error saving daily facts: %s", e)
 
+def pick_new_fact(facts, db=None) -> Dict[str, str]:
+    """A fact that neither matches nor rewords any previous fact; fetches but does not save it"""
+    db = db or TriviaDatabase()
+    previous_facts = set(fact['fact'] for fact in facts.values())
+    max_api_attempts = 2
+    for attempt in range(max_api_attempts):
+        candidate = get_daily_fact()
+        if candidate["fact"] in previous_facts:
+            continue
+        matches = find_near_duplicates(db, 'fact', candidate["fact"])
+        if matches:
+            logging.info("[daily_facts.py] [pick_new_fact] Fact repeats the fact of %s (similarity %.2f), fetching another", matches[0][0], matches[0][1])
+            continue
+        return candidate
+    local_facts = [
+        {"fact": "Honey never spoils."},
+        {"fact": "Bananas are berries, but strawberries aren't."},
+        {"fact": "A group of flamingos is called a flamboyance."},
+    ]
+    unused_facts = [f for f in local_facts if f["fact"] not in previous_facts]
+    if unused_facts:
+        return random.choice(unused_facts)
+    raise RuntimeError("No unique facts available from API or local fallback.")
+
 def get_todays_fact() -> Dict[str, str]:
     """Get today's fact, generating a new one if needed, ensuring uniqueness. Never override if exists."""
     today = datetime.now().strftime("%Y-%m-%d")
@@ -166,28 +188,9 @@ def get_todays_fact() -> Dict[str, str]:
         return fact
     logging.info("[daily_facts.py] [get_todays_fact] No fact for today, will fetch new.")
     # Only fetch if not exists
-    previous_facts = set(fact['fact'] for fact in facts.values())
-    max_api_attempts = 2
-    new_fact = None
-    for attempt in range(max_api_attempts):
-        candidate = get_daily_fact()
-        if candidate["fact"] not in previous_facts:
-            new_fact = candidate
-            break
-    if not new_fact:
-        local_facts = [
-            {"fact": "Honey never spoils."},
-            {"fact": "Bananas are berries, but strawberries aren't."},
-            {"fact": "A group of flamingos is called a flamboyance."},
-        ]
-        unused_facts = [f for f in local_facts if f["fact"] not in previous_facts]
-        if unused_facts:
-            import random
-            new_fact = random.choice(unused_facts)
-        else:
-            raise RuntimeError("No unique facts available from API or local fallback.")
-    # Save using today as the key and timestamp
     db = TriviaDatabase()
+    new_fact = pick_new_fact(facts, db)
+    # Save using today as the key and timestamp
     db.update_daily_facts({today: {"fact": new_fact["fact"], "timestamp": today}})
     logging.info("[daily_facts.py] [get_todays_fact] Added fact for %s: %s", today, new_fact['fact'])
     return {"fact": new_fact["fact"], "timestamp": today}
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Daily Run Module - Fetches the day's trivia, fact and yesterday's Wikipedia link concurrently
+and saves them together once all have finished or the deadline has passed
+"""
+
+import asyncio
+import contextvars
+import random
+import threading
+import time
+from datetime import datetime
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from core.config import (OPENAI_API_KEY, get_model, MAX_TOKENS, TEMPERATURE, TRIVIA_CATEGORIES,
+                         DAILY_CALL_TIMEOUT, DAILY_RUN_DEADLINE, FALLBACK_ON_OUTAGE)
+from core.database import TriviaDatabase
+from core.daily_facts import pick_new_fact
+from core.daily_trivia import (OPENAI_HOST, TriviaGenerationError, trivia_prompt, parse_trivia_content,
+                               is_repeated_trivia, wikipedia_link_prompt, wikipedia_link_key,
+                               resolve_wikipedia_link, save_trivia_data, create_standalone_trivia)
+from core.retry_policy import async_call_with_retries
+from core.openai_cache import get_cache
+from core.model_usage import async_tracked_completion
+import logging
+logging.basicConfig(level=logging.INFO, format='[%(levelname)s] %(message)s')
+
+def setup_async_openai(timeout=DAILY_CALL_TIMEOUT):
+    """AsyncOpenAI client; like setup_openai its own retries are off in favour of retry_policy"""
+    from openai import AsyncOpenAI
+    if not OPENAI_API_KEY:
+        raise ValueError("OPENAI_API_KEY environment variable is required")
+    return AsyncOpenAI(api_key=OPENAI_API_KEY, max_retries=0, timeout=timeout)
+
+async def async_openai_with_retries(client, call_site='trivia', **kwargs):
+    """openai_with_retries for the async client, behind the same response cache and usage accounting"""
+    return await async_tracked_completion(call_site, kwargs, client.chat.completions.create, lambda create: get_cache().acomplete(
+        lambda: async_call_with_retries(OPENAI_HOST, create, **kwargs), kwargs))
+
+async def generate_trivia_question_async(client, category=None):
+    """generate_trivia_question on the async client; raises TriviaGenerationError on failure"""
+    category = category or random.choice(TRIVIA_CATEGORIES)
+    correct_letter = random.choice(["A", "B", "C"])
+    request = dict(
+        model=get_model(),
+        messages=[{"role": "user", "content": trivia_prompt(category, correct_letter)}],
+        max_tokens=MAX_TOKENS,
+        temperature=TEMPERATURE
+    )
+    try:
+        response = await async_openai_with_retries(client, **request)
+        try:
+            return parse_trivia_content(response.choices[0].message.content)
+        except ValueError:
+            get_cache().discard(request)
+            raise
+    except Exception as e:
+        logging.error("[daily_run.py] [generate_trivia_question_async] Failed to generate trivia: %s", e)
+        raise TriviaGenerationError(f"Failed to generate trivia: {e}") from e
+
+async def next_trivia_async(client, db, current_trivia, max_tries=2):
+    """
+    Like next_trivia_question, but leaves the queue alone: a queued question is removed when it is
+    saved. Returns (trivia, 'queued' or 'generated').
+    """
+    used = {q['question'] for q in db.get_trivia_questions().values()}
+    if current_trivia:
+        used.add(current_trivia.get('question'))
+    for queued in db.get_trivia_queue():
+        if queued['question'] not in used:
+            return queued, 'queued'
+    logging.warning("[daily_run.py] [next_trivia_async] Trivia queue is empty, generating a question now")
+    for attempt in range(max_tries):
+        trivia = await generate_trivia_question_async(client)
+        if not is_repeated_trivia(trivia, current_trivia, db) or attempt == max_tries - 1:
+            return trivia, 'generated'
+
+async def fetch_wikipedia_link_async(client, answer_text, question_text):
+    """fetch_wikipedia_link on the async client; returns the raw answer, or None if the call failed"""
+    try:
+        response = await async_openai_with_retries(
+            client,
+            call_site='wikipedia_link',
+            model=get_model(),
+            messages=[{"role": "user", "content": wikipedia_link_prompt(answer_text, question_text)}],
+            max_tokens=100,
+            temperature=0.2
+        )
+        return response.choices[0].message.content.strip()
+    except Exception as e:
+        logging.error("[daily_run.py] [fetch_wikipedia_link_async] Error getting Wikipedia link from OpenAI: %s", e)
+        return None
+
+def _settle(future, result, error):
+    if not future.done():
+        future.set_exception(error) if error is not None else future.set_result(result)
+
+def run_in_daemon_thread(func, *args):
+    """
+    Future for func(*args) run in a daemon thread. Unlike run_in_executor, a call that outlives the
+    deadline is simply abandoned and does not keep the process alive until it returns.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def target():
+        result = error = None
+        try:
+            result = func(*args)
+        except Exception as e:
+            error = e
+        try:
+            loop.call_soon_threadsafe(_settle, future, result, error)
+        except RuntimeError:
+            pass  # The run is over and its event loop closed
+
+    # The thread keeps the caller's context, e.g. the tenant whose database it writes to
+    threading.Thread(target=contextvars.copy_context().run, args=(target,), daemon=True).start()
+    return future
+
+def plan_daily_run(db, today):
+    """What today's run still has to fetch, from the database as it is now"""
+    history = sorted(db.get_trivia_questions().values(), key=lambda t: t.get('timestamp', ''), reverse=True)
+    latest = history[0] if history else None
+    need_trivia = not latest or latest['timestamp'][:10] != today
+    facts = db.get_daily_facts()
+    # The question whose answer the README reveals today: the newest one from before today
+    previous = history if need_trivia else history[1:]
+    yesterday = previous[0] if previous else None
+    link = None
+    if yesterday and yesterday.get('correct_answer') in yesterday.get('options', {}):
+        answer_text = yesterday['options'][yesterday['correct_answer']]
+        link_key = wikipedia_link_key(answer_text, yesterday['question'])
+        if not db.get_wikipedia_link(link_key):
+            link = {'key': link_key, 'answer': answer_text, 'question': yesterday['question']}
+    return {
+        'current_trivia': latest,
+        'need_trivia': need_trivia,
+        'facts': facts,
+        'need_fact': today not in facts,
+        'link': link,
+    }
+
+async def gather_daily_content(db, plan, deadline=DAILY_RUN_DEADLINE, call_timeout=DAILY_CALL_TIMEOUT):
+    """
+    Run the calls the plan needs concurrently, each limited to call_timeout seconds and all of them
+    to deadline seconds. Returns ({name: result}, {name: error}) for 'trivia', 'fact' and 'link'.
+    """
+    client = None
+    jobs = {}
+    if plan['need_trivia'] or plan['link']:
+        client = setup_async_openai(call_timeout)
+    if plan['need_trivia']:
+        jobs['trivia'] = next_trivia_async(client, db, plan['current_trivia'])
+    if plan['need_fact']:
+        # The fact API goes through requests and the shared retry policy, so it runs in a thread
+        jobs['fact'] = run_in_daemon_thread(pick_new_fact, plan['facts'], db)
+    if plan['link']:
+        jobs['link'] = fetch_wikipedia_link_async(client, plan['link']['answer'], plan['link']['question'])
+    tasks = {name: asyncio.ensure_future(asyncio.wait_for(job, call_timeout)) for name, job in jobs.items()}
+    results, errors = {}, {}
+    try:
+        if tasks:
+            done, pending = await asyncio.wait(tasks.values(), timeout=deadline)
+            for task in pending:
+                task.cancel()
+            for name, task in tasks.items():
+                if task not in done:
+                    errors[name] = f"not finished within the {deadline}s deadline"
+                elif task.exception() is not None:
+                    error = task.exception()
+                    errors[name] = f"timed out after {call_timeout}s" if isinstance(error, asyncio.TimeoutError) else str(error)
+                else:
+                    results[name] = task.result()
+    finally:
+        if client is not None:
+            await client.close()
+    return results, errors
+
+def run_daily(deadline=DAILY_RUN_DEADLINE, call_timeout=DAILY_CALL_TIMEOUT):
+    """
+    Fetch whatever today's trivia, today's fact and yesterday's Wikipedia link still need, concurrently,
+    then write the results in one go. A fact or link that fails is left for the blocking code paths
+    to retry. Without a queued or generated question a fallback bank question is used (unless
+    FALLBACK_ON_OUTAGE is off, when a missing question raises TriviaGenerationError after the rest is saved).
+    Returns a summary dict.
+    """
+    started = time.perf_counter()
+    db = TriviaDatabase()
+    today = datetime.now().strftime('%Y-%m-%d')
+    plan = plan_daily_run(db, today)
+    if plan['need_trivia'] or plan['link']:
+        # The first lookup may ask the API which model to use; do it before the calls start
+        get_model()
+    results, errors = asyncio.run(gather_daily_content(db, plan, deadline, call_timeout))
+    for name, error in errors.items():
+        logging.error("[daily_run.py] [run_daily] %s failed: %s", name, error)
+
+    summary = {'trivia': 'exists', 'fact': 'exists', 'link': 'cached' if plan['link'] is None else 'failed', 'seconds': 0.0}
+    if plan['need_trivia']:
+        summary['trivia'] = 'failed'
+        if not results.get('trivia') and FALLBACK_ON_OUTAGE:
+            # Neither the queue nor OpenAI had a question; the fallback bank needs no network
+            used = db.get_trivia_question_texts()
+            results['trivia'] = create_standalone_trivia(random.choice(TRIVIA_CATEGORIES), used), 'fallback'
+        if results.get('trivia'):
+            trivia, source = results['trivia']
+            trivia = dict(trivia, timestamp=datetime.now().isoformat())
+            save_trivia_data({"current": trivia, "history": []})
+            summary['trivia'] = source
+            logging.info("[daily_run.py] [run_daily] Added %s trivia for %s: %s", source, today, trivia['question'])
+    if plan['need_fact']:
+        summary['fact'] = 'failed'
+        if results.get('fact'):
+            db.update_daily_facts({today: {"fact": results['fact']["fact"], "timestamp": today}})
+            summary['fact'] = 'new'
+            logging.info("[daily_run.py] [run_daily] Added fact for %s: %s", today, results['fact']['fact'])
+    if plan['link'] and results.get('link'):
+        url, source = resolve_wikipedia_link(plan['link']['answer'], results['link'])
+        db.save_wikipedia_link(plan['link']['key'], url, source)
+        summary['link'] = source
+    summary['seconds'] = time.perf_counter() - started
+    if summary['trivia'] == 'failed':
+        raise TriviaGenerationError(f"No trivia for {today}: {errors.get('trivia', 'no result')}")
+    return summary
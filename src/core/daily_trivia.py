@@ -4,11 +4,13 @@ Interactive AI-Powered Trivia GitHub Profile
 Generates daily trivia questions using OpenAI and WOW facts from APIs
 """
 
+import contextvars
+import hashlib
 import json
 import os
 import random
+import re
 from datetime import datetime, timedelta, timezone
-from openai import OpenAI
 import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
@@ -16,13 +18,18 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from core.config import *
 from core.daily_facts import get_todays_fact
 from core.database import TriviaDatabase
-from core.points_system import get_streak_emoji, format_points_display
-import difflib
+from core.tenants import tenant_value
 from typing import Dict
 import logging
 logging.basicConfig(level=logging.INFO, format='[%(levelname)s] %(message)s')
 
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+from core.retry_policy import call_with_retries
+from core.openai_cache import get_cache
+from core.model_usage import tracked_completion
+from core.readme_sections import ReadmeSection, render_sections
+from core.similarity_index import find_near_duplicates, minhash_signature, estimated_similarity
+
+OPENAI_HOST = 'api.openai.com'
 
 def get_utc_today():
     return datetime.now(timezone.utc).strftime(DATE_FORMAT)
@@ -34,30 +41,30 @@ def setup_openai():
     """Initialize OpenAI client"""
     if not OPENAI_API_KEY:
         raise ValueError("OPENAI_API_KEY environment variable is required")
-    return OpenAI(api_key=OPENAI_API_KEY)
+    # Imported here: the client library dominates start-up and most commands never call OpenAI
+    from openai import OpenAI
+    # Retries go through retry_policy so they share its backoff and circuit breaker
+    return OpenAI(api_key=OPENAI_API_KEY, max_retries=0)
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=2, min=2, max=10), retry=retry_if_exception_type(Exception))
-def openai_with_retries(client, *args, **kwargs):
+def openai_with_retries(client, call_site='trivia', **kwargs):
+    """
+    Chat completion under the shared retry policy, behind the response cache (openai_cache.py);
+    the client's own retries are disabled in setup_openai. Tokens, latency and retries are
+    recorded under call_site (model_usage.py).
+    """
     try:
-        resp = client.chat.completions.create(*args, **kwargs)
-        # OpenAI returns errors as exceptions, but check for rate limit in response if present
-        if hasattr(resp, 'status_code') and resp.status_code == 429:
-            logging.error("[daily_trivia.py] [openai_with_retries] OpenAI API rate limit hit (429). Retrying...")
-        return resp
+        return tracked_completion(call_site, kwargs, client.chat.completions.create, lambda create: get_cache().complete(
+            lambda: call_with_retries(OPENAI_HOST, create, **kwargs), kwargs))
     except Exception as e:
-        if 'rate limit' in str(e).lower() or '429' in str(e):
-            logging.error("[daily_trivia.py] [openai_with_retries] OpenAI API rate limit hit (429). Retrying...")
-        elif '5' in str(e) and 'server' in str(e).lower():
-            logging.error(f"[daily_trivia.py] [openai_with_retries] OpenAI API server error. Retrying...")
-        else:
-            logging.error(f"[daily_trivia.py] [openai_with_retries] Exception: {e}")
+        logging.error(f"[daily_trivia.py] [openai_with_retries] Exception: {e}")
         raise
 
-def generate_trivia_question():
-    """Generate a trivia question using OpenAI"""
-    category = random.choice(TRIVIA_CATEGORIES)
-    correct_letter = random.choice(["A", "B", "C"])
-    prompt = f"""Generate an INCREDIBLE standalone trivia question about {category}. 
+class TriviaGenerationError(RuntimeError):
+    """OpenAI could not produce a usable trivia question"""
+
+def trivia_prompt(category, correct_letter):
+    """OpenAI prompt for a trivia question about category whose correct answer is correct_letter"""
+    return f"""Generate an INCREDIBLE standalone trivia question about {category}. 
 
     Requirements:
     - Create a completely original question NOT based on any specific fact
@@ -84,194 +91,62 @@ def generate_trivia_question():
     }}
     
     Only return the JSON, no other text."""
+
+def parse_trivia_content(content):
+    """Trivia dict from the model's reply; raises ValueError if it holds no valid JSON object"""
+    content = content.strip()
+    # Robustly extract JSON from the response: take the first {...} block
+    match = re.search(r'\{[\s\S]*\}', content)
+    if match:
+        try:
+            return json.loads(match.group(0))
+        except Exception as e:
+            logging.error(f"[daily_trivia.py] [parse_trivia_content] JSON extraction failed: {e}")
+    logging.error(f"[daily_trivia.py] [parse_trivia_content] Could not extract valid JSON\nRaw content: {content}")
+    raise ValueError("No valid JSON found in OpenAI response")
+
+def generate_trivia_question(category=None):
+    """Generate a trivia question using OpenAI; raises TriviaGenerationError on failure"""
+    category = category or random.choice(TRIVIA_CATEGORIES)
+    correct_letter = random.choice(["A", "B", "C"])
+    request = dict(
+        model=get_model(),
+        messages=[{"role": "user", "content": trivia_prompt(category, correct_letter)}],
+        max_tokens=MAX_TOKENS,
+        temperature=TEMPERATURE
+    )
     try:
         client = setup_openai()
         try:
-            response = openai_with_retries(
-                client,
-                model=MODEL,
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=MAX_TOKENS,
-                temperature=TEMPERATURE
-            )
+            response = openai_with_retries(client, **request)
         except Exception as e:
             logging.error("[daily_trivia.py] [generate_trivia_question] OpenAI API failed after retries: %s", e)
             raise
-        content = response.choices[0].message.content.strip()
-        # Robustly extract JSON from response
-        import re
-        def extract_json(text):
-            # Try to find the first {...} block
-            match = re.search(r'\{[\s\S]*\}', text)
-            if match:
-                try:
-                    return json.loads(match.group(0))
-                except Exception as e:
-                    logging.error(f"[daily_trivia.py] [generate_trivia_question] JSON extraction failed: {e}")
-            raise ValueError("No valid JSON found in OpenAI response")
         try:
-            trivia_data = extract_json(content)
-        except Exception as e:
-            logging.error(f"[daily_trivia.py] [generate_trivia_question] Could not extract valid JSON: {e}\nRaw content: {content}")
+            return parse_trivia_content(response.choices[0].message.content)
+        except ValueError:
+            # Do not replay a reply that could not be parsed; the next attempt asks again
+            get_cache().discard(request)
             raise
-        return trivia_data
     except Exception as e:
         logging.error("[daily_trivia.py] [generate_trivia_question] Failed to generate trivia: %s", e)
-        sys.exit(1)
-
-def create_standalone_trivia(category):
-    """Create standalone trivia question without being based on facts"""
-    category_questions = {
-        "space": {
-            "question": "What is the largest planet in our solar system?",
-            "options": {"A": "Jupiter", "B": "Saturn", "C": "Neptune"},
-            "correct_answer": "A",
-            "category": "space",
-            "explanation": "Jupiter is the largest planet in our solar system, with a mass more than twice that of Saturn."
-        },
-        "science": {
-            "question": "What is the chemical symbol for gold?",
-            "options": {"A": "Au", "B": "Ag", "C": "Fe"},
-            "correct_answer": "A",
-            "category": "science",
-            "explanation": "Au comes from the Latin word 'aurum' which means gold."
-        },
-        "animals": {
-            "question": "Which animal has the longest lifespan?",
-            "options": {"A": "Greenland Shark", "B": "Giant Tortoise", "C": "Bowhead Whale"},
-            "correct_answer": "A",
-            "category": "animals",
-            "explanation": "Greenland sharks can live for over 400 years, making them the longest-living vertebrates."
-        },
-        "human_body": {
-            "question": "How many bones are in the adult human body?",
-            "options": {"A": "206", "B": "212", "C": "198"},
-            "correct_answer": "A",
-            "category": "human_body",
-            "explanation": "The adult human body has exactly 206 bones."
-        },
-        "general": {
-            "question": "What year did the first iPhone launch?",
-            "options": {"A": "2007", "B": "2005", "C": "2009"},
-            "correct_answer": "A",
-            "category": "general",
-            "explanation": "The first iPhone was launched by Apple in 2007."
-        },
-        "history": {
-            "question": "Who was the first President of the United States?",
-            "options": {"A": "George Washington", "B": "Thomas Jefferson", "C": "Abraham Lincoln"},
-            "correct_answer": "A",
-            "category": "history",
-            "explanation": "George Washington served as the first U.S. President from 1789 to 1797."
-        },
-        "geography": {
-            "question": "What is the longest river in the world?",
-            "options": {"A": "Nile", "B": "Amazon", "C": "Yangtze"},
-            "correct_answer": "A",
-            "category": "geography",
-            "explanation": "The Nile River is generally regarded as the longest river in the world."
-        },
-        "literature": {
-            "question": "Who wrote 'Romeo and Juliet'?",
-            "options": {"A": "William Shakespeare", "B": "Jane Austen", "C": "Charles Dickens"},
-            "correct_answer": "A",
-            "category": "literature",
-            "explanation": "William Shakespeare is the author of 'Romeo and Juliet'."
-        },
-        "sports": {
-            "question": "Which country won the FIFA World Cup in 2018?",
-            "options": {"A": "France", "B": "Brazil", "C": "Germany"},
-            "correct_answer": "A",
-            "category": "sports",
-            "explanation": "France won the 2018 FIFA World Cup."
-        },
-        "entertainment": {
-            "question": "Who played Iron Man in the Marvel Cinematic Universe?",
-            "options": {"A": "Robert Downey Jr.", "B": "Chris Evans", "C": "Mark Ruffalo"},
-            "correct_answer": "A",
-            "category": "entertainment",
-            "explanation": "Robert Downey Jr. played Tony Stark/Iron Man."
-        },
-        "technology": {
-            "question": "What does 'HTTP' stand for?",
-            "options": {"A": "HyperText Transfer Protocol", "B": "High Tech Transfer Protocol", "C": "Hyperlink Transfer Protocol"},
-            "correct_answer": "A",
-            "category": "technology",
-            "explanation": "HTTP stands for HyperText Transfer Protocol."
-        },
-        "nature": {
-            "question": "What is the tallest type of grass?",
-            "options": {"A": "Bamboo", "B": "Wheat", "C": "Sugarcane"},
-            "correct_answer": "A",
-            "category": "nature",
-            "explanation": "Bamboo is the tallest type of grass, with some species growing over 30 meters tall."
-        },
-        "art": {
-            "question": "Who painted the Mona Lisa?",
-            "options": {"A": "Leonardo da Vinci", "B": "Vincent van Gogh", "C": "Pablo Picasso"},
-            "correct_answer": "A",
-            "category": "art",
-            "explanation": "Leonardo da Vinci painted the Mona Lisa."
-        },
-        "music": {
-            "question": "Which composer became deaf later in life but continued to compose music?",
-            "options": {"A": "Ludwig van Beethoven", "B": "Wolfgang Amadeus Mozart", "C": "Johann Sebastian Bach"},
-            "correct_answer": "A",
-            "category": "music",
-            "explanation": "Beethoven composed some of his greatest works after losing his hearing."
-        },
-        "oceans": {
-            "question": "What is the largest ocean on Earth?",
-            "options": {"A": "Pacific Ocean", "B": "Atlantic Ocean", "C": "Indian Ocean"},
-            "correct_answer": "A",
-            "category": "oceans",
-            "explanation": "The Pacific Ocean is the largest ocean on Earth."
-        },
-        "mountains": {
-            "question": "What is the highest mountain in the world?",
-            "options": {"A": "Mount Everest", "B": "K2", "C": "Kangchenjunga"},
-            "correct_answer": "A",
-            "category": "mountains",
-            "explanation": "Mount Everest is the highest mountain above sea level."
-        },
-        "inventions": {
-            "question": "Who invented the telephone?",
-            "options": {"A": "Alexander Graham Bell", "B": "Thomas Edison", "C": "Nikola Tesla"},
-            "correct_answer": "A",
-            "category": "inventions",
-            "explanation": "Alexander Graham Bell is credited with inventing the telephone."
-        },
-        "discoveries": {
-            "question": "Who discovered penicillin?",
-            "options": {"A": "Alexander Fleming", "B": "Marie Curie", "C": "Louis Pasteur"},
-            "correct_answer": "A",
-            "category": "discoveries",
-            "explanation": "Alexander Fleming discovered penicillin in 1928."
-        },
-        "records": {
-            "question": "What is the fastest land animal?",
-            "options": {"A": "Cheetah", "B": "Lion", "C": "Pronghorn"},
-            "correct_answer": "A",
-            "category": "records",
-            "explanation": "The cheetah is the fastest land animal, capable of speeds up to 70 mph (113 km/h)."
-        },
-        "extremes": {
-            "question": "What is the hottest planet in our solar system?",
-            "options": {"A": "Venus", "B": "Mercury", "C": "Mars"},
-            "correct_answer": "A",
-            "category": "extremes",
-            "explanation": "Venus is the hottest planet due to its thick, heat-trapping atmosphere."
-        },
-        "mysteries": {
-            "question": "What is the name of the mysterious area in the western part of the North Atlantic Ocean where ships and planes have disappeared?",
-            "options": {"A": "Bermuda Triangle", "B": "Devil's Sea", "C": "Sargasso Sea"},
-            "correct_answer": "A",
-            "category": "mysteries",
-            "explanation": "The Bermuda Triangle is famous for mysterious disappearances of ships and planes."
-        }
-    }
-    # Get question for category or use general as fallback
-    return category_questions.get(category, category_questions["general"])
+        raise TriviaGenerationError(f"Failed to generate trivia: {e}") from e
+
+def create_standalone_trivia(category, used_questions=None):
+    """
+    Fallback trivia for category from the compiled fallback bank, skipping questions that were
+    already asked (used_questions, by default the texts of all stored questions). Needs no network, so it
+    also stands in for generation while OpenAI is unavailable.
+    """
+    from core.fallback_bank import get_bank, question_key
+    if used_questions is None:
+        used_questions = TriviaDatabase().get_trivia_question_texts()
+    bank = get_bank()
+    trivia = bank.sample(category, {question_key(question) for question in used_questions})
+    if trivia is None:
+        logging.warning("[daily_trivia.py] [create_standalone_trivia] All %s fallback questions were used, repeating one", len(bank))
+        trivia = bank.sample(category)
+    return trivia
 
 def load_trivia_data():
     """Load existing trivia data from database (timestamp-only schema)"""
@@ -353,7 +228,7 @@ def create_answer_links(trivia_data=None):
     """Create GitHub issue links for answer buttons"""
     import urllib.parse
     
-    base_url = f"https://github.com/{GITHUB_USERNAME}/{GITHUB_REPO}"
+    base_url = f"https://github.com/{tenant_value('github_username', GITHUB_USERNAME)}/{tenant_value('github_repo', GITHUB_REPO)}"
     
     # Load current trivia to get answer texts if not provided
     if trivia_data is None:
@@ -375,145 +250,242 @@ def create_answer_links(trivia_data=None):
         "C": f"{base_url}/issues/new?title=Trivia+Answer+C&body={issue_body('C')}"
     }
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=2, min=2, max=10), retry=retry_if_exception_type(Exception))
-def openai_wiki_with_retries(client, *args, **kwargs):
-    return client.chat.completions.create(*args, **kwargs)
+def openai_wiki_with_retries(client, **kwargs):
+    return openai_with_retries(client, call_site='wikipedia_link', **kwargs)
 
-def get_wikipedia_link(answer_text, question_text):
-    """Use OpenAI to get a Wikipedia link for the answer in the context of the question."""
+WIKIPEDIA_URL_RE = re.compile(r'^https?://(?:[a-z]{2,3}(?:-[a-z]+)?\.)?(?:m\.)?wikipedia\.org/wiki/[^\s<>"\']+$')
+
+def wikipedia_link_key(answer_text, question_text):
+    """Cache key of the Wikipedia link for an answer in the context of its question"""
+    return hashlib.sha256(f"{question_text}\0{answer_text}".encode('utf-8')).hexdigest()
+
+def is_wikipedia_url(url):
+    """True if url looks like a Wikipedia article link"""
+    return bool(WIKIPEDIA_URL_RE.match(url))
+
+def fallback_wikipedia_link(answer_text):
+    """Heuristic Wikipedia link built from the answer text"""
+    import urllib.parse
+    clean = str(answer_text).strip().replace(' ', '_')
+    return f"https://en.wikipedia.org/wiki/{urllib.parse.quote(clean)}"
+
+def wikipedia_link_prompt(answer_text, question_text):
+    return (
+        f"give me a wikipedia link to this answer: {answer_text} for this question: {question_text} "
+        "for further reading or support that shows the answer is correct. "
+        "Return only the full Wikipedia URL, nothing else."
+    )
+
+def fetch_wikipedia_link(answer_text, question_text):
+    """Ask OpenAI for a Wikipedia link for the answer; returns the raw answer, or None if the call failed"""
     try:
         client = setup_openai()
-        prompt = (
-            f"give me a wikipedia link to this answer: {answer_text} for this question: {question_text} "
-            "for further reading or support that shows the answer is correct. "
-            "Return only the full Wikipedia URL, nothing else."
-        )
         try:
             response = openai_wiki_with_retries(
                 client,
-                model=MODEL,
-                messages=[{"role": "user", "content": prompt}],
+                model=get_model(),
+                messages=[{"role": "user", "content": wikipedia_link_prompt(answer_text, question_text)}],
                 max_tokens=100,
                 temperature=0.2
             )
         except Exception as e:
-            logging.error("[daily_trivia.py] [get_wikipedia_link] OpenAI API failed after retries: %s", e)
+            logging.error("[daily_trivia.py] [fetch_wikipedia_link] OpenAI API failed after retries: %s", e)
             raise
-        url = response.choices[0].message.content.strip()
-        if url.startswith("http"):
-            return url
+        return response.choices[0].message.content.strip()
     except Exception as e:
-        logging.error("[daily_trivia.py] [get_wikipedia_link] Error getting Wikipedia link from OpenAI: %s", e)
-    # Fallback: heuristic
-    import urllib.parse
-    clean = str(answer_text).strip().replace(' ', '_')
-    return f"https://en.wikipedia.org/wiki/{urllib.parse.quote(clean)}"
+        logging.error("[daily_trivia.py] [fetch_wikipedia_link] Error getting Wikipedia link from OpenAI: %s", e)
+        return None
+
+def get_wikipedia_link(answer_text, question_text, validate=WIKIPEDIA_LINK_VALIDATE):
+    """
+    Wikipedia link for the answer in the context of the question.
+    Links are cached in the database, so each question costs at most one OpenAI call. A failed
+    call is not cached and falls back to a link built from the answer text.
+    """
+    link_key = wikipedia_link_key(answer_text, question_text)
+    db = None
+    try:
+        db = TriviaDatabase()
+        cached = db.get_wikipedia_link(link_key)
+        if cached:
+            logging.debug("[daily_trivia.py] [get_wikipedia_link] Using cached Wikipedia link: %s", cached)
+            return cached
+    except Exception as e:
+        logging.error("[daily_trivia.py] [get_wikipedia_link] Error reading Wikipedia link cache: %s", e)
+
+    url = fetch_wikipedia_link(answer_text, question_text)
+    if url is None:
+        return fallback_wikipedia_link(answer_text)
+    url, source = resolve_wikipedia_link(answer_text, url, validate)
+    if db is not None:
+        db.save_wikipedia_link(link_key, url, source)
+    return url
+
+def resolve_wikipedia_link(answer_text, reply, validate=WIKIPEDIA_LINK_VALIDATE):
+    """(url, source) to cache for the model's reply: the reply itself, or the heuristic link if it is unusable"""
+    if not reply.startswith("http") or (validate and not is_wikipedia_url(reply)):
+        logging.warning("[daily_trivia.py] [get_wikipedia_link] Unusable Wikipedia link from OpenAI: %s", reply)
+        return fallback_wikipedia_link(answer_text), 'fallback'
+    return reply, 'openai'
+
+def render_leaderboard_rows(top_users):
+    """Markdown table rows for the top leaderboard users"""
+    # points_system loads NumPy for batch scoring, which rendering the README has no use for
+    from core.points_system import get_streak_emoji, format_points_display
+    leaderboard_rows = ""
+    for i, (username, stats) in enumerate(top_users, 1):
+        streak_emoji = get_streak_emoji(stats['current_streak'])
+        points_display = format_points_display(stats['total_points'])
+        day_joined = stats.get('first_correct_date', '-') or '-'
+        leaderboard_rows += f"| {i} | @{username} | {streak_emoji} {stats['current_streak']} | {points_display} | \u2705 {stats['total_correct']} | {day_joined} |\n"
+    return leaderboard_rows
+
+def build_view_model(trivia_data, leaderboard, daily_fact, today):
+    """
+    Everything the README, leaderboard.json and the HTML pages show, computed once per render:
+    today's question and answer links, the daily fact, the whole ranking and yesterday's question.
+    Yesterday's Wikipedia link is looked up on demand by yesterday_wikipedia_link.
+    """
+    current_trivia = trivia_data["current"]
+    answer_links = create_answer_links(trivia_data)
+    ranking = [dict(rank=rank, username=username, **{key: stats.get(key) for key in
+                                                    ('current_streak', 'total_points', 'total_correct', 'first_correct_date')})
+               for rank, (username, stats) in enumerate(get_top_leaderboard(leaderboard, max_entries=None), 1)]
+    yesterday_date = get_utc_yesterday()
+    yesterday = None
+    for t in reversed(trivia_data.get("history", [])):
+        if t.get("timestamp")[:10] == yesterday_date:
+            yesterday = dict(date=yesterday_date, **{key: t.get(key) for key in ('question', 'options', 'correct_answer', 'explanation')})
+            yesterday['correct_text'] = yesterday['options'][yesterday['correct_answer']]
+            break
+    return {
+        'date': today,
+        'question': {
+            'question': current_trivia['question'],
+            'options': {letter: current_trivia['options'][letter] for letter in ('A', 'B', 'C')},
+            'answer_links': answer_links,
+        },
+        'daily_fact': daily_fact['fact'],
+        'ranking': ranking,
+        'yesterday': yesterday,
+    }
+
+def yesterday_wikipedia_link(view):
+    """Wikipedia link for yesterday's answer, looked up at most once per view model; None without a yesterday"""
+    yesterday = view['yesterday']
+    if not yesterday:
+        return None
+    if 'wiki_link' not in yesterday:
+        yesterday['wiki_link'] = get_wikipedia_link(yesterday['correct_text'], yesterday['question'])
+    return yesterday['wiki_link']
+
+def render_yesterday_stats(view):
+    """Yesterday's results section; looks up the Wikipedia link for the answer"""
+    yesterday = view['yesterday']
+    if not yesterday:
+        return ""
+    return YESTERDAY_STATS_TEMPLATE.format(
+        yesterday_date=yesterday['date'],
+        question=yesterday['question'],
+        correct_letter=yesterday['correct_answer'],
+        correct_text=yesterday['correct_text'],
+        wiki_link=yesterday_wikipedia_link(view),
+        explanation=yesterday['explanation']
+    )
+
+def build_readme_sections(view):
+    """
+    The README as ReadmeSections of a view model. The expensive parts (the Wikipedia link lookup
+    above all) only run when a section is rendered.
+    """
+    question = view['question']
+    top_users = [(user['username'], {key: user[key] for key in ('current_streak', 'total_points', 'total_correct', 'first_correct_date')})
+                 for user in view['ranking'][:MAX_LEADERBOARD_ENTRIES]]
+    yesterday_inputs = None
+    if view['yesterday']:
+        yesterday_inputs = {key: view['yesterday'][key] for key in ('date', 'question', 'options', 'correct_answer', 'explanation')}
+    today = view['date']
+    trivia_fields = dict(
+        today=today,
+        question=question['question'],
+        answer_link_a=question['answer_links']['A'],
+        answer_link_b=question['answer_links']['B'],
+        answer_link_c=question['answer_links']['C'],
+        option_a=question['options']['A'],
+        option_b=question['options']['B'],
+        option_c=question['options']['C'],
+    )
+    return [
+        ReadmeSection('header', [README_HEADER_TEMPLATE], lambda: README_HEADER_TEMPLATE),
+        ReadmeSection('daily_fact', [DAILY_FACT_SECTION_TEMPLATE, today, view['daily_fact']],
+                      lambda: DAILY_FACT_SECTION_TEMPLATE.format(today=today, daily_fact=view['daily_fact'])),
+        ReadmeSection('trivia', [TRIVIA_SECTION_TEMPLATE, trivia_fields],
+                      lambda: TRIVIA_SECTION_TEMPLATE.format(**trivia_fields)),
+        ReadmeSection('leaderboard', [LEADERBOARD_SECTION_TEMPLATE, top_users],
+                      lambda: LEADERBOARD_SECTION_TEMPLATE.format(
+                          leaderboard_rows=render_leaderboard_rows(top_users),
+                          no_participants_row="" if top_users else "| - | *No participants yet* | - | - | - | - |\n")),
+        ReadmeSection('yesterday_stats', [YESTERDAY_STATS_TEMPLATE, yesterday_inputs],
+                      lambda: render_yesterday_stats(view)),
+        ReadmeSection('how_to_play', [HOW_TO_PLAY_TEMPLATE], lambda: HOW_TO_PLAY_TEMPLATE),
+        ReadmeSection('points_system', [POINTS_SYSTEM_TEMPLATE, MAX_LEADERBOARD_ENTRIES],
+                      lambda: POINTS_SYSTEM_TEMPLATE.format(max_leaderboard_entries=MAX_LEADERBOARD_ENTRIES)),
+        ReadmeSection('footer', [README_FOOTER_TEMPLATE], lambda: README_FOOTER_TEMPLATE),
+    ]
+
+class LazyJSON:
+    """Log argument that is only serialized if the record is actually emitted"""
 
-def update_readme(trivia_data, leaderboard):
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self):
+        return json.dumps(self.value, indent=2, default=str)
+
+def render_readme(view, old_content=""):
+    """README content for a view model; sections whose inputs match old_content are reused as they are"""
+    readme_content, _ = render_sections(build_readme_sections(view), old_content)
+    return readme_content
+
+def update_readme(trivia_data, leaderboard, show_diff=False):
     """
     Update the README with current trivia, daily fact, and leaderboard.
     This function always loads from the latest DB state, so all data must be saved to the DB before calling.
+    The file is only written when its content changed; show_diff logs a bounded diff summary.
+    Use site_render.render_site to write leaderboard.json and the HTML pages in the same pass.
     """
     try:
-        # Debug: print loaded data
-        logging.debug("[daily_trivia.py] [update_readme] Loaded trivia_data: %s", json.dumps(trivia_data, indent=2, default=str))
-        logging.debug("[daily_trivia.py] [update_readme] Loaded leaderboard: %s", json.dumps(leaderboard, indent=2, default=str))
-        from core.daily_facts import load_daily_facts
-        fact_data = load_daily_facts()
-        logging.debug("[daily_trivia.py] [update_readme] Loaded fact_data: %s", json.dumps(fact_data, indent=2, default=str))
-        today = datetime.now().strftime(DATE_FORMAT)
-        current_trivia = trivia_data.get("current")
-        if not current_trivia:
-            return
-        daily_fact = get_todays_fact()
-        answer_links = create_answer_links(trivia_data)
-        top_users = get_top_leaderboard(leaderboard)
-        category = current_trivia.get('category', 'general')
-        emoji = EMOJI_MAPPING.get(category, "💡")
-        yesterday_stats = ""
-        yesterday_date = get_utc_yesterday()
-        yesterday_trivia = None
-        for t in reversed(trivia_data.get("history", [])):
-            if t.get("timestamp")[:10] == yesterday_date:
-                yesterday_trivia = t
-                break
-        if yesterday_trivia:
-            question = yesterday_trivia['question']
-            correct_letter = yesterday_trivia['correct_answer']
-            correct_text = yesterday_trivia['options'][correct_letter]
-            explanation = yesterday_trivia['explanation']
-            wiki_link = get_wikipedia_link(correct_text, question)
-            yesterday_stats = YESTERDAY_STATS_TEMPLATE.format(
-                yesterday_date=yesterday_date,
-                question=question,
-                correct_letter=correct_letter,
-                correct_text=correct_text,
-                wiki_link=wiki_link,
-                explanation=explanation
-            )
-        # Leaderboard rows
-        leaderboard_rows = ""
-        for i, (username, stats) in enumerate(top_users, 1):
-            streak_emoji = get_streak_emoji(stats['current_streak'])
-            points_display = format_points_display(stats['total_points'])
-            day_joined = stats.get('first_correct_date', '-') or '-'
-            leaderboard_rows += f"| {i} | @{username} | {streak_emoji} {stats['current_streak']} | {points_display} | \u2705 {stats['total_correct']} | {day_joined} |\n"
-        no_participants_row = ""
-        if not top_users:
-            no_participants_row = "| - | *No participants yet* | - | - | - | - |\n"
-        # How to play and points system
-        how_to_play = HOW_TO_PLAY_TEMPLATE
-        points_system = POINTS_SYSTEM_TEMPLATE.format(max_leaderboard_entries=MAX_LEADERBOARD_ENTRIES)
-        # README content
-        readme_content = README_TEMPLATE.format(
-            today=today,
-            daily_fact=daily_fact['fact'],
-            question=current_trivia['question'],
-            answer_link_a=answer_links['A'],
-            answer_link_b=answer_links['B'],
-            answer_link_c=answer_links['C'],
-            option_a=current_trivia['options']['A'],
-            option_b=current_trivia['options']['B'],
-            option_c=current_trivia['options']['C'],
-            leaderboard_rows=leaderboard_rows,
-            no_participants_row=no_participants_row,
-            yesterday_stats=yesterday_stats,
-            how_to_play=how_to_play,
-            points_system=points_system
-        )
-        readme_path = "README.md"
-        old_content = ""
-        if os.path.exists(readme_path):
-            with open(readme_path, "r") as f:
-                old_content = f.read()
-        with open(readme_path, "w") as f:
-            f.write(readme_content)
-        # Debug: print what changed
-        if old_content != readme_content:
-            logging.info("[daily_trivia.py] [update_readme] README.md has changed. Diff summary:")
-            diff = difflib.unified_diff(
-                old_content.splitlines(),
-                readme_content.splitlines(),
-                fromfile='README.md (old)',
-                tofile='README.md (new)',
-                lineterm=''
-            )
-            for line in diff:
-                logging.info(line)
-            logging.info("[daily_trivia.py] [update_readme] README updated.")
-        else:
-            logging.info("[daily_trivia.py] [update_readme] README.md is unchanged.")
-            logging.info("[daily_trivia.py] [update_readme] No update needed.")
+        from core.site_render import render_site
+        render_site(trivia_data, leaderboard, targets=('readme',), show_diff=show_diff)
     except Exception as e:
         logging.error("[daily_trivia.py] [update_readme] Error in update_readme: %s", e)
         import traceback
         traceback.print_exc()
 
+def is_repeated_trivia(trivia, current_trivia=None, db=None):
+    """True if the question is the current one or a near duplicate of any indexed past question"""
+    if current_trivia and trivia['question'] == current_trivia.get('question'):
+        return True
+    matches = find_near_duplicates(db or TriviaDatabase(), 'trivia', trivia['question'])
+    if matches:
+        logging.info("[daily_trivia.py] [is_repeated_trivia] %r repeats the question of %s (similarity %.2f)",
+                     trivia['question'], matches[0][0], matches[0][1])
+    return bool(matches)
+
 def generate_unique_trivia(current_trivia, max_tries=3):
     tried_categories = set()
+    db = TriviaDatabase()
     for attempt in range(max_tries):
-        trivia = generate_trivia_question()
-        if not current_trivia or trivia['question'] != current_trivia.get('question'):
+        try:
+            trivia = generate_trivia_question()
+        except TriviaGenerationError as e:
+            if not FALLBACK_ON_OUTAGE:
+                raise
+            logging.warning("[daily_trivia.py] [generate_unique_trivia] Using a fallback question, generation failed: %s", e)
+            trivia = create_standalone_trivia(random.choice(TRIVIA_CATEGORIES))
+        if not is_repeated_trivia(trivia, current_trivia, db):
             return trivia
         tried_categories.add(trivia['category'])
         # Remove tried category from pool for next attempt
@@ -521,11 +493,104 @@ def generate_unique_trivia(current_trivia, max_tries=3):
         if available:
             # Force next category for fallback
             trivia = create_standalone_trivia(random.choice(available))
-            if not current_trivia or trivia['question'] != current_trivia.get('question'):
+            if not is_repeated_trivia(trivia, current_trivia, db):
                 return trivia
     logging.warning("⚠️ Could not generate unique trivia after several attempts.")
     return trivia  # Return last tried
 
+def normalize_question(question):
+    """Question text reduced to lowercase letters and digits, for duplicate checks"""
+    return re.sub(r'[\W_]+', '', str(question).casefold())
+
+def validate_trivia(trivia, known_questions=()):
+    """
+    Problems that make a generated question unusable, or an empty list if it is fine.
+    known_questions: normalized questions that may not be repeated.
+    """
+    problems = []
+    question = trivia.get('question')
+    options = trivia.get('options')
+    if not isinstance(question, str) or not question.strip():
+        problems.append("missing question")
+    elif normalize_question(question) in known_questions:
+        problems.append("duplicate question")
+    if not isinstance(options, dict) or sorted(options) != ['A', 'B', 'C']:
+        problems.append("options must be exactly A, B and C")
+    elif any(not isinstance(text, str) or not text.strip() for text in options.values()):
+        problems.append("empty option")
+    elif len({normalize_question(text) for text in options.values()}) != 3:
+        problems.append("options are not distinct")
+    if trivia.get('correct_answer') not in ('A', 'B', 'C'):
+        problems.append("correct_answer must be A, B or C")
+    if not isinstance(trivia.get('explanation'), str) or not trivia['explanation'].strip():
+        problems.append("missing explanation")
+    return problems
+
+def fill_trivia_queue(days=TRIVIA_QUEUE_DAYS, concurrency=TRIVIA_QUEUE_CONCURRENCY):
+    """
+    Top the trivia queue up to `days` questions, generating the missing ones with `concurrency`
+    concurrent OpenAI requests. Generated questions are validated and checked against every saved
+    and queued question, near duplicates included, before they are stored. Returns a summary dict.
+    """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    db = TriviaDatabase()
+    queued = db.get_trivia_queue()
+    needed = max(0, days - len(queued))
+    summary = {"queued_before": len(queued), "requested": needed, "added": 0, "rejected": 0, "failed": 0}
+    if not needed:
+        summary["queued_after"] = len(queued)
+        return summary
+    known = {normalize_question(q['question']) for q in db.get_trivia_questions().values()}
+    known.update(normalize_question(q['question']) for q in queued)
+    # Spread the batch over the categories instead of leaving it to chance
+    categories = random.sample(TRIVIA_CATEGORIES, len(TRIVIA_CATEGORIES))
+    # Queued questions are not in the similarity index yet; there are few enough to compare directly
+    pending_signatures = [minhash_signature(q['question']) for q in queued]
+    accepted = []
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        # Each worker runs in a copy of this context, so usage is recorded in the current tenant's database
+        futures = [executor.submit(contextvars.copy_context().run, generate_trivia_question, categories[i % len(categories)])
+                   for i in range(needed)]
+        for future in as_completed(futures):
+            try:
+                trivia = future.result()
+            except TriviaGenerationError:
+                summary["failed"] += 1
+                continue
+            problems = validate_trivia(trivia, known)
+            signature = minhash_signature(trivia.get('question'))
+            if not problems and (find_near_duplicates(db, 'trivia', trivia['question']) or signature and any(
+                    pending and estimated_similarity(signature, pending) >= SIMILARITY_THRESHOLD for pending in pending_signatures)):
+                problems.append("near duplicate question")
+            if problems:
+                logging.warning("[daily_trivia.py] [fill_trivia_queue] Rejected generated question (%s): %s", ", ".join(problems), trivia.get('question'))
+                summary["rejected"] += 1
+                continue
+            known.add(normalize_question(trivia['question']))
+            pending_signatures.append(signature)
+            accepted.append(trivia)
+    summary["added"] = db.enqueue_trivia(accepted)
+    summary["queued_after"] = db.count_trivia_queue()
+    logging.info("[daily_trivia.py] [fill_trivia_queue] Queued %s of %s requested questions (%s rejected, %s failed); %s in queue",
+                 summary["added"], needed, summary["rejected"], summary["failed"], summary["queued_after"])
+    return summary
+
+def next_trivia_question(current_trivia=None):
+    """
+    Trivia for a new day: the oldest queued question that was not used before, or a freshly
+    generated one when the queue is empty.
+    """
+    db = TriviaDatabase()
+    used = {q['question'] for q in db.get_trivia_questions().values()}
+    if current_trivia:
+        used.add(current_trivia.get('question'))
+    trivia = db.pop_trivia(skip_questions=used)
+    if trivia:
+        logging.info("[daily_trivia.py] [next_trivia_question] Using queued trivia (%s left): %s", db.count_trivia_queue(), trivia['question'])
+        return trivia
+    logging.warning("[daily_trivia.py] [next_trivia_question] Trivia queue is empty, generating a question now")
+    return generate_unique_trivia(current_trivia, max_tries=1)
+
 # --- For daily facts ---
 from core.daily_facts import load_daily_facts, save_daily_facts, get_daily_fact
 
@@ -573,6 +638,7 @@ def get_todays_fact() -> Dict[str, str]:
 
 # --- For trivia ---
 def main():
+    validate_config()
     print("🎯 Generating daily trivia and daily fact...")
     db = TriviaDatabase()
     trivia_questions = db.get_trivia_questions()
@@ -597,47 +663,19 @@ def main():
             logging.info(f"    (added at {latest['timestamp']})")
         else:
             logging.debug(f"[DEBUG] No trivia for today, will generate new.")
-            logging.info("🔄 Generating new trivia question...")
-            client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
-            # Generate new trivia (reuse your existing logic here)
-            # ...
-            # For demonstration, we'll use a placeholder
-            question = "Placeholder question?"
-            options = {"A": "Option A", "B": "Option B", "C": "Option C"}
-            correct_answer = "A"
-            explanation = "Placeholder explanation."
-            new_trivia = {
-                "question": question,
-                "options": options,
-                "correct_answer": correct_answer,
-                "explanation": explanation
-            }
-            if "timestamp" not in new_trivia:
-                new_trivia["timestamp"] = datetime.now().isoformat()
-            save_trivia_data({"current": new_trivia, "history": []})
-            db.export_compressed_data()
-            logging.info(f"[NEW-TRIVIA] Added trivia for {today}: {question}")
             trivia_changed = True
     else:
         # No trivia at all, so add new
         logging.debug(f"[DEBUG] No trivia in database yet, will generate new.")
-        client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
-        question = "Placeholder question?"
-        options = {"A": "Option A", "B": "Option B", "C": "Option C"}
-        correct_answer = "A"
-        explanation = "Placeholder explanation."
-        new_trivia = {
-            "question": question,
-            "options": options,
-            "correct_answer": correct_answer,
-            "explanation": explanation
-        }
-        if "timestamp" not in new_trivia:
-            new_trivia["timestamp"] = datetime.now().isoformat()
+        latest = None
+        trivia_changed = True
+    if trivia_changed:
+        logging.info("🔄 Taking the next trivia question...")
+        new_trivia = next_trivia_question(latest)
+        new_trivia["timestamp"] = datetime.now().isoformat()
         save_trivia_data({"current": new_trivia, "history": []})
         db.export_compressed_data()
-        logging.info(f"[NEW-TRIVIA] Added trivia for {today}: {question}")
-        trivia_changed = True
+        logging.info(f"[NEW-TRIVIA] Added trivia for {today}: {new_trivia['question']}")
 
     # Fact logic: get_todays_fact already handles skip/fetch logic and updates DB
     fact = get_todays_fact()
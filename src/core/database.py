@@ -4,31 +4,156 @@ import json
 import os
 from datetime import datetime, timedelta
 from pathlib import Path
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.backends import default_backend
-from cryptography.fernet import Fernet
 import base64
 import secrets
+from functools import lru_cache
 from core.config import DB_PATH, DB_COMPRESSED_PATH, DB_DIR
+from core.tenants import tenant_value, tenant_env
+from core.similarity_index import index_entries
 import logging
 logging.basicConfig(level=logging.INFO, format='[%(levelname)s] %(message)s')
 
-CURRENT_SCHEMA_VERSION = 1
+CURRENT_SCHEMA_VERSION = 7
+
+# Journal of answer issues whose result has been applied to the leaderboard.
+# status is 'scored' (leaderboard updated, GitHub comment/close still pending) or 'closed'.
+PROCESSED_ISSUES_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS processed_issues (
+        issue_number INTEGER PRIMARY KEY,
+        status TEXT NOT NULL,
+        applied_at TEXT NOT NULL,
+        outcome TEXT,
+        comment TEXT
+    )
+'''
+
+# Immutable log of every scored answer; the leaderboard table is a projection of it.
+ANSWER_EVENTS_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS answer_events (
+        event_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        issue_number INTEGER,
+        username TEXT NOT NULL,
+        trivia_date TEXT NOT NULL,
+        answer TEXT,
+        correct INTEGER NOT NULL,
+        answered_at TEXT NOT NULL
+    )
+'''
+
+# Compressed leaderboard snapshots taken after applying every event up to event_id.
+# rules_version 0 is the base snapshot of the leaderboard from before events were recorded and
+# is valid under any scoring rules; other snapshots are only valid for their rules version.
+LEADERBOARD_CHECKPOINTS_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS leaderboard_checkpoints (
+        rules_version INTEGER NOT NULL,
+        event_id INTEGER NOT NULL,
+        created_at TEXT NOT NULL,
+        leaderboard BLOB NOT NULL,
+        PRIMARY KEY (rules_version, event_id)
+    )
+'''
+
+# Wikipedia links for trivia answers, keyed by a hash of the question and answer text.
+# source is 'openai' for a validated model answer or 'fallback' when the model's answer was unusable.
+WIKIPEDIA_LINKS_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS wikipedia_links (
+        link_key TEXT PRIMARY KEY,
+        url TEXT NOT NULL,
+        source TEXT NOT NULL,
+        created_at TEXT NOT NULL
+    )
+'''
+
+# Validated trivia questions generated ahead of time (manage.py fill-queue), oldest first.
+# A question leaves the queue when it is saved to trivia_questions.
+TRIVIA_QUEUE_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS trivia_queue (
+        queue_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        question TEXT NOT NULL UNIQUE,
+        options TEXT NOT NULL,
+        correct_answer TEXT NOT NULL,
+        category TEXT,
+        explanation TEXT,
+        created_at TEXT NOT NULL
+    )
+'''
+
+# MinHash signatures of every trivia question and daily fact (kind 'trivia' or 'fact', keyed by
+# timestamp) and their LSH buckets, see similarity_index.py. Entries outlive pruning of the
+# source tables, so repeats are caught across the whole history.
+SIMILARITY_SIGNATURES_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS similarity_signatures (
+        kind TEXT NOT NULL,
+        item_key TEXT NOT NULL,
+        text TEXT NOT NULL,
+        signature BLOB NOT NULL,
+        PRIMARY KEY (kind, item_key)
+    )
+'''
+
+SIMILARITY_BUCKETS_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS similarity_buckets (
+        kind TEXT NOT NULL,
+        bucket INTEGER NOT NULL,
+        item_key TEXT NOT NULL,
+        PRIMARY KEY (kind, bucket, item_key)
+    ) WITHOUT ROWID
+'''
+
+# One row per chat completion (see model_usage.py). call_site is 'trivia' or 'wikipedia_link';
+# retries counts attempts after the first; cached rows were answered by the response cache.
+MODEL_USAGE_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS model_usage (
+        usage_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        call_site TEXT NOT NULL,
+        model TEXT,
+        prompt_tokens INTEGER,
+        completion_tokens INTEGER,
+        latency_ms REAL NOT NULL,
+        retries INTEGER NOT NULL DEFAULT 0,
+        cached INTEGER NOT NULL DEFAULT 0,
+        status TEXT NOT NULL,
+        error TEXT,
+        created_at TEXT NOT NULL
+    )
+'''
+MODEL_USAGE_COLUMNS = ('usage_id', 'call_site', 'model', 'prompt_tokens', 'completion_tokens', 'latency_ms',
+                       'retries', 'cached', 'status', 'error', 'created_at')
+
+ANSWER_EVENT_COLUMNS = "event_id, issue_number, username, trivia_date, answer, correct, answered_at"
+
+@lru_cache(maxsize=16)
+def _derive_key(password, salt):
+    # 390000 PBKDF2 rounds take a noticeable fraction of a second; tenants sharing a password and
+    # salt, and repeated exports in one process, derive the key once
+    from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.backends import default_backend
+    import base64
+    kdf = PBKDF2HMAC(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=salt,
+        iterations=390000,
+        backend=default_backend(),
+    )
+    return base64.urlsafe_b64encode(kdf.derive(password))
 
 class TriviaDatabase:
-    def __init__(self, db_path=DB_PATH):
+    def __init__(self, db_path=None):
         try:
-            self.db_path = db_path
+            # Without an explicit path the database of the current tenant, if any, is used
+            self.db_path = db_path or tenant_value('db_path', DB_PATH)
+            self.compressed_path = tenant_value('compressed_path', DB_COMPRESSED_PATH)
             # Ensure the directory exists
-            Path(DB_DIR).mkdir(parents=True, exist_ok=True)
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
             self.init_database()
         except Exception as e:
             logging.error("[database.py] [__init__] Error initializing database: %s", e)
             raise
 
     def _get_password(self):
-        password = os.getenv("TRIVIA_DB_PASSWORD")
+        password = tenant_env('password_env', "TRIVIA_DB_PASSWORD")
         if not password:
             logging.error("[database.py] [_get_password] TRIVIA_DB_PASSWORD environment variable is required for database encryption.")
             raise RuntimeError("TRIVIA_DB_PASSWORD environment variable is required for database encryption.")
@@ -38,20 +163,14 @@ class TriviaDatabase:
         password = self._get_password()
         if salt is None:
             import base64
-            env_salt = os.getenv("TRIVIA_DB_SALT")
+            env_salt = tenant_env('salt_env', "TRIVIA_DB_SALT")
             if not env_salt:
                 logging.error("[database.py] [_get_fernet] TRIVIA_DB_SALT environment variable is required for database encryption.")
                 raise RuntimeError("TRIVIA_DB_SALT environment variable is required for database encryption. Please set it as a base64-encoded 16-byte value.")
             salt = base64.b64decode(env_salt)
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=salt,
-            iterations=390000,
-            backend=default_backend(),
-        )
-        key = base64.urlsafe_b64encode(kdf.derive(password))
-        return Fernet(key)
+        # Only the commands that read or write the encrypted export need cryptography
+        from cryptography.fernet import Fernet
+        return Fernet(_derive_key(password, salt))
 
     def ensure_meta_table(self):
         with sqlite3.connect(self.db_path) as conn:
@@ -95,10 +214,27 @@ class TriviaDatabase:
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.cursor()
             # Add migration steps here for future versions
-            # if old_version < 2:
-            #     cursor.execute("ALTER TABLE ...")
-            #     ...
+            if old_version < 2:
+                # processed_issues journal; init_database creates it for fresh databases
+                cursor.execute(PROCESSED_ISSUES_TABLE_SQL)
+            if old_version < 3:
+                # Event-sourced leaderboard; the existing leaderboard becomes the base checkpoint
+                cursor.execute(ANSWER_EVENTS_TABLE_SQL)
+                cursor.execute(LEADERBOARD_CHECKPOINTS_TABLE_SQL)
+            if old_version < 4:
+                cursor.execute(WIKIPEDIA_LINKS_TABLE_SQL)
+            if old_version < 5:
+                cursor.execute(TRIVIA_QUEUE_TABLE_SQL)
+            if old_version < 6:
+                cursor.execute(SIMILARITY_SIGNATURES_TABLE_SQL)
+                cursor.execute(SIMILARITY_BUCKETS_TABLE_SQL)
+            if old_version < 7:
+                cursor.execute(MODEL_USAGE_TABLE_SQL)
             conn.commit()
+        if old_version < 3:
+            self.save_leaderboard_checkpoint(0, self.get_leaderboard(), rules_version=0, replace=False)
+        if old_version < 6:
+            self.rebuild_similarity_index()
         logging.info(f"[database.py] [migrate_schema] Migrated schema from version {old_version} to {CURRENT_SCHEMA_VERSION}")
 
     def init_database(self):
@@ -143,6 +279,14 @@ class TriviaDatabase:
                         explanation TEXT
                     )
                 ''')
+                cursor.execute(PROCESSED_ISSUES_TABLE_SQL)
+                cursor.execute(ANSWER_EVENTS_TABLE_SQL)
+                cursor.execute(LEADERBOARD_CHECKPOINTS_TABLE_SQL)
+                cursor.execute(WIKIPEDIA_LINKS_TABLE_SQL)
+                cursor.execute(TRIVIA_QUEUE_TABLE_SQL)
+                cursor.execute(SIMILARITY_SIGNATURES_TABLE_SQL)
+                cursor.execute(SIMILARITY_BUCKETS_TABLE_SQL)
+                cursor.execute(MODEL_USAGE_TABLE_SQL)
                 conn.commit()
                 # Check schema version and migrate if needed
                 version = self.get_schema_version()
@@ -246,6 +390,24 @@ class TriviaDatabase:
             logging.error("[database.py] [decrypt_data] Error decrypting data: %s", e)
             raise
     
+    def _write_leaderboard_row(self, cursor, username, data):
+        compressed_history = self.compress_data(data.get('answer_history', []))
+        cursor.execute('''
+            INSERT OR REPLACE INTO leaderboard 
+            (username, current_streak, total_correct, total_points, total_answered, 
+             last_answered, last_trivia_date, answer_history)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            username,
+            data.get('current_streak', 0),
+            data.get('total_correct', 0),
+            data.get('total_points', 0),
+            data.get('total_answered', 0),
+            data.get('last_answered'),
+            data.get('last_trivia_date'),
+            compressed_history
+        ))
+
     def update_leaderboard(self, leaderboard_data):
         """Update leaderboard with compressed data"""
         try:
@@ -257,22 +419,7 @@ class TriviaDatabase:
                 
                 # Insert new data
                 for username, data in leaderboard_data.items():
-                    compressed_history = self.compress_data(data.get('answer_history', []))
-                    cursor.execute('''
-                        INSERT INTO leaderboard 
-                        (username, current_streak, total_correct, total_points, total_answered, 
-                         last_answered, last_trivia_date, answer_history)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (
-                        username,
-                        data.get('current_streak', 0),
-                        data.get('total_correct', 0),
-                        data.get('total_points', 0),
-                        data.get('total_answered', 0),
-                        data.get('last_answered'),
-                        data.get('last_trivia_date'),
-                        compressed_history
-                    ))
+                    self._write_leaderboard_row(cursor, username, data)
                 
                 conn.commit()
         except Exception as e:
@@ -305,16 +452,272 @@ class TriviaDatabase:
             logging.error("[database.py] [get_leaderboard] Error getting leaderboard: %s", e)
             return {}
     
+    def get_leaderboard_users(self, usernames):
+        """Get the leaderboard rows of the given users only, as get_leaderboard does; missing users are left out"""
+        usernames = list(usernames)
+        if not usernames:
+            return {}
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT * FROM leaderboard WHERE username IN ({', '.join('?' * len(usernames))})", usernames)
+            return {
+                username: {
+                    'current_streak': streak,
+                    'total_correct': correct,
+                    'total_points': points,
+                    'total_answered': answered,
+                    'last_answered': last_answered,
+                    'last_trivia_date': last_date,
+                    'answer_history': self.decompress_data(compressed_history) or []
+                }
+                for username, streak, correct, points, answered, last_answered, last_date, compressed_history in cursor.fetchall()
+            }
+
+    def _append_answer_events(self, cursor, answer_events):
+        cursor.executemany('''
+            INSERT INTO answer_events (issue_number, username, trivia_date, answer, correct, answered_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', [
+            (issue_number, username, trivia_date, answer, int(bool(correct)), answered_at)
+            for issue_number, username, trivia_date, answer, correct, answered_at in answer_events
+        ])
+
+    def append_answer_events(self, answer_events):
+        """Append (issue_number, username, trivia_date, answer, correct, answered_at) answer events"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                self._append_answer_events(conn.cursor(), answer_events)
+                conn.commit()
+        except Exception as e:
+            logging.error("[database.py] [append_answer_events] Error appending answer events: %s", e)
+            raise
+
+    def iter_answer_events(self, after_event_id=0, chunk_size=5000):
+        """Yield the answer events after after_event_id in event order, chunk_size rows at a time"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT {ANSWER_EVENT_COLUMNS} FROM answer_events WHERE event_id > ? ORDER BY event_id", (after_event_id,))
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    return
+                yield rows
+
+    def update_answer_events(self, rows):
+        """Restore answer events with their original ids (used by import)"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.executemany(f"INSERT OR IGNORE INTO answer_events ({ANSWER_EVENT_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                   [tuple(row) for row in rows])
+                conn.commit()
+        except Exception as e:
+            logging.error("[database.py] [update_answer_events] Error updating answer events: %s", e)
+            raise
+
+    def save_leaderboard_checkpoint(self, event_id, leaderboard, rules_version, keep=3, replace=True):
+        """
+        Store a leaderboard snapshot taken after event_id under a scoring rules version.
+        Only the newest `keep` checkpoints of each rules version are kept; the base checkpoint
+        (rules_version 0) is never pruned. With replace=False an existing checkpoint wins.
+        """
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute(f'''
+                    INSERT OR {'REPLACE' if replace else 'IGNORE'} INTO leaderboard_checkpoints
+                    (rules_version, event_id, created_at, leaderboard) VALUES (?, ?, ?, ?)
+                ''', (rules_version, event_id, datetime.now().isoformat(), self.compress_data(leaderboard)))
+                if rules_version:
+                    cursor.execute('''
+                        DELETE FROM leaderboard_checkpoints WHERE rules_version = ? AND event_id NOT IN (
+                            SELECT event_id FROM leaderboard_checkpoints WHERE rules_version = ? ORDER BY event_id DESC LIMIT ?
+                        )
+                    ''', (rules_version, rules_version, keep))
+                conn.commit()
+        except Exception as e:
+            logging.error("[database.py] [save_leaderboard_checkpoint] Error saving leaderboard checkpoint: %s", e)
+            raise
+
+    def get_leaderboard_checkpoint(self, rules_version=None):
+        """
+        Get the newest checkpoint valid under rules_version as (event_id, leaderboard).
+        With rules_version None only the base checkpoint is used; (0, {}) if there is none.
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT event_id, leaderboard FROM leaderboard_checkpoints
+                WHERE rules_version = 0 OR rules_version = ? ORDER BY event_id DESC, rules_version DESC LIMIT 1
+            ''', (rules_version or 0,))
+            row = cursor.fetchone()
+        if row is None:
+            return 0, {}
+        return row[0], self.decompress_data(row[1]) or {}
+
+    def get_leaderboard_checkpoints(self):
+        """Get all checkpoints as a list of dicts (used by export)"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT rules_version, event_id, created_at, leaderboard FROM leaderboard_checkpoints ORDER BY rules_version, event_id")
+                return [
+                    {'rules_version': rules_version, 'event_id': event_id, 'created_at': created_at,
+                     'leaderboard': self.decompress_data(compressed) or {}}
+                    for rules_version, event_id, created_at, compressed in cursor.fetchall()
+                ]
+        except Exception as e:
+            logging.error("[database.py] [get_leaderboard_checkpoints] Error getting leaderboard checkpoints: %s", e)
+            return []
+
+    def update_leaderboard_checkpoints(self, checkpoints):
+        """Restore checkpoints (used by import)"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.executemany('''
+                    INSERT OR REPLACE INTO leaderboard_checkpoints (rules_version, event_id, created_at, leaderboard)
+                    VALUES (?, ?, ?, ?)
+                ''', [
+                    (c['rules_version'], c['event_id'], c['created_at'], self.compress_data(c['leaderboard']))
+                    for c in checkpoints
+                ])
+                conn.commit()
+        except Exception as e:
+            logging.error("[database.py] [update_leaderboard_checkpoints] Error updating leaderboard checkpoints: %s", e)
+            raise
+
+    def record_issue_results(self, results, leaderboard_updates, answer_events=()):
+        """
+        Journal scored issues and apply their leaderboard delta in a single transaction.
+        results: list of (issue_number, outcome, comment); leaderboard_updates: {username: stats}
+        for the users whose rows changed; answer_events: the scored answers, as for
+        append_answer_events. Entries are journaled as 'scored' until mark_issues_closed.
+        """
+        try:
+            applied_at = datetime.now().isoformat()
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                for username, data in leaderboard_updates.items():
+                    self._write_leaderboard_row(cursor, username, data)
+                self._append_answer_events(cursor, answer_events)
+                cursor.executemany('''
+                    INSERT OR REPLACE INTO processed_issues (issue_number, status, applied_at, outcome, comment)
+                    VALUES (?, 'scored', ?, ?, ?)
+                ''', [(number, applied_at, outcome, comment) for number, outcome, comment in results])
+                conn.commit()
+        except Exception as e:
+            logging.error("[database.py] [record_issue_results] Error recording issue results: %s", e)
+            raise
+
+    def mark_issues_closed(self, issue_numbers):
+        """Mark journaled issues whose GitHub comment and close went through"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.executemany("UPDATE processed_issues SET status = 'closed' WHERE issue_number = ?",
+                                   [(number,) for number in issue_numbers])
+                conn.commit()
+        except Exception as e:
+            logging.error("[database.py] [mark_issues_closed] Error marking issues closed: %s", e)
+            raise
+
+    def get_processed_issues(self, issue_numbers=None):
+        """Get the processed issues journal keyed by issue number, only the given issue numbers if any"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                if issue_numbers is None:
+                    cursor.execute("SELECT issue_number, status, applied_at, outcome, comment FROM processed_issues")
+                else:
+                    issue_numbers = list(issue_numbers)
+                    cursor.execute("SELECT issue_number, status, applied_at, outcome, comment FROM processed_issues "
+                                   f"WHERE issue_number IN ({', '.join('?' * len(issue_numbers))})", issue_numbers)
+                return {
+                    number: {'status': status, 'applied_at': applied_at, 'outcome': outcome, 'comment': comment}
+                    for number, status, applied_at, outcome, comment in cursor.fetchall()
+                }
+        except Exception as e:
+            logging.error("[database.py] [get_processed_issues] Error getting processed issues: %s", e)
+            return {}
+
+    def update_processed_issues(self, processed_issues):
+        """Restore journal entries (used by import)"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.executemany('''
+                    INSERT OR REPLACE INTO processed_issues (issue_number, status, applied_at, outcome, comment)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', [
+                    (int(number), entry['status'], entry['applied_at'], entry.get('outcome'), entry.get('comment'))
+                    for number, entry in processed_issues.items()
+                ])
+                conn.commit()
+        except Exception as e:
+            logging.error("[database.py] [update_processed_issues] Error updating processed issues: %s", e)
+            raise
+
+    def get_wikipedia_link(self, link_key):
+        """Cached Wikipedia link for a question/answer key, or None"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT url FROM wikipedia_links WHERE link_key = ?", (link_key,))
+                row = cursor.fetchone()
+                return row[0] if row else None
+        except Exception as e:
+            logging.error("[database.py] [get_wikipedia_link] Error getting Wikipedia link: %s", e)
+            return None
+
+    def save_wikipedia_link(self, link_key, url, source):
+        """Cache the Wikipedia link for a question/answer key"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("INSERT OR REPLACE INTO wikipedia_links (link_key, url, source, created_at) VALUES (?, ?, ?, ?)",
+                               (link_key, url, source, datetime.now().isoformat()))
+                conn.commit()
+        except Exception as e:
+            logging.error("[database.py] [save_wikipedia_link] Error saving Wikipedia link: %s", e)
+
+    def get_wikipedia_links(self):
+        """All cached Wikipedia links keyed by link_key (used by export)"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT link_key, url, source, created_at FROM wikipedia_links")
+                return {key: {'url': url, 'source': source, 'created_at': created_at} for key, url, source, created_at in cursor.fetchall()}
+        except Exception as e:
+            logging.error("[database.py] [get_wikipedia_links] Error getting Wikipedia links: %s", e)
+            return {}
+
+    def update_wikipedia_links(self, links):
+        """Restore cached Wikipedia links (used by import)"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.executemany("INSERT OR REPLACE INTO wikipedia_links (link_key, url, source, created_at) VALUES (?, ?, ?, ?)",
+                                   [(key, entry['url'], entry['source'], entry['created_at']) for key, entry in links.items()])
+                conn.commit()
+        except Exception as e:
+            logging.error("[database.py] [update_wikipedia_links] Error updating Wikipedia links: %s", e)
+            raise
+
     def update_daily_facts(self, facts_data):
         """Update daily facts with compressed data (timestamp as PK)"""
         try:
             with sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
+                added = {}
                 for timestamp, fact_data in facts_data.items():
                     cursor.execute('''
                         INSERT OR IGNORE INTO daily_facts (timestamp, fact)
                         VALUES (?, ?)
                     ''', (timestamp, fact_data['fact']))
+                    if cursor.rowcount:
+                        added[timestamp] = fact_data['fact']
+                self._index_similarity(cursor, 'fact', added)
                 conn.commit()
         except Exception as e:
             logging.error("[database.py] [update_daily_facts] Error updating daily facts: %s", e)
@@ -361,6 +764,17 @@ class TriviaDatabase:
             logging.error("[database.py] [get_trivia_questions] Error getting trivia questions: %s", e)
             return {}
     
+    def get_trivia_question_texts(self):
+        """Get the text of every trivia question asked, without decompressing options"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT question FROM trivia_questions")
+                return [question for question, in cursor.fetchall()]
+        except Exception as e:
+            logging.error("[database.py] [get_trivia_question_texts] Error getting trivia question texts: %s", e)
+            return []
+
     def update_trivia_questions(self, trivia_data):
         """Update trivia questions with compressed data (timestamp as PK)"""
         try:
@@ -379,11 +793,239 @@ class TriviaDatabase:
                         question_data.get('correct_answer', ''),
                         question_data.get('explanation', '')
                     ))
+                    # A queued question is used up once it is saved
+                    cursor.execute("DELETE FROM trivia_queue WHERE question = ?", (question_data.get('question', ''),))
+                self._index_similarity(cursor, 'trivia', {timestamp: question_data.get('question', '') for timestamp, question_data in trivia_data.items()})
                 conn.commit()
         except Exception as e:
             logging.error("[database.py] [update_trivia_questions] Error updating trivia questions: %s", e)
             raise
     
+    def _index_similarity(self, cursor, kind, items, skip_indexed=False):
+        """
+        (Re)index {item_key: text} of one kind in the similarity index, inside the caller's transaction.
+        skip_indexed leaves out items the index already holds with the same text.
+        """
+        if skip_indexed and items:
+            cursor.execute("SELECT item_key, text FROM similarity_signatures WHERE kind = ?", (kind,))
+            indexed = dict(cursor.fetchall())
+            items = {item_key: text for item_key, text in items.items() if indexed.get(item_key) != text}
+        entries = index_entries(kind, items)
+        cursor.executemany("DELETE FROM similarity_buckets WHERE kind = ? AND item_key = ?", [(kind, item_key) for item_key, _, _ in entries])
+        cursor.executemany("INSERT OR REPLACE INTO similarity_signatures (kind, item_key, text, signature) VALUES (?, ?, ?, ?)",
+                           [(kind, item_key, items[item_key], signature) for item_key, signature, _ in entries])
+        cursor.executemany("INSERT OR IGNORE INTO similarity_buckets (kind, bucket, item_key) VALUES (?, ?, ?)",
+                           [(kind, bucket, item_key) for item_key, _, buckets in entries for bucket in buckets])
+
+    def update_similarity_index(self, kind, items, skip_indexed=False):
+        """Index {item_key: text} of one kind ('trivia' or 'fact') for near-duplicate checks, see _index_similarity"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                self._index_similarity(conn.cursor(), kind, items, skip_indexed)
+                conn.commit()
+        except Exception as e:
+            logging.error("[database.py] [update_similarity_index] Error updating similarity index: %s", e)
+            raise
+
+    def get_similarity_texts(self):
+        """Indexed texts as {kind: {item_key: text}}, including those whose source row was pruned"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT kind, item_key, text FROM similarity_signatures")
+                texts = {}
+                for kind, item_key, text in cursor.fetchall():
+                    texts.setdefault(kind, {})[item_key] = text
+                return texts
+        except Exception as e:
+            logging.error("[database.py] [get_similarity_texts] Error getting similarity index texts: %s", e)
+            return {}
+
+    def get_similarity_candidates(self, kind, buckets):
+        """Signatures of the items of one kind that share at least one LSH bucket, as {item_key: signature}"""
+        if not buckets:
+            return {}
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute(f'''
+                    SELECT s.item_key, s.signature FROM similarity_signatures s
+                    WHERE s.kind = ? AND s.item_key IN (
+                        SELECT item_key FROM similarity_buckets WHERE kind = ? AND bucket IN ({", ".join("?" * len(buckets))})
+                    )
+                ''', (kind, kind, *buckets))
+                return dict(cursor.fetchall())
+        except Exception as e:
+            logging.error("[database.py] [get_similarity_candidates] Error querying similarity index: %s", e)
+            return {}
+
+    def rebuild_similarity_index(self):
+        """
+        Re-sign every indexed text plus any trivia question or daily fact missing from the index,
+        e.g. after changing the SIMILARITY_* settings. Returns the number of indexed items.
+        """
+        texts = self.get_similarity_texts()
+        texts.setdefault('trivia', {}).update({timestamp: q['question'] for timestamp, q in self.get_trivia_questions().items()})
+        texts.setdefault('fact', {}).update({timestamp: f['fact'] for timestamp, f in self.get_daily_facts().items()})
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("DELETE FROM similarity_buckets")
+                cursor.execute("DELETE FROM similarity_signatures")
+                for kind, items in texts.items():
+                    self._index_similarity(cursor, kind, items)
+                conn.commit()
+        except Exception as e:
+            logging.error("[database.py] [rebuild_similarity_index] Error rebuilding similarity index: %s", e)
+            raise
+        indexed = sum(len(items) for items in texts.values())
+        logging.info("[database.py] [rebuild_similarity_index] Indexed %s trivia questions and daily facts", indexed)
+        return indexed
+
+    def enqueue_trivia(self, questions):
+        """Append trivia questions to the queue, skipping questions already queued; returns how many were added"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                before = conn.total_changes
+                cursor.executemany('''
+                    INSERT OR IGNORE INTO trivia_queue (question, options, correct_answer, category, explanation, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', [
+                    (q['question'], json.dumps(q['options']), q['correct_answer'], q.get('category'), q.get('explanation', ''),
+                     q.get('created_at') or datetime.now().isoformat())
+                    for q in questions
+                ])
+                conn.commit()
+                return conn.total_changes - before
+        except Exception as e:
+            logging.error("[database.py] [enqueue_trivia] Error queueing trivia questions: %s", e)
+            raise
+
+    def get_trivia_queue(self):
+        """Queued trivia questions, oldest first"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT question, options, correct_answer, category, explanation, created_at FROM trivia_queue ORDER BY queue_id")
+                return [
+                    {'question': question, 'options': json.loads(options), 'correct_answer': correct_answer,
+                     'category': category, 'explanation': explanation, 'created_at': created_at}
+                    for question, options, correct_answer, category, explanation, created_at in cursor.fetchall()
+                ]
+        except Exception as e:
+            logging.error("[database.py] [get_trivia_queue] Error getting trivia queue: %s", e)
+            return []
+
+    def count_trivia_queue(self):
+        """Number of queued trivia questions"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                return conn.execute("SELECT COUNT(*) FROM trivia_queue").fetchone()[0]
+        except Exception as e:
+            logging.error("[database.py] [count_trivia_queue] Error counting trivia queue: %s", e)
+            return 0
+
+    def pop_trivia(self, skip_questions=()):
+        """
+        Remove and return the oldest queued question not in skip_questions, or None if there is none.
+        Skipped questions are dropped from the queue as well.
+        """
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT queue_id, question, options, correct_answer, category, explanation FROM trivia_queue ORDER BY queue_id")
+                for queue_id, question, options, correct_answer, category, explanation in cursor.fetchall():
+                    cursor.execute("DELETE FROM trivia_queue WHERE queue_id = ?", (queue_id,))
+                    if question in skip_questions:
+                        continue
+                    conn.commit()
+                    return {'question': question, 'options': json.loads(options), 'correct_answer': correct_answer,
+                            'category': category, 'explanation': explanation}
+                conn.commit()
+                return None
+        except Exception as e:
+            logging.error("[database.py] [pop_trivia] Error popping trivia queue: %s", e)
+            return None
+
+    def record_model_usage(self, usage):
+        """Store one chat completion's usage row (a dict with the MODEL_USAGE_COLUMNS but usage_id)"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                columns = MODEL_USAGE_COLUMNS[1:]
+                conn.execute(f"INSERT INTO model_usage ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                             [usage.get(column) for column in columns])
+                conn.commit()
+        except Exception as e:
+            logging.error("[database.py] [record_model_usage] Error recording model usage: %s", e)
+            raise
+
+    def get_model_usage(self, since=None):
+        """Usage rows, oldest first, optionally only those created at or after the ISO timestamp since"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                query = f"SELECT {', '.join(MODEL_USAGE_COLUMNS)} FROM model_usage"
+                if since:
+                    rows = conn.execute(query + " WHERE created_at >= ? ORDER BY usage_id", (since,)).fetchall()
+                else:
+                    rows = conn.execute(query + " ORDER BY usage_id").fetchall()
+                return [dict(zip(MODEL_USAGE_COLUMNS, row)) for row in rows]
+        except Exception as e:
+            logging.error("[database.py] [get_model_usage] Error getting model usage: %s", e)
+            return []
+
+    def update_model_usage(self, rows):
+        """Restore usage rows (used by import); rows already present are kept"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                conn.executemany(f"INSERT OR IGNORE INTO model_usage ({', '.join(MODEL_USAGE_COLUMNS)}) "
+                                 f"VALUES ({', '.join('?' * len(MODEL_USAGE_COLUMNS))})",
+                                 [[row.get(column) for column in MODEL_USAGE_COLUMNS] for row in rows])
+                conn.commit()
+        except Exception as e:
+            logging.error("[database.py] [update_model_usage] Error updating model usage: %s", e)
+            raise
+
+    def get_run_marks(self):
+        """Newest answer event and model usage ids, taken before a run so get_run_log can tell its rows apart"""
+        with sqlite3.connect(self.db_path) as conn:
+            return {
+                'answer_events': conn.execute("SELECT COALESCE(MAX(event_id), 0) FROM answer_events").fetchone()[0],
+                'model_usage': conn.execute("SELECT COALESCE(MAX(usage_id), 0) FROM model_usage").fetchone()[0],
+            }
+
+    def get_run_log(self, marks):
+        """
+        Rows a run appended since get_run_marks returned marks, without their ids, plus the processed
+        issues journal. Each workflow job works on its own copy of the database; update-db merges the
+        jobs' run logs into the copy that is exported (see apply_run_log).
+        """
+        answer_events = [list(row[1:]) for chunk in self.iter_answer_events(after_event_id=marks['answer_events']) for row in chunk]
+        model_usage = [{column: row[column] for column in MODEL_USAGE_COLUMNS[1:]}
+                       for row in self.get_model_usage() if row['usage_id'] > marks['model_usage']]
+        return {"answer_events": answer_events, "processed_issues": self.get_processed_issues(), "model_usage": model_usage}
+
+    def apply_run_log(self, run_log):
+        """Append a run log's answer events and model usage and merge its journal entries in one transaction"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                self._append_answer_events(cursor, run_log.get("answer_events", []))
+                columns = MODEL_USAGE_COLUMNS[1:]
+                cursor.executemany(f"INSERT INTO model_usage ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                                   [[usage.get(column) for column in columns] for usage in run_log.get("model_usage", [])])
+                cursor.executemany('''
+                    INSERT OR REPLACE INTO processed_issues (issue_number, status, applied_at, outcome, comment)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', [
+                    (int(number), entry['status'], entry['applied_at'], entry.get('outcome'), entry.get('comment'))
+                    for number, entry in run_log.get("processed_issues", {}).items()
+                ])
+                conn.commit()
+        except Exception as e:
+            logging.error("[database.py] [apply_run_log] Error applying run log: %s", e)
+            raise
+
     def export_compressed_data(self, output_dir=DB_DIR):
         """Export all database tables to a single compressed file for GitHub Actions"""
         Path(output_dir).mkdir(parents=True, exist_ok=True)
@@ -393,20 +1035,28 @@ class TriviaDatabase:
             "leaderboard": self.get_leaderboard(),
             "daily_facts": self.get_daily_facts(),
             "trivia_questions": self.get_trivia_questions(),
+            "processed_issues": self.get_processed_issues(),
+            "answer_events": [list(row) for chunk in self.iter_answer_events() for row in chunk],
+            "leaderboard_checkpoints": self.get_leaderboard_checkpoints(),
+            "wikipedia_links": self.get_wikipedia_links(),
+            "trivia_queue": self.get_trivia_queue(),
+            "similarity_texts": self.get_similarity_texts(),
+            "model_usage": self.get_model_usage(),
             "export_timestamp": datetime.now().isoformat()
         }
         
         # Export to single compressed file
         compressed_data = self.compress_data(all_data)
         encrypted = self.encrypt_data(compressed_data)
-        with open(DB_COMPRESSED_PATH, "wb") as f:
+        Path(self.compressed_path).parent.mkdir(parents=True, exist_ok=True)
+        with open(self.compressed_path, "wb") as f:
             f.write(encrypted)
         
         logging.info("[database.py] [export_compressed_data] Database exported to single encrypted compressed file")
     
     def import_compressed_data(self, input_dir=DB_DIR):
         """Import single compressed data file into database (for backup restoration)"""
-        database_path = DB_COMPRESSED_PATH
+        database_path = self.compressed_path
         if os.path.exists(database_path):
             with open(database_path, "rb") as f:
                 encrypted = f.read()
@@ -433,6 +1083,25 @@ class TriviaDatabase:
                     self.update_daily_facts(all_data["daily_facts"])
                 if "trivia_questions" in all_data:
                     self.update_trivia_questions(all_data["trivia_questions"])
+                if "processed_issues" in all_data:
+                    self.update_processed_issues(all_data["processed_issues"])
+                if "answer_events" in all_data:
+                    self.update_answer_events(all_data["answer_events"])
+                if "leaderboard_checkpoints" in all_data:
+                    self.update_leaderboard_checkpoints(all_data["leaderboard_checkpoints"])
+                elif "leaderboard" in all_data:
+                    # Export from before the event log: its leaderboard is the base checkpoint
+                    self.save_leaderboard_checkpoint(0, all_data["leaderboard"], rules_version=0)
+                if "wikipedia_links" in all_data:
+                    self.update_wikipedia_links(all_data["wikipedia_links"])
+                if "trivia_queue" in all_data:
+                    self.enqueue_trivia(all_data["trivia_queue"])
+                if "model_usage" in all_data:
+                    self.update_model_usage(all_data["model_usage"])
+                # Signatures are derived data; only the texts are exported, pruned ones included.
+                # The imported questions and facts were indexed above, so only the pruned ones are left to sign
+                for kind, items in all_data.get("similarity_texts", {}).items():
+                    self.update_similarity_index(kind, items, skip_indexed=True)
         else:
             print("❌ No compressed database file found") 
 
@@ -473,4 +1142,30 @@ class TriviaDatabase:
                 conn.commit()
             logging.info(f"[database.py] [prune_leaderboard] Pruned {deleted} leaderboard entries with last_answered before {cutoff}.")
         except Exception as e:
-            logging.error("[database.py] [prune_leaderboard] Error pruning leaderboard: %s", e) 
\ No newline at end of file
+            logging.error("[database.py] [prune_leaderboard] Error pruning leaderboard: %s", e)
+
+    def prune_processed_issues(self, days=30):
+        """Delete processed issue journal entries closed more than the specified number of days ago."""
+        try:
+            cutoff = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("DELETE FROM processed_issues WHERE status = 'closed' AND substr(applied_at, 1, 10) < ?", (cutoff,))
+                deleted = cursor.rowcount
+                conn.commit()
+            logging.info(f"[database.py] [prune_processed_issues] Pruned {deleted} processed issues older than {cutoff}.")
+        except Exception as e:
+            logging.error("[database.py] [prune_processed_issues] Error pruning processed issues: %s", e)
+
+    def prune_model_usage(self, days=180):
+        """Delete model usage rows older than the specified number of days."""
+        try:
+            cutoff = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("DELETE FROM model_usage WHERE substr(created_at, 1, 10) < ?", (cutoff,))
+                deleted = cursor.rowcount
+                conn.commit()
+            logging.info(f"[database.py] [prune_model_usage] Pruned {deleted} model usage rows older than {cutoff}.")
+        except Exception as e:
+            logging.error("[database.py] [prune_model_usage] Error pruning model usage: %s", e)
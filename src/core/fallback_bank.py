@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Fallback Bank Module - Compiles the fallback trivia questions into a compact binary bank indexed
+by category, and samples questions that were not asked yet from it through a memory map
+"""
+
+import json
+import mmap
+import random
+import struct
+import tempfile
+import zlib
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from core.config import TRIVIA_CATEGORIES, FALLBACK_BANK_SOURCE, FALLBACK_BANK_PATH, FALLBACK_SAMPLE_TRIES
+from core.daily_trivia import normalize_question, validate_trivia
+import logging
+logging.basicConfig(level=logging.INFO, format='[%(levelname)s] %(message)s')
+
+# Layout, little-endian: header, one CATEGORY row per category, one ENTRY row per question plus an
+# end marker, then the records. Entries are grouped by category, so a category is a range of the
+# index, and a record's length is the distance to the next entry's offset.
+BANK_MAGIC = b"TQBK"
+BANK_VERSION = 1
+HEADER = struct.Struct('<4sHHIqq')  # magic, version, categories, questions, source size, source mtime_ns
+CATEGORY = struct.Struct('<16sII')  # NUL-padded name, first entry, entry count
+ENTRY = struct.Struct('<II')  # record offset, CRC-32 of the normalized question
+FIELD_SEP = '\x1f'
+BANK_CATEGORIES = list(TRIVIA_CATEGORIES) + ["general"]
+LETTERS = ('A', 'B', 'C')
+
+def question_key(question):
+    """32-bit key of a question, equal for questions that differ only in case, spacing or punctuation"""
+    return zlib.crc32(normalize_question(question).encode('utf-8'))
+
+def _read_source(source):
+    by_category = {}
+    known = set()
+    with open(source, encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            trivia = json.loads(line)
+            problems = validate_trivia(trivia, known)
+            if trivia.get('category') not in BANK_CATEGORIES:
+                problems.append(f"unknown category {trivia.get('category')!r}")
+            if FIELD_SEP in line:
+                problems.append("contains the field separator")
+            if problems:
+                raise ValueError(f"{source}:{line_number}: {', '.join(problems)}")
+            known.add(normalize_question(trivia['question']))
+            by_category.setdefault(trivia['category'], []).append(trivia)
+    if not by_category:
+        raise ValueError(f"{source} has no questions")
+    return by_category
+
+def compile_bank(source=FALLBACK_BANK_SOURCE, path=FALLBACK_BANK_PATH):
+    """
+    Compile the JSON Lines source (one question per line, as stored in trivia_questions plus its
+    category) into the binary bank at path. Every question is validated and must be unique.
+    Returns {'questions', 'categories', 'bytes'}.
+    """
+    by_category = _read_source(source)
+    stat = os.stat(source)
+    categories, entries, records = [], [], []
+    offset = 0
+    for name in sorted(by_category, key=BANK_CATEGORIES.index):
+        categories.append(CATEGORY.pack(name.encode('utf-8'), len(entries), len(by_category[name])))
+        for trivia in by_category[name]:
+            record = FIELD_SEP.join([name, trivia['question'], *(trivia['options'][letter] for letter in LETTERS),
+                                     trivia['correct_answer'], trivia['explanation']]).encode('utf-8')
+            entries.append(ENTRY.pack(offset, question_key(trivia['question'])))
+            records.append(record)
+            offset += len(record)
+    entries.append(ENTRY.pack(offset, 0))
+    data = b"".join([HEADER.pack(BANK_MAGIC, BANK_VERSION, len(categories), len(entries) - 1, stat.st_size, stat.st_mtime_ns),
+                     *categories, *entries, *records])
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    # Processes that have the old bank mapped keep reading it; new ones see the complete new file
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+    logging.info("[fallback_bank.py] [compile_bank] Compiled %s questions in %s categories into %s (%s bytes)",
+                 len(entries) - 1, len(categories), path, len(data))
+    return {'questions': len(entries) - 1, 'categories': len(categories), 'bytes': len(data)}
+
+def bank_is_current(path=FALLBACK_BANK_PATH, source=FALLBACK_BANK_SOURCE):
+    """True if the bank at path exists and was compiled from the source as it is now"""
+    try:
+        with open(path, 'rb') as f:
+            magic, version, _, _, size, mtime_ns = HEADER.unpack(f.read(HEADER.size))
+    except (OSError, struct.error):
+        return False
+    if magic != BANK_MAGIC or version != BANK_VERSION:
+        return False
+    try:
+        stat = os.stat(source)
+    except FileNotFoundError:
+        return True  # Deployed without its source
+    return (size, mtime_ns) == (stat.st_size, stat.st_mtime_ns)
+
+class FallbackBank:
+    """Read-only view of a compiled bank; only the records that are sampled are ever decoded"""
+
+    def __init__(self, path=FALLBACK_BANK_PATH):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, category_count, self.size, _, _ = HEADER.unpack_from(self._map, 0)
+        if magic != BANK_MAGIC or version != BANK_VERSION:
+            raise ValueError(f"{path} is not a version {BANK_VERSION} fallback bank")
+        self.categories = {}
+        for i in range(category_count):
+            name, first, count = CATEGORY.unpack_from(self._map, HEADER.size + i * CATEGORY.size)
+            self.categories[name.rstrip(b'\0').decode('utf-8')] = (first, count)
+        self._entries = HEADER.size + category_count * CATEGORY.size
+        self._records = self._entries + (self.size + 1) * ENTRY.size
+
+    def __len__(self):
+        return self.size
+
+    def key(self, index):
+        """question_key of entry index, read from the index without decoding the record"""
+        return ENTRY.unpack_from(self._map, self._entries + index * ENTRY.size)[1]
+
+    def entry(self, index):
+        """Trivia dict of entry index, options in their compiled order"""
+        start, _, end, _ = struct.unpack_from('<IIII', self._map, self._entries + index * ENTRY.size)
+        category, question, a, b, c, correct, explanation = \
+            self._map[self._records + start:self._records + end].decode('utf-8').split(FIELD_SEP)
+        return {"question": question, "options": {"A": a, "B": b, "C": c}, "correct_answer": correct,
+                "category": category, "explanation": explanation}
+
+    def sample(self, category=None, used=frozenset(), rng=random):
+        """
+        A random question of category (of any category when it is None or not in the bank) whose
+        question_key is not in used, with its options shuffled. Each draw is O(1): a random slot
+        of the category's range is checked by its stored key and only the chosen record is
+        decoded. After FALLBACK_SAMPLE_TRIES used draws the category and then the whole bank are
+        scanned in random order. Returns None once every question has been used.
+        """
+        first, count = self.categories.get(category, (0, self.size))
+        index = None
+        for _ in range(FALLBACK_SAMPLE_TRIES):
+            candidate = first + rng.randrange(count)
+            if self.key(candidate) not in used:
+                index = candidate
+                break
+        else:
+            for start, length in ((first, count), (0, self.size)):
+                index = next((i for i in rng.sample(range(start, start + length), length) if self.key(i) not in used), None)
+                if index is not None:
+                    break
+        if index is None:
+            return None
+        trivia = self.entry(index)
+        letters = list(LETTERS)
+        rng.shuffle(letters)
+        trivia["options"] = {new: trivia["options"][old] for new, old in sorted(zip(letters, LETTERS))}
+        trivia["correct_answer"] = letters[LETTERS.index(trivia["correct_answer"])]
+        return trivia
+
+_bank = None
+
+def get_bank():
+    """The process-wide bank, compiled first when the bank file is missing or older than its source"""
+    global _bank
+    if _bank is None:
+        if not bank_is_current():
+            compile_bank()
+        _bank = FallbackBank()
+    return _bank
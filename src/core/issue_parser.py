@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Issue Parser Module - Single-pass parsing of trivia answer issues
+"""
+
+import codecs
+import json
+import re
+from collections import namedtuple
+
+# Title format: "Trivia Answer A"
+_TITLE_ANSWER_RE = re.compile(r'Trivia Answer ([ABC])(?!\w)')
+# Letter at the start of an answer line: "**Answer:** A"
+_ANSWER_LETTER_RE = re.compile(r'([ABC])(?!\w)')
+# Every body token in one alternation. The pattern starts with a plain character class so the
+# regex engine can skip ahead to candidate characters in C instead of trying each branch at every
+# position; each branch then checks the consumed character with a lookbehind. The answer line is
+# captured through a lookahead so dates on the same line are still seen by the scan.
+_BODY_TOKEN_RE = re.compile(
+    r'[*IT0-9](?:'
+    r'(?<=\*)\*Answer:\*\*[ \t]*(?=(?P<answer>[^\r\n]*))'
+    r'|(?<=I) choose (?P<choose>[ABC])'
+    r'|(?<=\*)\*Trivia Date:\*\*\s*(?P<bold_date>[0-9.\-]+)'
+    r'|(?<=T)rivia Date:\s*(?P<plain_date>[0-9.\-]+)'
+    r'|(?<=[0-9])[0-9]{3}-[0-9]{2}-[0-9]{2}(?P<iso_date>)'
+    r'|(?<=[0-9])[0-9]\.[0-9]{2}\.[0-9]{4}(?P<dotted_date>)'
+    r')'
+)
+
+# answer_format: 'title', 'answer_letter', 'answer_text', 'i_choose' or None
+# date_format: 'bold', 'plain', 'iso', 'dotted' or None; trivia_date itself is always YYYY-MM-DD
+# answer_lines: every text found after '**Answer:**', in body order
+ParsedIssue = namedtuple('ParsedIssue', ['answer', 'answer_text', 'trivia_date', 'answer_format', 'date_format', 'answer_lines'])
+
+def normalize_trivia_date(date):
+    """Convert a DD.MM.YYYY trivia date, as used in answer links, to the YYYY-MM-DD key of the trivia"""
+    if len(date) == 10 and date[2] == '.' and date[5] == '.':
+        return f"{date[6:]}-{date[3:5]}-{date[:2]}"
+    return date
+
+def trivia_date_key(trivia):
+    """Date key used by answer links: explicit 'date' or the date part of the timestamp"""
+    return trivia.get('date') or (trivia.get('timestamp') or '')[:10] or None
+
+class AnswerMatcher:
+    """
+    Compiled index of the option texts of every known trivia date.
+
+    Built once per run from trivia_questions_by_date; every option text is folded into a
+    single alternation regex, so matching an issue body is one scan with no database access.
+    """
+
+    def __init__(self, trivia_questions_by_date):
+        # option text -> {trivia date: option letter}
+        self.options_by_text = {}
+        for date, trivia in trivia_questions_by_date.items():
+            for letter, text in (trivia.get('options') or {}).items():
+                if text:
+                    self.options_by_text.setdefault(str(text), {})[date] = letter
+        # Longest texts first so "2007 edition" wins over "2007" at the same position
+        texts = sorted(self.options_by_text, key=len, reverse=True)
+        self.pattern = None
+        if texts:
+            self.pattern = re.compile('|'.join(re.escape(t) for t in texts))
+
+    def match_text(self, text, trivia_date=None):
+        """
+        Return the option letter whose text starts the given answer text, or None.
+        If the text belongs to several trivia dates, trivia_date picks the right one;
+        without a date the text must map to the same letter everywhere.
+        """
+        if self.pattern is None or not text:
+            return None
+        match = self.pattern.match(text)
+        if not match:
+            return None
+        letters_by_date = self.options_by_text[match.group(0)]
+        if trivia_date is not None:
+            return letters_by_date.get(trivia_date)
+        letters = set(letters_by_date.values())
+        if len(letters) == 1:
+            return letters.pop()
+        return None
+
+    def match(self, body, trivia_date=None):
+        """Return the option letter named by the first matching '**Answer:**' line in body, or None"""
+        for answer_text in parse_issue({'body': body}).answer_lines:
+            option = self.match_text(answer_text, trivia_date)
+            if option:
+                return option
+        return None
+
+def parse_issue(issue, answer_matcher=None):
+    """
+    Extract answer letter, answer text and trivia date from an issue in a single scan of its body.
+    Answer texts are only resolved to letters when an AnswerMatcher is given.
+    """
+    title = issue.get('title') or ''
+    body = issue.get('body') or ''
+
+    answer_lines = []
+    letter_answer = choose_answer = None
+    bold_date = plain_date = iso_date = dotted_date = None
+    for match in _BODY_TOKEN_RE.finditer(body):
+        answer_line = match.group('answer')
+        if answer_line is not None:
+            answer_lines.append(answer_line.strip())
+            if letter_answer is None:
+                letter = _ANSWER_LETTER_RE.match(answer_line)
+                if letter:
+                    letter_answer = letter.group(1)
+        elif match.group('choose'):
+            choose_answer = choose_answer or match.group('choose')
+        elif match.group('bold_date'):
+            bold_date = bold_date or match.group('bold_date')
+        elif match.group('plain_date'):
+            plain_date = plain_date or match.group('plain_date')
+        elif match.group('iso_date') is not None:
+            # Date branches match the whole token, leading digit included
+            iso_date = iso_date or match.group(0)
+        else:
+            dotted_date = dotted_date or match.group(0)
+
+    trivia_date, date_format = None, None
+    for date, fmt in ((bold_date, 'bold'), (plain_date, 'plain'), (iso_date, 'iso'), (dotted_date, 'dotted')):
+        if date:
+            trivia_date, date_format = normalize_trivia_date(date), fmt
+            break
+
+    answer, answer_format = None, None
+    title_match = _TITLE_ANSWER_RE.search(title)
+    if title_match:
+        answer, answer_format = title_match.group(1), 'title'
+    elif letter_answer:
+        answer, answer_format = letter_answer, 'answer_letter'
+    else:
+        if answer_matcher is not None:
+            for answer_line in answer_lines:
+                answer = answer_matcher.match_text(answer_line, trivia_date)
+                if answer:
+                    answer_format = 'answer_text'
+                    break
+        if not answer and choose_answer:
+            answer, answer_format = choose_answer, 'i_choose'
+
+    answer_text = answer_lines[0] if answer_lines else None
+    return ParsedIssue(answer, answer_text, trivia_date, answer_format, date_format, answer_lines)
+
+
+class IssueRecord:
+    """
+    The fields process_answers reads from a GitHub issue payload, without the rest of it.
+
+    Supports the read-only mapping access used on raw payloads (issue['number'],
+    issue.get('title'), issue['user']['login'], issue.get('labels')), so records and webhook
+    payloads go through the same code.
+    """
+
+    __slots__ = ('number', 'title', 'body', 'login', 'created_at', 'node_id', 'labels')
+
+    def __init__(self, number, title, body, login, created_at=None, node_id=None, labels=()):
+        self.number = number
+        self.title = title
+        self.body = body
+        self.login = login
+        self.created_at = created_at
+        self.node_id = node_id
+        self.labels = labels
+
+    @classmethod
+    def from_payload(cls, issue):
+        labels = tuple(label['name'] for label in issue.get('labels') or () if isinstance(label, dict) and label.get('name'))
+        return cls(issue['number'], issue.get('title'), issue.get('body'), (issue.get('user') or {}).get('login'),
+                   issue.get('created_at'), issue.get('node_id'), labels)
+
+    def get(self, key, default=None):
+        if key == 'user':
+            return {'login': self.login}
+        if key == 'labels':
+            return [{'name': name} for name in self.labels]
+        if key in self.__slots__:
+            value = getattr(self, key)
+            return default if value is None else value
+        return default
+
+    def __getitem__(self, key):
+        if key != 'user' and key != 'labels' and key not in self.__slots__:
+            raise KeyError(key)
+        return self.get(key)
+
+    def __contains__(self, key):
+        return key == 'user' or key in self.__slots__
+
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+
+    def __repr__(self):
+        return f"IssueRecord(#{self.number} by {self.login}: {self.title!r})"
+
+_JSON_SEPARATORS = ' \t\r\n,'
+
+def iter_json_array(chunks, decoder=json.JSONDecoder()):
+    """
+    Yield the elements of a top-level JSON array one at a time from an iterable of byte chunks.
+    Only the undecoded tail of the input and the current element are held in memory.
+
+    An element that does not fit in the buffer is decoded again only once the buffer has doubled,
+    so large elements cost linear time. A value that ends right at the end of the buffer is only
+    yielded once more input confirms it is complete: "12" followed by "34" is 1234.
+    """
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    buffer, pos = '', 0
+    need = 0  # Undecoded characters the buffer must hold before the next decode attempt
+    started = exhausted = False
+    chunks = iter(chunks)
+    while True:
+        while pos < len(buffer) and buffer[pos] in _JSON_SEPARATORS:
+            pos += 1
+        if pos < len(buffer) and (exhausted or len(buffer) - pos >= need):
+            if not started:
+                if buffer[pos] != '[':
+                    raise ValueError(f"Expected a JSON array, got {buffer[pos:pos + 20]!r}")
+                started = True
+                pos += 1
+                continue
+            if buffer[pos] == ']':
+                return
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # Most likely the element continues in a later chunk
+                if exhausted:
+                    raise
+                need = 2 * (len(buffer) - pos)
+            else:
+                if end < len(buffer) or exhausted:
+                    pos, need = end, 0
+                    yield value
+                    continue
+                # A number cut off by the chunk boundary would decode as a shorter number
+                need = len(buffer) - pos + 1
+        elif exhausted:
+            raise ValueError("Unexpected end of JSON array")
+        # Collect chunks until the requested size is reached, then join once
+        parts, size = [buffer[pos:]], len(buffer) - pos
+        while True:
+            chunk = next(chunks, None)
+            if chunk is None:
+                exhausted = True
+                parts.append(text_decoder.decode(b'', final=True))
+                break
+            text = text_decoder.decode(chunk)
+            parts.append(text)
+            size += len(text)
+            if size >= need and size > 0:
+                break
+        buffer, pos = ''.join(parts), 0
+
+def iter_issue_records(response, chunk_size=64 * 1024):
+    """IssueRecords from a streamed (stream=True) GitHub issue list response, decoded incrementally"""
+    try:
+        for issue in iter_json_array(response.iter_content(chunk_size)):
+            yield IssueRecord.from_payload(issue)
+    finally:
+        response.close()
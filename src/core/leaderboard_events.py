@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Leaderboard Events Module - Rebuilds the leaderboard by replaying the answer event log
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from core.config import LEADERBOARD_REPLAY_CHUNK_SIZE, LEADERBOARD_CHECKPOINTS_KEPT
+from core.database import TriviaDatabase
+from core.points_system import calculate_points_for_streak, POINTS_RULES_VERSION
+import logging
+logging.basicConfig(level=logging.INFO, format='[%(levelname)s] %(message)s')
+
+ANSWER_HISTORY_LENGTH = 30  # Same cap as process_answers.update_user_stats
+
+# Leaderboard columns compared by a dry run
+PROJECTED_FIELDS = ('current_streak', 'total_correct', 'total_points', 'total_answered', 'last_trivia_date')
+
+def apply_answer_events(leaderboard, events):
+    """
+    Fold answer events into the leaderboard, in the order given.
+    Events are rows of (event_id, issue_number, username, trivia_date, answer, correct, answered_at)
+    and are applied with the same rules as process_answers.update_user_stats.
+    """
+    for _, _, username, trivia_date, _, correct, answered_at in events:
+        user_stats = leaderboard.get(username)
+        if user_stats is None:
+            if not correct:
+                continue  # Wrong answers never add a user
+            user_stats = leaderboard[username] = {
+                'current_streak': 0,
+                'total_correct': 0,
+                'total_points': 0,
+                'total_answered': 0,
+                'last_answered': None,
+                'last_trivia_date': None,
+                'answer_history': [],
+                'first_correct_date': None,
+            }
+        user_stats['total_answered'] += 1
+        user_stats['last_answered'] = answered_at
+        user_stats['last_trivia_date'] = trivia_date
+        history = user_stats['answer_history']
+        history.append({'date': trivia_date, 'timestamp': answered_at, 'correct': bool(correct)})
+        if len(history) > ANSWER_HISTORY_LENGTH:
+            del history[:-ANSWER_HISTORY_LENGTH]
+        if correct:
+            streak = user_stats['current_streak'] + 1
+            user_stats['current_streak'] = streak
+            user_stats['total_correct'] += 1
+            user_stats['total_points'] += calculate_points_for_streak(streak)
+            if not user_stats.get('first_correct_date'):
+                user_stats['first_correct_date'] = answered_at[:10]
+        else:
+            user_stats['current_streak'] = 0
+    return leaderboard
+
+def count_changed_users(old_leaderboard, new_leaderboard):
+    """Number of users whose projected columns differ between two leaderboards"""
+    changed = 0
+    for username in set(old_leaderboard) | set(new_leaderboard):
+        old = old_leaderboard.get(username)
+        new = new_leaderboard.get(username)
+        if old is None or new is None or any(old.get(f) != new.get(f) for f in PROJECTED_FIELDS):
+            changed += 1
+    return changed
+
+def find_lost_users(old_leaderboard, new_leaderboard):
+    """
+    Users of old_leaderboard that new_leaderboard drops or credits with fewer answers. Replaying
+    never loses answers that were recorded, so these point at events missing from the log.
+    """
+    return sorted(username for username, old in old_leaderboard.items()
+                  if username not in new_leaderboard
+                  or new_leaderboard[username].get('total_answered', 0) < old.get('total_answered', 0))
+
+def rebuild_leaderboard(full=False, dry_run=False, chunk_size=LEADERBOARD_REPLAY_CHUNK_SIZE, force=False):
+    """
+    Recompute the leaderboard from the answer event log.
+
+    Replay starts from the newest checkpoint taken under the current POINTS_RULES_VERSION, or from
+    the base checkpoint when full is set or no such checkpoint exists, and reads events in chunks
+    so memory stays bounded by the number of users. Unless dry_run is set, the result replaces the
+    leaderboard table and is stored as a new checkpoint. A result that drops users of the current
+    leaderboard or loses some of their answers raises RuntimeError instead, unless force is set.
+    Returns a summary dict.
+    """
+    db = TriviaDatabase()
+    start_event_id, leaderboard = db.get_leaderboard_checkpoint(None if full else POINTS_RULES_VERSION)
+    logging.info("[leaderboard_events.py] [rebuild_leaderboard] Replaying events after #%s (%s users in checkpoint)", start_event_id, len(leaderboard))
+
+    last_event_id = start_event_id
+    replayed = 0
+    for events in db.iter_answer_events(after_event_id=start_event_id, chunk_size=chunk_size):
+        apply_answer_events(leaderboard, events)
+        last_event_id = events[-1][0]
+        replayed += len(events)
+
+    current = db.get_leaderboard()
+    changed = count_changed_users(current, leaderboard)
+    lost = find_lost_users(current, leaderboard)
+    if lost:
+        logging.warning("[leaderboard_events.py] [rebuild_leaderboard] Replay drops or loses answers of %s user(s), e.g. %s",
+                        len(lost), ", ".join(lost[:5]))
+        if not dry_run and not force:
+            raise RuntimeError(f"Replay would drop or lose answers of {len(lost)} user(s) in the current leaderboard; "
+                               "the answer event log is incomplete. Rerun with force to replace the leaderboard anyway.")
+    if not dry_run:
+        db.update_leaderboard(leaderboard)
+        db.save_leaderboard_checkpoint(last_event_id, leaderboard, POINTS_RULES_VERSION, keep=LEADERBOARD_CHECKPOINTS_KEPT)
+        db.export_compressed_data()
+    logging.info("[leaderboard_events.py] [rebuild_leaderboard] Replayed %s events up to #%s; %s of %s users changed%s",
+                 replayed, last_event_id, changed, len(leaderboard), " (dry run)" if dry_run else "")
+    return {
+        "from_event_id": start_event_id,
+        "to_event_id": last_event_id,
+        "events": replayed,
+        "users": len(leaderboard),
+        "changed_users": changed,
+        "lost_users": len(lost),
+        "rules_version": POINTS_RULES_VERSION,
+    }
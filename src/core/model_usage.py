@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Model Usage Module - Records tokens, latency and retries of every chat completion by call site,
+and summarizes them with percentiles and an estimated cost for manage.py model-usage
+"""
+
+import math
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from core.config import MODEL_PRICES, MODEL_USAGE_REPORT_DAYS
+from core.database import TriviaDatabase
+import logging
+logging.basicConfig(level=logging.INFO, format='[%(levelname)s] %(message)s')
+
+CALL_SITES = ('trivia', 'wikipedia_link')
+PERCENTILES = (50, 90, 99)
+
+def _counting(func, attempts):
+    # Every attempt the retry policy makes goes through func, so counting calls counts attempts
+    def counted(*args, **kwargs):
+        attempts.append(time.perf_counter())
+        return func(*args, **kwargs)
+    return counted
+
+def usage_row(call_site, request, response, seconds, attempts, error=None):
+    """model_usage row for one completion; attempts is how often the API was called (0 when the cache answered)"""
+    usage = getattr(response, 'usage', None)
+    return {
+        'call_site': call_site,
+        'model': request.get('model'),
+        'prompt_tokens': getattr(usage, 'prompt_tokens', None),
+        'completion_tokens': getattr(usage, 'completion_tokens', None),
+        'latency_ms': seconds * 1000,
+        'retries': max(attempts - 1, 0),
+        'cached': int(attempts == 0 and error is None),
+        'status': 'ok' if error is None else 'error',
+        'error': None if error is None else f"{type(error).__name__}: {error}"[:200],
+        'created_at': datetime.now().isoformat(),
+    }
+
+def record_usage(row, db=None):
+    """Store a usage row; accounting must never fail the call it accounts for"""
+    try:
+        (db or TriviaDatabase()).record_model_usage(row)
+    except Exception as e:
+        logging.warning("[model_usage.py] [record_usage] Could not record %s usage: %s", row['call_site'], e)
+
+def tracked_completion(call_site, request, create, run):
+    """
+    run(create) timed and recorded under call_site. run receives a counting wrapper of create and
+    is expected to send it through the response cache and the retry policy, e.g.
+    run=lambda create: get_cache().complete(lambda: call_with_retries(host, create, **request), request)
+    """
+    attempts = []
+    started = time.perf_counter()
+    try:
+        response = run(_counting(create, attempts))
+    except Exception as e:
+        record_usage(usage_row(call_site, request, None, time.perf_counter() - started, len(attempts), e))
+        raise
+    record_usage(usage_row(call_site, request, response, time.perf_counter() - started, len(attempts)))
+    return response
+
+async def async_tracked_completion(call_site, request, create, run):
+    """tracked_completion for an async create; run returns an awaitable"""
+    attempts = []
+    started = time.perf_counter()
+    try:
+        response = await run(_counting(create, attempts))
+    except Exception as e:
+        record_usage(usage_row(call_site, request, None, time.perf_counter() - started, len(attempts), e))
+        raise
+    record_usage(usage_row(call_site, request, response, time.perf_counter() - started, len(attempts)))
+    return response
+
+def model_price(model):
+    """(prompt, completion) USD per million tokens for the longest matching MODEL_PRICES prefix, or None"""
+    matches = [name for name in MODEL_PRICES if (model or '').startswith(name)]
+    return MODEL_PRICES[max(matches, key=len)] if matches else None
+
+def percentile(values, q):
+    """Nearest-rank percentile of values, or None for no values"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(math.ceil(q / 100 * len(ordered)) - 1, 0)]
+
+def _distribution(values):
+    summary = {f"p{q}": percentile(values, q) for q in PERCENTILES}
+    summary['max'] = max(values) if values else None
+    return summary
+
+def usage_report(days=MODEL_USAGE_REPORT_DAYS, db=None):
+    """
+    {call_site: summary} over the last `days` days. Latency and token percentiles cover calls that
+    reached the API successfully; cached answers are counted but cost nothing and take no time worth
+    tuning. Retries count attempts after the first, failed calls included.
+    """
+    since = (datetime.now() - timedelta(days=days)).isoformat() if days else None
+    rows = (db or TriviaDatabase()).get_model_usage(since=since)
+    report = {}
+    for call_site in sorted({row['call_site'] for row in rows}, key=lambda site: (site not in CALL_SITES, site)):
+        site_rows = [row for row in rows if row['call_site'] == call_site]
+        live = [row for row in site_rows if not row['cached'] and row['status'] == 'ok']
+        cost, priced = 0.0, 0
+        for row in live:
+            price = model_price(row['model'])
+            if price and row['prompt_tokens'] is not None:
+                cost += (row['prompt_tokens'] * price[0] + (row['completion_tokens'] or 0) * price[1]) / 1e6
+                priced += 1
+        report[call_site] = {
+            'calls': len(site_rows),
+            'cached': sum(1 for row in site_rows if row['cached']),
+            'errors': sum(1 for row in site_rows if row['status'] == 'error'),
+            'retries': sum(row['retries'] for row in site_rows),
+            'retried_calls': sum(1 for row in site_rows if row['retries']),
+            'latency_ms': _distribution([row['latency_ms'] for row in live]),
+            'prompt_tokens': _distribution([row['prompt_tokens'] for row in live if row['prompt_tokens'] is not None]),
+            'completion_tokens': _distribution([row['completion_tokens'] for row in live if row['completion_tokens'] is not None]),
+            'total_tokens': sum((row['prompt_tokens'] or 0) + (row['completion_tokens'] or 0) for row in live),
+            'cost_usd': cost if priced else None,
+            'models': dict(Counter(row['model'] for row in site_rows)),
+        }
+    return report
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+OpenAI Cache Module - Content-addressed record/replay cache in front of every chat completion
+"""
+
+import hashlib
+import json
+import sqlite3
+import time
+from pathlib import Path
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from core.config import OPENAI_CACHE_MODE, OPENAI_CACHE_PATH, OPENAI_CACHE_TTL
+import logging
+logging.basicConfig(level=logging.INFO, format='[%(levelname)s] %(message)s')
+
+# passthrough: always call OpenAI, never touch the cache
+# record: serve fresh cached responses, call OpenAI on a miss and store the response
+# replay: serve cached responses only, whatever their age; a miss raises CacheMissError
+CACHE_MODES = ('passthrough', 'record', 'replay')
+KEY_FIELDS = ('model', 'messages', 'temperature', 'max_tokens')
+
+RESPONSES_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS responses (
+        cache_key TEXT PRIMARY KEY,
+        model TEXT,
+        request TEXT NOT NULL,
+        response TEXT NOT NULL,
+        created_at REAL NOT NULL
+    )
+'''
+
+class CacheMissError(RuntimeError):
+    """Replay mode found no recorded response for a request"""
+
+def cache_key(request):
+    """sha256 of the fields that determine a completion: model, messages, temperature and max_tokens"""
+    payload = json.dumps({field: request.get(field) for field in KEY_FIELDS}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def _to_payload(response):
+    # Only real ChatCompletion objects are recorded; test doubles pass straight through
+    model_dump = getattr(response, 'model_dump', None)
+    return model_dump(mode='json') if model_dump else None
+
+def _from_payload(payload):
+    from openai.types.chat import ChatCompletion
+    return ChatCompletion.model_validate(payload)
+
+class ResponseCache:
+    def __init__(self, path=OPENAI_CACHE_PATH, mode=OPENAI_CACHE_MODE, ttl=OPENAI_CACHE_TTL):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"OpenAI cache mode must be one of {', '.join(CACHE_MODES)}, not {mode!r}")
+        self.path = path
+        self.mode = mode
+        self.ttl = ttl
+        self.stats = {'hits': 0, 'misses': 0, 'stored': 0}
+        if mode != 'passthrough':
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            with sqlite3.connect(self.path) as conn:
+                conn.execute(RESPONSES_TABLE_SQL)
+
+    def lookup(self, key):
+        """Cached response payload for key, or None. Replay mode ignores the TTL."""
+        with sqlite3.connect(self.path) as conn:
+            row = conn.execute("SELECT response, created_at FROM responses WHERE cache_key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        if self.mode == 'record' and self.ttl and time.time() - row[1] > self.ttl:
+            return None
+        return json.loads(row[0])
+
+    def store(self, key, request, payload):
+        with sqlite3.connect(self.path) as conn:
+            conn.execute("INSERT OR REPLACE INTO responses (cache_key, model, request, response, created_at) VALUES (?, ?, ?, ?, ?)",
+                         (key, request.get('model'), json.dumps({field: request.get(field) for field in KEY_FIELDS}, ensure_ascii=False),
+                          json.dumps(payload, ensure_ascii=False), time.time()))
+        self.stats['stored'] += 1
+
+    def discard(self, request):
+        """Forget the response to request, e.g. because it could not be parsed; recordings are kept in replay mode"""
+        if self.mode != 'record':
+            return
+        with sqlite3.connect(self.path) as conn:
+            conn.execute("DELETE FROM responses WHERE cache_key = ?", (cache_key(request),))
+
+    def _cached(self, request):
+        key = cache_key(request)
+        payload = self.lookup(key)
+        if payload is not None:
+            self.stats['hits'] += 1
+            logging.debug("[openai_cache.py] [complete] Replaying cached response %s", key[:12])
+            return key, _from_payload(payload)
+        self.stats['misses'] += 1
+        if self.mode == 'replay':
+            raise CacheMissError(f"No recorded OpenAI response for request {key[:12]} (model {request.get('model')})")
+        return key, None
+
+    def complete(self, call, request):
+        """Response to request (the chat completion keyword arguments), from the cache or from call()"""
+        if self.mode == 'passthrough':
+            return call()
+        key, response = self._cached(request)
+        if response is None:
+            response = call()
+            payload = _to_payload(response)
+            if payload is not None:
+                self.store(key, request, payload)
+        return response
+
+    async def acomplete(self, call, request):
+        """complete() for an async call returning an awaitable"""
+        if self.mode == 'passthrough':
+            return await call()
+        key, response = self._cached(request)
+        if response is None:
+            response = await call()
+            payload = _to_payload(response)
+            if payload is not None:
+                self.store(key, request, payload)
+        return response
+
+    def prune(self, ttl=None):
+        """Delete responses older than ttl seconds (default: the cache's TTL; 0 keeps all, -1 deletes all); returns how many"""
+        ttl = self.ttl if ttl is None else ttl
+        if self.mode == 'passthrough' or ttl == 0:
+            return 0
+        with sqlite3.connect(self.path) as conn:
+            return conn.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - ttl,)).rowcount
+
+    def count(self):
+        if self.mode == 'passthrough':
+            return 0
+        with sqlite3.connect(self.path) as conn:
+            return conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+_cache = None
+
+def get_cache():
+    """The process-wide cache, configured from OPENAI_CACHE_MODE / _PATH / _TTL on first use"""
+    global _cache
+    if _cache is None:
+        _cache = ResponseCache()
+    return _cache
+
+def configure(mode=None, path=None, ttl=None):
+    """Replace the process-wide cache, e.g. to replay recorded responses in tests or benchmarks"""
+    global _cache
+    _cache = ResponseCache(path=path or OPENAI_CACHE_PATH, mode=mode or OPENAI_CACHE_MODE,
+                           ttl=OPENAI_CACHE_TTL if ttl is None else ttl)
+    return _cache
@@ -3,6 +3,15 @@
 Points System Module - Handles streak bonuses and point calculations
 """
 
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; batch scoring falls back to pure Python
+    np = None
+
+# Bump whenever the streak or points rules below change: leaderboard checkpoints taken under an
+# older rules version are then ignored and manage.py rebuild-leaderboard replays from the base.
+POINTS_RULES_VERSION = 1
+
 def calculate_points_for_streak(streak):
     """
     Calculate points based on streak length with new bonus system:
@@ -20,6 +29,17 @@ def calculate_points_for_streak(streak):
         points += 1
     return points
 
+def calculate_points_for_streaks(streaks):
+    """
+    calculate_points_for_streak over a whole vector of streaks.
+    Returns a NumPy array when NumPy is installed, a list otherwise.
+    """
+    if np is not None:
+        streaks = np.asarray(streaks, dtype=np.int64)
+        points = 1 + (streaks % 3 == 0) + (streaks % 6 == 0)
+        return np.where(streaks > 0, points, 0)
+    return [calculate_points_for_streak(streak) for streak in streaks]
+
 def get_streak_bonus_info(streak):
     """
     Get information about current streak and next bonus milestones for 3 and 6 day streaks
@@ -3,124 +3,95 @@
 Process GitHub issues to score trivia answers and update leaderboard
 """
 
-import json
+import multiprocessing
 import os
-import re
+import zlib
 from datetime import datetime, timedelta, timezone
-import requests
 import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from core.config import *
 from core.database import TriviaDatabase
-from core.points_system import calculate_points_for_streak, get_streak_bonus_info, format_points_display
-import random
+from core.points_system import calculate_points_for_streak, get_streak_bonus_info
+from core.issue_parser import AnswerMatcher, parse_issue, trivia_date_key, iter_issue_records
+from core.batch_scoring import AnswerColumns, score_answers
+from core.comment_templates import CommentTemplates, DUPLICATE_ANSWER_COMMENT, REJECTED_ANSWER_COMMENT
 import logging
 logging.basicConfig(level=logging.INFO, format='[%(levelname)s] %(message)s')
 
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+from core.retry_policy import http_request
+from core.tenants import current_tenant, tenant_value, tenant_env
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=2, min=2, max=10), retry=retry_if_exception_type(Exception))
 def requests_with_retries(method, *args, **kwargs):
-    import requests
-    try:
-        resp = getattr(requests, method)(*args, **kwargs)
-        if resp.status_code == 429:
-            logging.error("[process_answers.py] [requests_with_retries] GitHub API rate limit hit (429). Retrying...")
-        elif 500 <= resp.status_code < 600:
-            logging.error(f"[process_answers.py] [requests_with_retries] GitHub API server error ({resp.status_code}). Retrying...")
-        return resp
-    except Exception as e:
-        logging.error(f"[process_answers.py] [requests_with_retries] Exception: {e}")
-        raise
+    """GitHub API request under the shared retry policy (Retry-After aware, circuit broken per host)"""
+    return http_request(method, *args, **kwargs)
+
+def github_token():
+    """GitHub token of the current tenant, read from the variable it names (GITHUB_TOKEN if none); GITHUB_TOKEN without a tenant"""
+    if current_tenant() is None:
+        return GITHUB_TOKEN
+    return tenant_env('github_token_env', 'GITHUB_TOKEN')
+
+def github_repo_url():
+    """REST API URL of the repository whose issues are being processed"""
+    return f"{GITHUB_API_URL}/repos/{tenant_value('github_username', GITHUB_USERNAME)}/{tenant_value('github_repo', GITHUB_REPO)}"
 
 def get_github_issues():
-    """Fetch recent trivia answer issues from GitHub"""
-    if not GITHUB_TOKEN:
+    """
+    Fetch all open trivia answer issues from GitHub, following the pagination links.
+    Pages are decoded as they stream in, keeping only the fields used here as IssueRecords.
+    """
+    if not github_token():
         logging.warning("[process_answers.py] [get_github_issues] No GitHub token provided, skipping answer processing")
         return []
     
     headers = {
-        'Authorization': f'token {GITHUB_TOKEN}',
+        'Authorization': f'token {github_token()}',
         'Accept': 'application/vnd.github.v3+json'
     }
     
-    url = f"https://api.github.com/repos/{GITHUB_USERNAME}/{GITHUB_REPO}/issues"
+    url = f"{github_repo_url()}/issues"
     params = {
         'state': 'open',
         'per_page': 100
     }
     
+    issues = []
     try:
-        response = requests_with_retries('get', url, headers=headers, params=params)
-        response.raise_for_status()
-        return response.json()
+        while url:
+            response = requests_with_retries('get', url, headers=headers, params=params, stream=True)
+            response.raise_for_status()
+            issues.extend(iter_issue_records(response))
+            # The next page link already carries the query parameters
+            url = response.links.get('next', {}).get('url')
+            params = None
     except Exception as e:
-        logging.error("[process_answers.py] [get_github_issues] API failed after retries: %s", e)
-        return []
+        logging.error("[process_answers.py] [get_github_issues] API failed after retries (%s issues fetched): %s", len(issues), e)
+    return issues
 
-def parse_answer_from_issue(issue):
-    """Extract answer choice from issue title and body"""
-    title = issue.get('title', '')
-    body = issue.get('body', '')
-    
-    # Look for answer in title
-    if 'Trivia Answer A' in title:
-        return 'A'
-    elif 'Trivia Answer B' in title:
-        return 'B'
-    elif 'Trivia Answer C' in title:
-        return 'C'
-    
-    # Look for answer in body (new format with actual answer text)
-    # First check for letter format
-    if '**Answer:** A' in body:
-        return 'A'
-    elif '**Answer:** B' in body:
-        return 'B'
-    elif '**Answer:** C' in body:
-        return 'C'
-    
-    # Then check for actual answer text (like "2007", "Jupiter", etc.)
-    trivia_data = load_trivia_data()
-    current_trivia = trivia_data.get("current", {})
-    options = current_trivia.get("options", {})
-    
-    for option, text in options.items():
-        if f'**Answer:** {text}' in body:
-            return option
-    
-    # Look for answer in body (old format)
-    if 'I choose A' in body:
-        return 'A'
-    elif 'I choose B' in body:
-        return 'B'
-    elif 'I choose C' in body:
-        return 'C'
-    
-    return None
+def build_trivia_questions_by_date(trivia_data):
+    """Build a lookup of trivia questions keyed by the date used in answer links"""
+    trivia_questions_by_date = {trivia_date_key(q): q for q in trivia_data.get("history", [])}
+    if trivia_data.get("current"):
+        trivia_questions_by_date[trivia_date_key(trivia_data["current"])] = trivia_data["current"]
+    return trivia_questions_by_date
+
+def parse_answer_from_issue(issue, answer_matcher=None):
+    """
+    Extract answer choice from issue title and body.
+    answer_matcher should be built once per run; without it the trivia is loaded from the database.
+    """
+    if answer_matcher is None:
+        answer_matcher = AnswerMatcher(build_trivia_questions_by_date(load_trivia_data()))
+    return parse_issue(issue, answer_matcher).answer
 
 def parse_trivia_date_from_issue(issue):
-    body = issue.get('body', '')
-    import re
-    # Try bold markdown first (DD.MM.YYYY or YYYY-MM-DD)
-    match = re.search(r'\*\*Trivia Date:\*\*\s*([0-9.\-]+)', body)
-    if match:
-        return match.group(1)
-    # Fallback: plain text (DD.MM.YYYY or YYYY-MM-DD)
-    match = re.search(r'Trivia Date:\s*([0-9.\-]+)', body)
-    if match:
-        return match.group(1)
-    # Try to find any date-like string (YYYY-MM-DD or DD.MM.YYYY)
-    match = re.search(r'([0-9]{4}-[0-9]{2}-[0-9]{2})', body)
-    if match:
-        return match.group(1)
-    match = re.search(r'([0-9]{2}\.[0-9]{2}\.[0-9]{4})', body)
-    if match:
-        return match.group(1)
-    logging.warning(f"[process_answers.py] [parse_trivia_date_from_issue] Could not find trivia date in issue body for issue #{issue.get('number', '?')}: {body}")
-    return None
+    """Extract the trivia date (DD.MM.YYYY or YYYY-MM-DD) from the issue body"""
+    trivia_date = parse_issue(issue).trivia_date
+    if not trivia_date:
+        logging.warning("[process_answers.py] [parse_trivia_date_from_issue] Could not find trivia date in issue body for issue #%s: %s", issue.get('number', '?'), issue.get('body', ''))
+    return trivia_date
 
 def load_trivia_data():
     """Load current trivia data from database"""
@@ -164,6 +135,49 @@ def save_leaderboard(leaderboard):
         logging.error("[process_answers.py] [save_leaderboard] Error saving leaderboard to database: %s", e)
         # Continue without saving if database fails
 
+def load_processed_issues(issue_numbers=None):
+    """Load the processed issues journal from database, only the given issue numbers if any"""
+    try:
+        db = TriviaDatabase()
+        return db.get_processed_issues(issue_numbers)
+    except Exception as e:
+        logging.error("[process_answers.py] [load_processed_issues] Error loading processed issues from database: %s", e)
+        return {}
+
+def record_issue_results(results, leaderboard, changed_users, answer_events=()):
+    """Journal issue results together with the changed leaderboard rows and answer events in one transaction"""
+    db = TriviaDatabase()
+    db.record_issue_results(results, {username: leaderboard[username] for username in changed_users if username in leaderboard},
+                            answer_events)
+
+def load_leaderboard_users(usernames):
+    """Load the current database rows of the given users"""
+    db = TriviaDatabase()
+    return db.get_leaderboard_users(usernames)
+
+def export_database():
+    """Export the compressed database snapshot of what has been saved so far"""
+    db = TriviaDatabase()
+    db.export_compressed_data()
+
+def mark_issue_closed(issue_number):
+    """Mark a journaled issue as closed on GitHub"""
+    try:
+        db = TriviaDatabase()
+        db.mark_issues_closed([issue_number])
+    except Exception as e:
+        logging.error("[process_answers.py] [mark_issue_closed] Error marking issue #%s closed: %s", issue_number, e)
+
+def mark_issues_closed(issue_numbers):
+    """Mark several journaled issues as closed on GitHub"""
+    if not issue_numbers:
+        return
+    try:
+        db = TriviaDatabase()
+        db.mark_issues_closed(sorted(issue_numbers))
+    except Exception as e:
+        logging.error("[process_answers.py] [mark_issues_closed] Error marking issues closed: %s", e)
+
 def can_user_answer_today(leaderboard, username, current_trivia_date):
     """Check if user can answer today's trivia with timezone and grace period handling"""
     user_stats = leaderboard.get(username, {})
@@ -199,8 +213,9 @@ def can_user_answer_today(leaderboard, username, current_trivia_date):
 def get_utc_today():
     return datetime.now(timezone.utc).strftime(DATE_FORMAT)
 
-def update_user_stats(leaderboard, username, is_correct, trivia_date=None):
+def update_user_stats(leaderboard, username, is_correct, trivia_date=None, answered_at=None):
     """Update user statistics in leaderboard with trivia date tracking and points system"""
+    answered_at = answered_at or datetime.now().isoformat()
     # Only add new user if correct
     if username not in leaderboard:
         if not is_correct:
@@ -218,7 +233,7 @@ def update_user_stats(leaderboard, username, is_correct, trivia_date=None):
     
     user_stats = leaderboard[username]
     user_stats['total_answered'] += 1
-    user_stats['last_answered'] = datetime.now().isoformat()
+    user_stats['last_answered'] = answered_at
     
     # Track which trivia date this answer is for
     if trivia_date:
@@ -227,7 +242,7 @@ def update_user_stats(leaderboard, username, is_correct, trivia_date=None):
     # Add to answer history
     answer_record = {
         'date': trivia_date or get_utc_today(),
-        'timestamp': datetime.now().isoformat(),
+        'timestamp': answered_at,
         'correct': is_correct
     }
     user_stats['answer_history'].append(answer_record)
@@ -255,19 +270,19 @@ def update_user_stats(leaderboard, username, is_correct, trivia_date=None):
         user_stats['current_streak'] = 0
         return 0, None
 
-def close_issue(issue_number, comment):
-    """Close a GitHub issue with a comment"""
-    if not GITHUB_TOKEN:
+def close_issue(issue_number, comment, labels=None):
+    """Close a GitHub issue with a comment, optionally setting its labels; returns True if the issue was closed"""
+    if not github_token():
         logging.error("[process_answers.py] [close_issue] No GitHub token provided, cannot close issue.")
-        return
+        return False
     
     headers = {
-        'Authorization': f'token {GITHUB_TOKEN}',
+        'Authorization': f'token {github_token()}',
         'Accept': 'application/vnd.github.v3+json'
     }
     
     # Add comment
-    comment_url = f"https://api.github.com/repos/{GITHUB_USERNAME}/{GITHUB_REPO}/issues/{issue_number}/comments"
+    comment_url = f"{github_repo_url()}/issues/{issue_number}/comments"
     try:
         resp = requests_with_retries('post', comment_url, headers=headers, json={'body': comment})
         resp.raise_for_status()
@@ -276,13 +291,123 @@ def close_issue(issue_number, comment):
         logging.error("[process_answers.py] [close_issue] API failed after retries (comment): %s", e)
     
     # Close issue
-    close_url = f"https://api.github.com/repos/{GITHUB_USERNAME}/{GITHUB_REPO}/issues/{issue_number}"
+    close_url = f"{github_repo_url()}/issues/{issue_number}"
+    update = {'state': 'closed'}
+    if labels is not None:
+        update['labels'] = labels
     try:
-        resp = requests_with_retries('patch', close_url, headers=headers, json={'state': 'closed'})
+        # Setting the state and labels again leaves the issue as it is, so this is safe to resend
+        resp = requests_with_retries('patch', close_url, headers=headers, json=update, idempotent=True)
         resp.raise_for_status()
         logging.info("[process_answers.py] [close_issue] Closed issue #%s", issue_number)
+        return True
     except Exception as e:
         logging.error("[process_answers.py] [close_issue] API failed after retries (close): %s", e)
+        return False
+
+def get_label_node_id(label_name):
+    """GraphQL node id of a repository label, or None if the label does not exist"""
+    headers = {
+        'Authorization': f'token {github_token()}',
+        'Accept': 'application/vnd.github.v3+json'
+    }
+    label_url = f"{github_repo_url()}/labels/{label_name}"
+    try:
+        resp = requests_with_retries('get', label_url, headers=headers)
+        if resp.status_code == 200:
+            return resp.json().get('node_id')
+        logging.warning("[process_answers.py] [get_label_node_id] Label '%s' not found (%s)", label_name, resp.status_code)
+    except Exception as e:
+        logging.error("[process_answers.py] [get_label_node_id] API failed after retries: %s", e)
+    return None
+
+def build_close_duplicates_mutation(count, with_label):
+    """GraphQL mutation that comments on, labels and closes `count` issues in one request"""
+    params = []
+    fields = []
+    for i in range(count):
+        params += [f"$issue{i}: ID!", f"$body{i}: String!"]
+        fields.append(f"c{i}: addComment(input: {{subjectId: $issue{i}, body: $body{i}}}) {{ clientMutationId }}")
+        if with_label:
+            fields.append(f"l{i}: addLabelsToLabelable(input: {{labelableId: $issue{i}, labelIds: [$label]}}) {{ clientMutationId }}")
+        fields.append(f"x{i}: closeIssue(input: {{issueId: $issue{i}, stateReason: NOT_PLANNED}}) {{ issue {{ number }} }}")
+    if with_label:
+        params.append("$label: ID!")
+    return f"mutation({', '.join(params)}) {{ {' '.join(fields)} }}"
+
+def close_duplicate_issues(duplicates):
+    """
+    Comment on, label and close duplicate answer issues with batched GraphQL requests.
+    duplicates: list of (issue, comment). Issues without a node_id, or in a batch whose request
+    failed, fall back to close_issue. Returns the numbers of the issues that were closed.
+    """
+    if not duplicates:
+        return set()
+    if not github_token():
+        logging.error("[process_answers.py] [close_duplicate_issues] No GitHub token provided, cannot close issues.")
+        return set()
+
+    headers = {
+        'Authorization': f'token {github_token()}',
+        'Accept': 'application/vnd.github.v3+json'
+    }
+    label_id = get_label_node_id(DUPLICATE_ISSUE_LABEL)
+    closed = set()
+    fallback = [(issue, comment) for issue, comment in duplicates if not issue.get('node_id')]
+    batchable = [(issue, comment) for issue, comment in duplicates if issue.get('node_id')]
+    for start in range(0, len(batchable), DUPLICATE_CLOSE_BATCH_SIZE):
+        batch = batchable[start:start + DUPLICATE_CLOSE_BATCH_SIZE]
+        variables = {'label': label_id} if label_id else {}
+        for i, (issue, comment) in enumerate(batch):
+            variables[f"issue{i}"] = issue['node_id']
+            variables[f"body{i}"] = comment
+        query = build_close_duplicates_mutation(len(batch), bool(label_id))
+        try:
+            resp = requests_with_retries('post', f"{GITHUB_API_URL}/graphql", headers=headers, json={'query': query, 'variables': variables})
+            resp.raise_for_status()
+            result = resp.json()
+        except Exception as e:
+            logging.error("[process_answers.py] [close_duplicate_issues] GraphQL batch failed, closing one by one: %s", e)
+            fallback.extend(batch)
+            continue
+        data = result.get('data') or {}
+        for i, (issue, comment) in enumerate(batch):
+            if data.get(f"x{i}"):
+                closed.add(issue['number'])
+            else:
+                # The comment may already be posted, so leave it to the journal replay of the next run
+                logging.error("[process_answers.py] [close_duplicate_issues] Could not close duplicate issue #%s: %s", issue['number'], result.get('errors'))
+        logging.info("[process_answers.py] [close_duplicate_issues] Closed %s duplicate issue(s) in one request", sum(1 for issue, _ in batch if issue['number'] in closed))
+
+    for issue, comment in fallback:
+        labels = [label['name'] for label in issue.get('labels', []) if isinstance(label, dict) and label.get('name')]
+        if close_issue(issue['number'], comment, labels=labels + [DUPLICATE_ISSUE_LABEL]):
+            closed.add(issue['number'])
+    return closed
+
+def issue_created_order(issue):
+    """Sort key for issues by creation time, oldest first (ISO 8601 timestamps sort as strings)"""
+    return (issue.get('created_at') or '', issue['number'])
+
+def coalesce_answers(answers):
+    """
+    Group parsed answers by (username, trivia date) in one pass and keep each group's oldest issue.
+    answers: list of (issue, parsed). Returns (winners, losers) as lists of (issue, parsed),
+    winners ordered by creation time.
+    """
+    winners = {}
+    losers = []
+    for issue, parsed in answers:
+        key = (issue['user']['login'], parsed.trivia_date)
+        current = winners.get(key)
+        if current is None:
+            winners[key] = (issue, parsed)
+        elif issue_created_order(issue) < issue_created_order(current[0]):
+            losers.append(current)
+            winners[key] = (issue, parsed)
+        else:
+            losers.append((issue, parsed))
+    return sorted(winners.values(), key=lambda answer: issue_created_order(answer[0])), losers
 
 def mark_unplanned_issues(issues, processed_issue_numbers):
     """Mark any remaining open issues as unplanned for the next day and close them."""
@@ -297,19 +422,173 @@ def mark_unplanned_issues(issues, processed_issue_numbers):
         )
         close_issue(issue_number, comment)
 
-def process_answers():
-    """Main function to process all trivia answers"""
+def build_answer_comment(username, answer, trivia, user_stats, is_correct, points_earned, bonus_info=None):
+    """
+    Build the response comment for a single scored answer.
+    Runs that score many answers should render through one CommentTemplates instead.
+    """
+    templates = CommentTemplates({None: trivia})
+    return templates.answer_comment(username, None, answer, is_correct, user_stats['current_streak'] if user_stats else 0,
+                                    user_stats['total_correct'] if user_stats else 0, points_earned,
+                                    user_stats['total_points'] if user_stats else 0)
+
+def score_issue(issue, leaderboard, trivia_questions_by_date, answer_matcher, answer_events=None, comment_templates=None):
+    """
+    Score a single answer issue against the in-memory leaderboard.
+    Returns (status, comment). status is one of 'ignored' (not a trivia answer), 'unparsed',
+    'unknown_date', 'duplicate', 'rejected', 'correct' or 'incorrect'. comment is the text to
+    close the issue with, or None if the issue should be left open. Correct and incorrect answers
+    are appended to answer_events, if given, as rows for TriviaDatabase.append_answer_events.
+    comment_templates should be a CommentTemplates over trivia_questions_by_date, reused across calls.
+    """
+    issue_number = issue['number']
+    username = issue['user']['login']
+    
+    # Only process issues that look like trivia answers
+    title = issue.get('title', '')
+    if not title.startswith('Trivia Answer'):
+        return 'ignored', None
+    
+    # Answer letter and trivia date in a single pass over the body
+    parsed = parse_issue(issue, answer_matcher)
+    answer = parsed.answer
+    
+    if not answer:
+        logging.warning("[process_answers.py] [score_issue] Could not parse answer from issue #%s", issue_number)
+        return 'unparsed', None
+    
+    trivia_date = parsed.trivia_date
+    if not trivia_date or trivia_date not in trivia_questions_by_date:
+        logging.warning("[process_answers.py] [score_issue] Could not determine trivia date for issue #%s", issue_number)
+        return 'unknown_date', None
+    trivia = trivia_questions_by_date[trivia_date]
+    correct_answer = trivia['correct_answer']
+    current_trivia_date = trivia_date
+    
+    # Check if user already answered this trivia date
+    user_stats = leaderboard.get(username, {})
+    if user_stats.get('last_trivia_date') == current_trivia_date:
+        return 'duplicate', DUPLICATE_ANSWER_COMMENT.format(username=username)
+    
+    # Check if user can answer today's trivia (by date)
+    can_answer, reason = can_user_answer_today(leaderboard, username, current_trivia_date)
+    
+    if not can_answer:
+        # User cannot answer, close issue with explanation
+        return 'rejected', REJECTED_ANSWER_COMMENT.format(username=username, reason=reason)
+    
+    # Process answer
+    is_correct = answer == correct_answer
+    answered_at = datetime.now().isoformat()
+    points_earned, bonus_info = update_user_stats(leaderboard, username, is_correct, current_trivia_date, answered_at)
+    if answer_events is not None:
+        answer_events.append((issue_number, username, current_trivia_date, answer, is_correct, answered_at))
+    
+    # Create response comment with points system
+    if comment_templates is None:
+        comment = build_answer_comment(username, answer, trivia, leaderboard.get(username), is_correct, points_earned)
+    else:
+        user_stats = leaderboard.get(username) or {}
+        comment = comment_templates.answer_comment(username, current_trivia_date, answer, is_correct, user_stats.get('current_streak', 0),
+                                                   user_stats.get('total_correct', 0), points_earned, user_stats.get('total_points', 0))
+    return ('correct' if is_correct else 'incorrect'), comment
+
+def shard_of(username, shards):
+    """Shard index of a user; crc32 is stable across processes, unlike hash()"""
+    return zlib.crc32(username.encode('utf-8')) % shards
+
+def shard_answers(winners, workers):
+    """
+    Split coalesced answers into at most `workers` non-empty AnswerColumns by username,
+    keeping creation order within each shard.
+    """
+    workers = max(1, workers)
+    shards = [AnswerColumns([], [], [], []) for _ in range(workers)]
+    for issue, parsed in winners:
+        username = issue['user']['login']
+        columns = shards[shard_of(username, workers)]
+        columns.issue_numbers.append(issue['number'])
+        columns.usernames.append(username)
+        columns.trivia_dates.append(parsed.trivia_date)
+        columns.answers.append(parsed.answer)
+    return [columns for columns in shards if columns.issue_numbers] or shards[:1]
+
+def get_worker_context():
+    """Fork where available so workers inherit the loaded configuration instead of re-importing it"""
+    return multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else None)
+
+def map_shards(pool, func, shard_args):
+    """func(*args) for each shard, in the worker pool or in this process when there is none"""
+    if pool is None:
+        return [func(*args) for args in shard_args]
+    return pool.starmap(func, shard_args)
+
+def score_shard(columns, leaderboard, trivia_questions_by_date, scored_at):
+    """
+    Score a shard of coalesced answers against its slice of the leaderboard and render their comments.
+    Touches neither the database nor GitHub, so it can run in a worker process. Returns
+    (results, answer_events, delta): (issue_number, status, comment) rows in column order, answer
+    event rows for TriviaDatabase.append_answer_events, and the changed users' leaderboard rows.
+    """
+    scores = score_answers(columns, leaderboard, trivia_questions_by_date, now=scored_at)
+    # Comments for all scored answers are rendered in one pass from per-shard templates
+    scored = [i for i, status in enumerate(scores.status) if status in ('correct', 'incorrect')]
+    comment_rows = []
+    for i in scored:
+        user_stats = leaderboard.get(columns.usernames[i]) or {}
+        comment_rows.append((columns.usernames[i], columns.trivia_dates[i], columns.answers[i], scores.status[i] == 'correct',
+                             scores.streak[i], user_stats.get('total_correct', 0), scores.points[i], user_stats.get('total_points', 0)))
+    answer_comments = dict(zip(scored, CommentTemplates(trivia_questions_by_date).answer_comments(comment_rows)))
+    results = []
+    answer_events = []
+    for i, issue_number in enumerate(columns.issue_numbers):
+        username = columns.usernames[i]
+        status = scores.status[i]
+        if status == 'duplicate':
+            comment = DUPLICATE_ANSWER_COMMENT.format(username=username)
+        elif status == 'rejected':
+            comment = REJECTED_ANSWER_COMMENT.format(username=username, reason=scores.reason[i])
+        else:
+            comment = answer_comments[i]
+            answer_events.append((issue_number, username, columns.trivia_dates[i], columns.answers[i], status == 'correct', scored_at.isoformat()))
+        results.append((issue_number, status, comment))
+    delta = {username: leaderboard[username] for username in scores.changed_users if username in leaderboard}
+    return results, answer_events, delta
+
+def close_scored_issues(results):
+    """
+    Close journaled non-duplicate results on GitHub with their comments; returns the closed numbers.
+    Touches no database, so it can run in a worker process; the caller marks the numbers closed.
+    """
+    closed = []
+    for issue_number, status, comment in results:
+        if status != 'duplicate' and close_issue(issue_number, comment):
+            closed.append(issue_number)
+    return closed
+
+def prune_leaderboard_users(leaderboard):
+    """Remove users with 0 total_answered or 0 total_correct; returns (no_answers, no_correct) usernames"""
+    to_remove = [user for user, stats in leaderboard.items() if stats.get('total_answered', 0) == 0]
+    for user in to_remove:
+        del leaderboard[user]
+
+    # Remove users with 0 total_correct (never got a right answer)
+    to_remove_zero_correct = [user for user, stats in leaderboard.items() if stats.get('total_correct', 0) == 0]
+    for user in to_remove_zero_correct:
+        del leaderboard[user]
+    return to_remove, to_remove_zero_correct
+
+def process_answers(workers=PROCESS_ANSWERS_WORKERS):
+    """Main function to process all trivia answers, scoring and closing them in up to `workers` processes"""
     logging.info("[process_answers.py] [process_answers] Starting trivia answer processing.")
     
     # Load data
     trivia_data = load_trivia_data()
     leaderboard = load_leaderboard()
     
-    # Build a lookup for trivia by date
-    trivia_questions = trivia_data.get("history", [])
-    trivia_questions_by_date = {q.get("date"): q for q in trivia_questions}
-    if trivia_data.get("current"):
-        trivia_questions_by_date[trivia_data["current"].get("date")] = trivia_data["current"]
+    # Build a lookup for trivia by date and the answer text matcher over all of it
+    trivia_questions_by_date = build_trivia_questions_by_date(trivia_data)
+    answer_matcher = AnswerMatcher(trivia_questions_by_date)
 
     # Get GitHub issues
     issues = get_github_issues()
@@ -318,9 +597,28 @@ def process_answers():
     total_trivia_issues = 0
     processed_issue_numbers = set()
     
+    # Issues already applied by an earlier (possibly crashed) run are skipped; outstanding
+    # GitHub writes from that run are replayed
+    journal = load_processed_issues()
+    replayed_count = 0
+    pending_duplicates = []
+    # Issues closed on GitHub during this run, marked closed in the journal in one transaction
+    closed_issues = []
+    
+    # Parse every new answer issue before any scoring
+    answers = []
     for issue in issues:
         issue_number = issue['number']
-        username = issue['user']['login']
+        entry = journal.get(issue_number)
+        if entry:
+            if entry['status'] == 'scored':
+                if entry['outcome'] == 'duplicate':
+                    pending_duplicates.append((issue, entry['comment']))
+                elif close_issue(issue_number, entry['comment']):
+                    closed_issues.append(issue_number)
+                    replayed_count += 1
+            processed_issue_numbers.add(issue_number)
+            continue
         
         # Only process issues that look like trivia answers
         title = issue.get('title', '')
@@ -328,101 +626,77 @@ def process_answers():
             continue
         total_trivia_issues += 1
         
-        answer = parse_answer_from_issue(issue)
-        
-        if not answer:
+        # Answer letter and trivia date in a single pass over the body
+        parsed = parse_issue(issue, answer_matcher)
+        if not parsed.answer:
             logging.warning("[process_answers.py] [process_answers] Could not parse answer from issue #%s", issue_number)
             continue
-        
-        # Parse trivia date from issue
-        trivia_date = parse_trivia_date_from_issue(issue)
-        if not trivia_date or trivia_date not in trivia_questions_by_date:
+        if not parsed.trivia_date or parsed.trivia_date not in trivia_questions_by_date:
             logging.warning("[process_answers.py] [process_answers] Could not determine trivia date for issue #%s", issue_number)
             continue
-        trivia = trivia_questions_by_date[trivia_date]
-        correct_answer = trivia['correct_answer']
-        current_trivia_date = trivia_date
-        
-        # Check if user already answered this trivia date
-        user_stats = leaderboard.get(username, {})
-        if user_stats.get('last_trivia_date') == current_trivia_date:
-            close_issue(issue_number, f"@{username} You have already submitted an answer for today's trivia. Only one answer per user per day is allowed!")
-            continue
-        
-        # Check if user can answer today's trivia (by date)
-        can_answer, reason = can_user_answer_today(leaderboard, username, current_trivia_date)
-        
-        if not can_answer:
-            # User cannot answer, close issue with explanation
-            close_issue(issue_number, f"@{username} {reason}! Come back tomorrow for a new question.")
-            continue
-        
-        # Process answer
-        is_correct = answer == correct_answer
-        points_earned, bonus_info = update_user_stats(leaderboard, username, is_correct, current_trivia_date)
-        
-        if is_correct:
-            correct_count += 1
+        answers.append((issue, parsed))
+    
+    # One answer per user and trivia date: the oldest issue wins, the rest are duplicates
+    winners, losers = coalesce_answers(answers)
+    results = []
+    duplicates = []
+    for issue, parsed in losers:
+        comment = DUPLICATE_ANSWER_COMMENT.format(username=issue['user']['login'])
+        results.append((issue['number'], 'duplicate', comment))
+        duplicates.append((issue, comment))
+    
+    # Users never interact, so each shard is scored against its own slice of the leaderboard
+    # (in a worker process when there is more than one shard) and the deltas are merged here
+    scored_at = datetime.now()
+    shards = shard_answers(winners, workers)
+    pool = None
+    if len(shards) > 1:
+        pool = get_worker_context().Pool(len(shards))
+        logging.info("[process_answers.py] [process_answers] Scoring %s answers in %s worker processes", len(winners), len(shards))
+    try:
+        shard_outputs = map_shards(pool, score_shard, [
+            (columns, {username: leaderboard[username] for username in set(columns.usernames) if username in leaderboard},
+             trivia_questions_by_date, scored_at)
+            for columns in shards
+        ])
+        answer_events = []
+        changed_users = set()
+        shard_results = []
+        for shard_result, shard_events, delta in shard_outputs:
+            leaderboard.update(delta)
+            changed_users.update(delta)
+            answer_events.extend(shard_events)
+            shard_results.append(shard_result)
+            results.extend(shard_result)
+        issues_by_number = {issue['number']: issue for issue, _ in winners}
+        for issue_number, status, comment in results:
+            if status in ('correct', 'incorrect'):
+                processed_count += 1
+                correct_count += status == 'correct'
+            elif status == 'duplicate' and issue_number in issues_by_number:
+                duplicates.append((issues_by_number[issue_number], comment))
         
-        # Create response comment with points system
-        if is_correct:
-            correct_message = random.choice(CORRECT_MESSAGES)
-            streak = leaderboard[username]['current_streak']
-            points_display = format_points_display(points_earned)
-            
-            comment = f"""{correct_message} @{username}
-
-Your answer **{answer}) {trivia['options'][answer]}** is absolutely right!
-
-**Explanation:** {trivia['explanation']}
-
-🔥 Your current streak: **{streak}**
-✅ Total correct answers: **{leaderboard[username]['total_correct']}**
-🏆 Points earned: **{points_display}**
-💎 Total points: **{leaderboard[username]['total_points']}**"""
-            
-            # Add bonus information
-            if bonus_info and (bonus_info['has_3_day_bonus'] or bonus_info['has_6_day_bonus']):
-                comment += "\n\n🎉 **Streak Bonuses:**\n"
-                if bonus_info['has_3_day_bonus']:
-                    comment += "• +1 point for 3-day streak! 🏆\n"
-                if bonus_info['has_6_day_bonus']:
-                    comment += "• +1 point for 6-day streak! 🏆\n"
-            # Show next milestone
-            if bonus_info['next_3_day_bonus'] > 0:
-                comment += f"\n🎯 **Next 3-day bonus:** {bonus_info['next_3_day_bonus']} more day(s)\n"
-            if bonus_info['next_6_day_bonus'] > 0:
-                comment += f"🎯 **Next 6-day bonus:** {bonus_info['next_6_day_bonus']} more day(s)\n"
-            comment += "\nAt 6, 12, 18, ... you get both bonuses for a total of 3 points!"
-            comment += "\nCome back tomorrow for another AMAZING question!"
-        else:
-            incorrect_message = random.choice(INCORRECT_MESSAGES)
-            comment = f"""{incorrect_message} @{username}
-
-Your answer **{answer}) {trivia['options'][answer]}** was wrong.
-
-**Correct Answer:** {correct_answer}) {trivia['options'][correct_answer]}
-
-**Explanation:** {trivia['explanation']}
-
-💔 Your streak has reset to 0, but don't give up!
-
-Come back tomorrow for another chance!"""
+        # Journal all results with the leaderboard delta and answer events before touching GitHub
+        if results:
+            try:
+                record_issue_results(results, leaderboard, changed_users, answer_events)
+            except Exception as e:
+                logging.error("[process_answers.py] [process_answers] Could not journal scored issues, stopping: %s", e)
+                raise
         
-        # Close issue with comment
-        close_issue(issue_number, comment)
-        processed_count += 1
-        processed_issue_numbers.add(issue_number)
+        # Each shard closes its own scored issues; all duplicates go out in batched requests
+        for shard_closed in map_shards(pool, close_scored_issues, [(shard_result,) for shard_result in shard_results]):
+            closed_issues.extend(shard_closed)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    processed_issue_numbers.update(issue_number for issue_number, _, _ in results)
+    closed_duplicates = close_duplicate_issues(pending_duplicates + duplicates)
+    mark_issues_closed(closed_issues + list(closed_duplicates))
+    replayed_count += sum(1 for issue, _ in pending_duplicates if issue['number'] in closed_duplicates)
     
-    # Remove users with 0 total_answered
-    to_remove = [user for user, stats in leaderboard.items() if stats.get('total_answered', 0) == 0]
-    for user in to_remove:
-        del leaderboard[user]
-
-    # Remove users with 0 total_correct (never got a right answer)
-    to_remove_zero_correct = [user for user, stats in leaderboard.items() if stats.get('total_correct', 0) == 0]
-    for user in to_remove_zero_correct:
-        del leaderboard[user]
+    to_remove, to_remove_zero_correct = prune_leaderboard_users(leaderboard)
     if to_remove_zero_correct:
         logging.debug("[process_answers.py] [process_answers] Removed users with 0 correct answers: %s", to_remove_zero_correct)
 
@@ -430,6 +704,8 @@ Come back tomorrow for another chance!"""
     save_leaderboard(leaderboard)
     logging.info("[process_answers.py] [process_answers] Processed trivia answer issues found: %s", total_trivia_issues)
     logging.info("[process_answers.py] [process_answers] Processed %s answers (Correct: %s)", processed_count, correct_count)
+    if replayed_count:
+        logging.info("[process_answers.py] [process_answers] Replayed %s pending GitHub write(s) from an earlier run", replayed_count)
     logging.debug("[process_answers.py] [process_answers] Removed users with 0 answers: %s", to_remove)
 
     # After processing, mark and close any remaining open issues
@@ -438,6 +714,7 @@ Come back tomorrow for another chance!"""
 
 def main():
     """Main function"""
+    validate_config()
     process_answers()
 
 if __name__ == "__main__":
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+README Sections Module - Renders the README as named sections, re-rendering only the sections
+whose inputs changed since the README on disk was written
+"""
+
+import difflib
+import hashlib
+import json
+import re
+from collections import namedtuple
+import logging
+logging.basicConfig(level=logging.INFO, format='[%(levelname)s] %(message)s')
+
+# inputs: JSON-serializable values the section depends on, template text included, so that
+# edits to a template re-render it; render: callable returning the section text from scratch
+ReadmeSection = namedtuple('ReadmeSection', ['name', 'inputs', 'render'])
+
+# Sections are delimited by HTML comments, which GitHub does not display
+_SECTION_START = "<!-- readme-section:{name} {fingerprint} -->\n"
+_SECTION_END = "\n<!-- /readme-section:{name} -->\n"
+_SECTION_RE = re.compile(
+    r'<!-- readme-section:(?P<name>[\w-]+) (?P<fingerprint>[0-9a-f]+) -->\n(?P<body>.*?)\n<!-- /readme-section:(?P=name) -->',
+    re.S,
+)
+
+def fingerprint(inputs):
+    """Short stable hash of a section's inputs"""
+    payload = json.dumps(inputs, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+def parse_sections(content):
+    """Sections of a rendered README as {name: (fingerprint, body)}; empty for READMEs without markers"""
+    return {match.group('name'): (match.group('fingerprint'), match.group('body')) for match in _SECTION_RE.finditer(content or "")}
+
+def render_sections(sections, old_content=""):
+    """
+    Render the README from its sections in order. A section whose fingerprint matches the one
+    recorded in old_content is reused verbatim without calling its render function.
+    Returns (content, rendered), rendered being the names of the sections that were re-rendered.
+    """
+    previous = parse_sections(old_content)
+    parts = []
+    rendered = []
+    for section in sections:
+        section_fingerprint = fingerprint(section.inputs)
+        cached = previous.get(section.name)
+        if cached is not None and cached[0] == section_fingerprint:
+            body = cached[1]
+        else:
+            body = section.render()
+            rendered.append(section.name)
+        parts.append(_SECTION_START.format(name=section.name, fingerprint=section_fingerprint))
+        parts.append(body)
+        parts.append(_SECTION_END.format(name=section.name))
+    logging.info("[readme_sections.py] [render_sections] Re-rendered %s of %s README sections: %s",
+                 len(rendered), len(sections), ", ".join(rendered) or "none")
+    return "".join(parts), rendered
+
+def content_digest(content):
+    """sha256 of README content, to decide whether the file needs writing"""
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+def diff_summary(old_content, new_content, max_hunks=3):
+    """
+    Bounded description of a README change: added/removed line counts and the first max_hunks
+    hunks of the unified diff. Meant to be computed only when someone asked to see the diff.
+    """
+    added = removed = hunks = 0
+    shown = []
+    for line in difflib.unified_diff(old_content.splitlines(), new_content.splitlines(),
+                                     fromfile='README.md (old)', tofile='README.md (new)', lineterm=''):
+        if line.startswith('@@'):
+            hunks += 1
+        elif hunks and line.startswith('+'):
+            added += 1
+        elif hunks and line.startswith('-'):
+            # Lines before the first hunk are the ---/+++ file headers
+            removed += 1
+        if hunks <= max_hunks:
+            shown.append(line)
+    summary = f"+{added} -{removed} lines in {hunks} hunk(s)"
+    if hunks > max_hunks:
+        shown.append(f"... {hunks - max_hunks} more hunk(s) not shown")
+    return "\n".join([summary] + shown)
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Retry Policy Module - Shared retries, server-hinted backoff and per-host circuit breaking
+for GitHub, fact API and OpenAI calls, blocking or async
+"""
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from core.config import (API_TIMEOUT, MAX_RETRIES, RETRY_BASE_WAIT, RETRY_MAX_WAIT, RETRY_JITTER,
+                         CIRCUIT_BREAKER_THRESHOLD, CIRCUIT_BREAKER_COOLDOWN)
+import logging
+logging.basicConfig(level=logging.INFO, format='[%(levelname)s] %(message)s')
+
+RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+# RFC 9110 idempotent methods; anything else is only retried when the server cannot have acted on it
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+
+class RetryableStatusError(Exception):
+    """A response whose status is worth retrying; carries the response for its headers"""
+
+    def __init__(self, response):
+        super().__init__(f"HTTP {response.status_code} from {response.url}")
+        self.response = response
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a host whose circuit breaker is open"""
+
+class CircuitBreaker:
+    """
+    Consecutive-failure breaker per host. After `threshold` failed attempts in a row the host is
+    skipped for `cooldown` seconds (or until the server's reset time, if later).
+    """
+
+    def __init__(self, threshold=CIRCUIT_BREAKER_THRESHOLD, cooldown=CIRCUIT_BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = {}
+        self.open_until = {}
+        self.lock = threading.Lock()
+
+    def check(self, host):
+        with self.lock:
+            until = self.open_until.get(host)
+            if until is None:
+                return
+            if time.monotonic() < until:
+                raise CircuitOpenError(f"Circuit open for {host} for another {until - time.monotonic():.0f}s")
+            # Cooldown over: let calls through again, one more failure reopens it
+            del self.open_until[host]
+            self.failures[host] = self.threshold - 1
+
+    def record_success(self, host):
+        with self.lock:
+            self.failures.pop(host, None)
+
+    def record_failure(self, host):
+        with self.lock:
+            self.failures[host] = self.failures.get(host, 0) + 1
+            if self.failures[host] >= self.threshold and host not in self.open_until:
+                self.open_until[host] = time.monotonic() + self.cooldown
+                logging.error("[retry_policy.py] [record_failure] %s failed %s times in a row, failing fast for %ss", host, self.failures[host], self.cooldown)
+
+    def trip(self, host, seconds):
+        """Open the circuit for at least `seconds`, e.g. until a rate limit resets"""
+        with self.lock:
+            self.open_until[host] = max(self.open_until.get(host, 0), time.monotonic() + max(seconds, self.cooldown))
+        logging.error("[retry_policy.py] [trip] %s asked us to wait %.0fs, failing fast until then", host, seconds)
+
+    def reset(self):
+        with self.lock:
+            self.failures.clear()
+            self.open_until.clear()
+
+breaker = CircuitBreaker()
+_sleep = time.sleep
+_sessions = threading.local()
+
+async def _async_sleep(seconds):
+    # asyncio is imported on first use; only the daily run waits on the event loop
+    import asyncio
+    await asyncio.sleep(seconds)
+
+def _forget_sessions():
+    # A forked child must not write to the parent's keep-alive sockets; it opens its own connections.
+    # The inherited sessions are dropped, not closed, so the parent's connections stay usable.
+    global _sessions
+    _sessions = threading.local()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_forget_sessions)
+
+def get_session():
+    """Thread-local requests session, so calls to the same host reuse connections; never shared with forked children"""
+    session = getattr(_sessions, 'session', None)
+    if session is None:
+        import requests
+        session = _sessions.session = requests.Session()
+    return session
+
+def _parse_duration(value):
+    """Seconds from '1.5', '20ms' or OpenAI style '6m0s' / '1h2m3.5s' durations, or None"""
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    if value.endswith('ms'):
+        try:
+            return float(value[:-2]) / 1000
+        except ValueError:
+            return None
+    total, number = 0.0, ''
+    for char in value:
+        if char.isdigit() or char == '.':
+            number += char
+        elif char in 'hms' and number:
+            total += float(number) * {'h': 3600, 'm': 60, 's': 1}[char]
+            number = ''
+        else:
+            return None
+    return total if not number else None
+
+def retry_after_seconds(headers, now=None):
+    """
+    Seconds the server asked us to wait, from Retry-After (seconds or HTTP date), retry-after-ms,
+    an exhausted X-RateLimit-Reset (epoch seconds, GitHub) or x-ratelimit-reset-* (OpenAI). None if no hint.
+    """
+    if not headers:
+        return None
+    headers = {str(k).lower(): v for k, v in headers.items()}
+    now = time.time() if now is None else now
+    if 'retry-after-ms' in headers:
+        seconds = _parse_duration(f"{headers['retry-after-ms']}ms")
+        if seconds is not None:
+            return seconds
+    if 'retry-after' in headers:
+        seconds = _parse_duration(headers['retry-after'])
+        if seconds is None:
+            try:
+                seconds = parsedate_to_datetime(headers['retry-after']).timestamp() - now
+            except (TypeError, ValueError):
+                seconds = None
+        if seconds is not None:
+            return max(seconds, 0.0)
+    if headers.get('x-ratelimit-remaining') == '0' and 'x-ratelimit-reset' in headers:
+        try:
+            return max(float(headers['x-ratelimit-reset']) - now, 0.0)
+        except ValueError:
+            pass
+    resets = [_parse_duration(headers[name]) for name in ('x-ratelimit-reset-requests', 'x-ratelimit-reset-tokens') if name in headers]
+    resets = [seconds for seconds in resets if seconds is not None]
+    return max(resets) if resets else None
+
+def _is_rate_limited(response):
+    # GitHub reports an exhausted primary rate limit as 403 with no requests remaining
+    return response.status_code in RETRYABLE_STATUSES or (
+        response.status_code == 403 and response.headers.get('X-RateLimit-Remaining') == '0')
+
+def _is_rejected(response):
+    # Rate limited: the server turned the request away without acting on it
+    return response.status_code == 429 or (response.status_code == 403 and response.headers.get('X-RateLimit-Remaining') == '0')
+
+def _exception_response(exc):
+    return getattr(exc, 'response', None)
+
+def is_retryable_exception(exc):
+    """Retry rate limits, server errors, timeouts and connection failures; nothing else"""
+    if isinstance(exc, RetryableStatusError):
+        return True
+    if isinstance(exc, CircuitOpenError):
+        return False
+    status = getattr(exc, 'status_code', None)
+    if status is not None:
+        return status in RETRYABLE_STATUSES
+    # requests and openai/httpx name their transient errors alike
+    return any(name in type(exc).__name__ for name in ('ConnectionError', 'Timeout', 'APIConnectionError', 'APITimeoutError'))
+
+def failed_before_sending(exc):
+    """True if the request never reached the server: the connection could not be set up or timed out connecting"""
+    from urllib3.exceptions import NewConnectionError, ConnectTimeoutError
+    # requests wraps urllib3's error in MaxRetryError inside its own ConnectionError
+    for _ in range(4):
+        if exc is None:
+            return False
+        if isinstance(exc, (NewConnectionError, ConnectTimeoutError)) or type(exc).__name__ == 'ConnectTimeout':
+            return True
+        exc = getattr(exc, 'reason', None) or next((arg for arg in getattr(exc, 'args', ()) if isinstance(arg, BaseException)), None)
+    return False
+
+def is_safe_to_resend(exc):
+    """is_retryable_exception for requests that must not be applied twice, e.g. a POST that creates a comment"""
+    if isinstance(exc, RetryableStatusError):
+        return _is_rejected(exc.response)
+    return is_retryable_exception(exc) and failed_before_sending(exc)
+
+def backoff_seconds(attempt, hint=None):
+    """Server hint plus a little jitter, else exponential backoff with equal jitter"""
+    if hint is not None:
+        return hint + random.uniform(0, RETRY_JITTER)
+    ceiling = min(RETRY_MAX_WAIT, RETRY_BASE_WAIT * 2 ** (attempt - 1))
+    return ceiling / 2 + random.uniform(0, ceiling / 2)
+
+def _server_hint(exc):
+    response = _exception_response(exc)
+    return retry_after_seconds(getattr(response, 'headers', None)) if response is not None else None
+
+def _retry_options(host, attempts, retryable=is_retryable_exception):
+    """tenacity options shared by call_with_retries and async_call_with_retries"""
+    from tenacity import stop_after_attempt, retry_if_exception
+
+    def should_retry(exc):
+        if not retryable(exc):
+            return False
+        hint = _server_hint(exc)
+        if hint is not None and hint > RETRY_MAX_WAIT:
+            breaker.trip(host, hint)
+            return False
+        return True
+
+    def wait(retry_state):
+        exc = retry_state.outcome.exception()
+        seconds = backoff_seconds(retry_state.attempt_number, _server_hint(exc))
+        logging.warning("[retry_policy.py] [call_with_retries] %s: %s, retrying in %.1fs (attempt %s of %s)",
+                        host, exc, seconds, retry_state.attempt_number, attempts)
+        return seconds
+
+    return dict(stop=stop_after_attempt(attempts), wait=wait, retry=retry_if_exception(should_retry), reraise=True)
+
+def call_with_retries(host, func, *args, attempts=MAX_RETRIES, retryable=is_retryable_exception, **kwargs):
+    """
+    Call func(*args, **kwargs) under the retry policy for host. Failures `retryable` accepts are
+    retried up to `attempts` times in total, waiting as long as the server asks (plus jitter) or with
+    exponential backoff. A server hint longer than RETRY_MAX_WAIT is not waited out: the host's circuit
+    is opened until then and the failure is raised at once. Every failed attempt counts towards the breaker.
+    """
+    from tenacity import Retrying
+
+    def attempt():
+        breaker.check(host)
+        try:
+            result = func(*args, **kwargs)
+        except Exception as exc:
+            if is_retryable_exception(exc):
+                breaker.record_failure(host)
+            raise
+        breaker.record_success(host)
+        return result
+
+    retrying = Retrying(sleep=lambda seconds: _sleep(seconds), **_retry_options(host, attempts, retryable))
+    return retrying(attempt)
+
+async def async_call_with_retries(host, func, *args, attempts=MAX_RETRIES, **kwargs):
+    """call_with_retries for a coroutine function, e.g. an AsyncOpenAI method; waits without blocking the event loop"""
+    from tenacity import AsyncRetrying
+
+    async def attempt():
+        breaker.check(host)
+        try:
+            result = await func(*args, **kwargs)
+        except Exception as exc:
+            if is_retryable_exception(exc):
+                breaker.record_failure(host)
+            raise
+        breaker.record_success(host)
+        return result
+
+    retrying = AsyncRetrying(sleep=lambda seconds: _async_sleep(seconds), **_retry_options(host, attempts))
+    return await retrying(attempt)
+
+def http_request(method, url, idempotent=None, **kwargs):
+    """
+    HTTP request through the shared session under the retry policy. Returns the final response,
+    which may still carry a retryable status once attempts run out; raises CircuitOpenError if the
+    host is failing and connection errors as requests does.
+
+    Requests that are not idempotent (by method, unless idempotent says otherwise) are only resent
+    when the server cannot have acted on them: rate limited, or the connection was never set up.
+    A timeout or 5xx after the request went out is returned or raised instead, so a comment is
+    never posted twice; it still counts as a failure towards the host's circuit breaker.
+    """
+    host = urlsplit(url).netloc
+    kwargs.setdefault('timeout', API_TIMEOUT)
+    if idempotent is None:
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+
+    def send():
+        response = get_session().request(method, url, **kwargs)
+        # Raised so the breaker records the failure; is_safe_to_resend decides whether a POST is sent again
+        if _is_rate_limited(response):
+            raise RetryableStatusError(response)
+        return response
+
+    try:
+        return call_with_retries(host, send, retryable=is_retryable_exception if idempotent else is_safe_to_resend)
+    except RetryableStatusError as e:
+        logging.error("[retry_policy.py] [http_request] %s %s still failing: HTTP %s", method.upper(), url, e.response.status_code)
+        return e.response
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Similarity Index Module - MinHash signatures and LSH buckets for finding reworded repeats of
+trivia questions and daily facts without comparing a candidate against the whole history
+"""
+
+import hashlib
+import re
+import struct
+import zlib
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from core.config import (DAILY_FACT_TEMPLATES, SIMILARITY_SHINGLE_SIZE, SIMILARITY_BANDS, SIMILARITY_ROWS,
+                         SIMILARITY_THRESHOLD)
+
+NUM_PERMUTATIONS = SIMILARITY_BANDS * SIMILARITY_ROWS
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_SIGNATURE_FORMAT = f"<{NUM_PERMUTATIONS}I"
+
+def _seeded(name, index):
+    # Signatures are persisted, so the permutations must not change between runs or Python versions
+    return int.from_bytes(hashlib.sha256(f"{name}:{index}".encode()).digest()[:8], 'little') % _MERSENNE_PRIME
+
+_PERMUTATIONS = [(_seeded('a', i) or 1, _seeded('b', i)) for i in range(NUM_PERMUTATIONS)]
+# Words that vary between rewordings of the same question ("Which planet is known as..." /
+# "What planet is called...") without changing what is asked
+STOPWORDS = frozenset('a an and are as by called did do does for how in is known name of on our the this to '
+                      'was were what when where which who whom whose why'.split())
+_FACT_PREFIXES = sorted((template.split('{fact}')[0] for template in DAILY_FACT_TEMPLATES), key=len, reverse=True)
+
+def normalize_text(text, kind='trivia'):
+    """Lowercase words without punctuation or stopwords; daily facts also lose their 'Did you know?' style prefix"""
+    text = str(text or '')
+    if kind == 'fact':
+        for prefix in _FACT_PREFIXES:
+            if prefix and text.startswith(prefix):
+                text = text[len(prefix):]
+                break
+    return ' '.join(word for word in re.sub(r'[\W_]+', ' ', text.casefold()).split() if word not in STOPWORDS)
+
+def shingles(text, size=SIMILARITY_SHINGLE_SIZE):
+    """Set of overlapping character n-grams of normalized text"""
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+def minhash_signature(text, kind='trivia'):
+    """Tuple of NUM_PERMUTATIONS minimum hashes of the text's shingles, or None for empty text"""
+    hashed = [zlib.crc32(shingle.encode('utf-8')) for shingle in shingles(normalize_text(text, kind))]
+    if not hashed:
+        return None
+    return tuple(min(((a * x + b) % _MERSENNE_PRIME) & _MAX_HASH for x in hashed) for a, b in _PERMUTATIONS)
+
+def encode_signature(signature):
+    return struct.pack(_SIGNATURE_FORMAT, *signature)
+
+def decode_signature(blob):
+    return struct.unpack(_SIGNATURE_FORMAT, blob)
+
+def lsh_buckets(signature):
+    """
+    One bucket id per band of SIMILARITY_ROWS hashes. Texts sharing any bucket are candidates;
+    with the default 20 bands of 3 rows a pair at similarity 0.5 shares one with probability ~0.93,
+    a pair at 0.2 with ~0.15.
+    """
+    buckets = []
+    for band in range(SIMILARITY_BANDS):
+        rows = signature[band * SIMILARITY_ROWS:(band + 1) * SIMILARITY_ROWS]
+        digest = hashlib.blake2b(struct.pack(f"<I{SIMILARITY_ROWS}I", band, *rows), digest_size=8).digest()
+        buckets.append(int.from_bytes(digest, 'little', signed=True))
+    return buckets
+
+def estimated_similarity(signature_a, signature_b):
+    """Estimated Jaccard similarity of the two texts' shingle sets"""
+    return sum(1 for a, b in zip(signature_a, signature_b) if a == b) / NUM_PERMUTATIONS
+
+def index_entries(kind, items):
+    """(item_key, signature blob, buckets) rows for {item_key: text}, skipping empty texts"""
+    entries = []
+    for item_key, text in items.items():
+        signature = minhash_signature(text, kind)
+        if signature is not None:
+            entries.append((item_key, encode_signature(signature), lsh_buckets(signature)))
+    return entries
+
+def find_near_duplicates(db, kind, text, threshold=SIMILARITY_THRESHOLD):
+    """
+    Indexed items of `kind` ('trivia' or 'fact') whose estimated similarity to text is at least
+    threshold, as [(item_key, similarity)] most similar first. Only items sharing an LSH bucket
+    with the text are compared.
+    """
+    signature = minhash_signature(text, kind)
+    if signature is None:
+        return []
+    candidates = db.get_similarity_candidates(kind, lsh_buckets(signature))
+    matches = [(item_key, estimated_similarity(signature, decode_signature(blob))) for item_key, blob in candidates.items()]
+    return sorted((match for match in matches if match[1] >= threshold), key=lambda match: -match[1])
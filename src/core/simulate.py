@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Simulation Module - Synthetic answer issues and an offline GitHub stand-in for load-testing process_answers
+"""
+
+import base64
+import json
+import random
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from core.config import ISSUE_TEMPLATE, ISSUE_LABEL
+import logging
+logging.basicConfig(level=logging.INFO, format='[%(levelname)s] %(message)s')
+
+SIM_OWNER = "sim-owner"
+SIM_REPO = "sim-trivia"
+SIM_START_DATE = "2025-01-01"
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Every body format parse_issue accepts, with how often users send it
+BODY_FORMATS = {
+    'title': 0.6,           # Answer link: letter in the title, option text and dotted date in the body
+    'answer_letter': 0.1,   # "**Answer:** B" with a plain ISO date
+    'answer_text': 0.1,     # "**Answer:** <option text>" with a bold dotted date
+    'i_choose': 0.1,        # "I choose C" with a plain dotted date
+    'free_text_date': 0.1,  # Letter in the title, ISO date somewhere in free text
+}
+NOISE_RATE = 0.03  # Share of issues that are not answers or cannot be parsed
+
+_OPTION_WORDS = ["Jupiter", "Saturn", "Neptune", "Everest", "Nile", "Amazon", "Da Vinci", "Curie", "Tesla",
+                 "Sahara", "Pacific", "Mercury", "Athens", "Kyoto", "Lima", "Oslo", "Cairo", "Quito"]
+
+def build_sim_trivia(days, seed=42):
+    """One trivia question per day ending on SIM_START_DATE + days - 1, keyed by timestamp"""
+    rng = random.Random(seed)
+    start = datetime.fromisoformat(SIM_START_DATE)
+    trivia = {}
+    for day in range(days):
+        timestamp = (start + timedelta(days=day)).isoformat()
+        words = rng.sample(_OPTION_WORDS, 3)
+        trivia[timestamp] = {
+            'question': f"Simulated question for day {day + 1}?",
+            'options': {letter: f"{word} {day + 1}" for letter, word in zip("ABC", words)},
+            'correct_answer': rng.choice("ABC"),
+            'explanation': "Simulated explanation.",
+            'timestamp': timestamp,
+        }
+    return trivia
+
+def render_issue(body_format, letter, text, trivia_date):
+    """Title and body of an answer issue in the given format; trivia_date is YYYY-MM-DD"""
+    dotted = f"{trivia_date[8:10]}.{trivia_date[5:7]}.{trivia_date[:4]}"
+    if body_format == 'title':
+        return f"Trivia Answer {letter}", ISSUE_TEMPLATE.format(answer_text=text) + f"\n\n**Trivia Date:** {dotted}"
+    if body_format == 'answer_letter':
+        return "Trivia Answer", f"**Answer:** {letter}\n\nTrivia Date: {trivia_date}"
+    if body_format == 'answer_text':
+        return "Trivia Answer", f"**Answer:** {text}\r\n**Trivia Date:** {dotted}"
+    if body_format == 'i_choose':
+        return "Trivia Answer", f"I choose {letter}\n\nTrivia Date: {dotted}"
+    return f"Trivia Answer {letter}", f"Answering from my phone, this is for the trivia of {trivia_date} :)"
+
+def build_issue_payloads(n_users, n_issues, trivia, seed=42):
+    """
+    GitHub-shaped open issues, newest first as the issues API returns them.
+    User activity is skewed: a few users open many issues (duplicates), most open one or two.
+    """
+    rng = random.Random(seed)
+    questions = sorted(trivia.values(), key=lambda q: q['timestamp'])
+    users = [f"simuser{i}" for i in range(n_users)]
+    user_weights = [1 / (rank + 1) for rank in range(n_users)]
+    formats = list(BODY_FORMATS)
+    format_weights = list(BODY_FORMATS.values())
+    created = datetime.fromisoformat(questions[0]['timestamp'])
+    step = timedelta(days=len(questions)) / max(n_issues, 1)
+    issues = []
+    for number in range(1, n_issues + 1):
+        created += step
+        question = questions[min(int((number - 1) * len(questions) / n_issues), len(questions) - 1)]
+        letter = rng.choice("ABC")
+        noise = rng.random()
+        if noise < NOISE_RATE / 2:
+            title, body = "Feature request: harder questions", "Please add a hard mode."
+        elif noise < NOISE_RATE:
+            title, body = "Trivia Answer", "I think it is the second one?"
+        else:
+            title, body = render_issue(rng.choices(formats, format_weights)[0], letter,
+                                       question['options'][letter], question['timestamp'][:10])
+        issues.append({
+            'number': number,
+            'node_id': f"I_sim{number}",
+            'title': title,
+            'body': body,
+            'state': 'open',
+            'user': {'login': rng.choices(users, user_weights)[0]},
+            'labels': [{'name': ISSUE_LABEL}],
+            'created_at': created.strftime('%Y-%m-%dT%H:%M:%SZ'),
+        })
+    issues.reverse()
+    return issues
+
+class FakeGitHub:
+    """
+    Local HTTP stand-in for the GitHub endpoints process_answers uses: paginated issue listing,
+    comments, issue updates, label lookup and the batched GraphQL close. Every request waits
+    `latency` seconds (+-50%) and is answered with 429 and Retry-After with probability `rate_limit`.
+    """
+
+    def __init__(self, issues, latency=0.0, rate_limit=0.0, seed=42):
+        self.issues = {issue['number']: issue for issue in issues}
+        self.order = [issue['number'] for issue in issues]
+        self.by_node_id = {issue['node_id']: issue['number'] for issue in issues}
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = Counter()
+        self.comments = Counter()
+        self.rate_limited = 0
+        self.connections = 0
+        self.malformed = 0
+        self.server = None
+        self.url = None
+
+    def start(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _FakeGitHubHandler)
+        self.server.github = self
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, name="fake-github", daemon=True).start()
+        return self
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+    def stats(self):
+        with self.lock:
+            return {
+                "requests": dict(self.requests),
+                "rate_limited": self.rate_limited,
+                "connections": self.connections,
+                "malformed": self.malformed,
+                "comments": sum(self.comments.values()),
+                "issues_commented_twice": sum(1 for count in self.comments.values() if count > 1),
+                "closed": sum(1 for issue in self.issues.values() if issue['state'] == 'closed'),
+                "open": sum(1 for issue in self.issues.values() if issue['state'] == 'open'),
+            }
+
+    def handle(self, method, path, query, payload):
+        """Return (status, body, headers) for one request"""
+        with self.lock:
+            delay = self.latency * self.rng.uniform(0.5, 1.5) if self.latency else 0
+            limited = self.rate_limit and self.rng.random() < self.rate_limit
+        if delay:
+            time.sleep(delay)
+        parts = path.strip('/').split('/')
+        route = self._route(method, parts)
+        with self.lock:
+            self.requests[route] += 1
+            if limited:
+                self.rate_limited += 1
+                return 429, {"message": "API rate limit exceeded"}, {"Retry-After": "1", "X-RateLimit-Remaining": "0"}
+            if route == 'list_issues':
+                return self._list_issues(query)
+            if route == 'comment':
+                self.comments[int(parts[4])] += 1
+                return 201, {"id": sum(self.comments.values())}, {}
+            if route == 'update_issue':
+                issue = self.issues.get(int(parts[4]))
+                if issue is None:
+                    return 404, {"message": "Not Found"}, {}
+                if payload.get('state'):
+                    issue['state'] = payload['state']
+                if 'labels' in payload:
+                    issue['labels'] = [{'name': name} for name in payload['labels']]
+                return 200, issue, {}
+            if route == 'label':
+                return 200, {"name": parts[4], "node_id": f"LA_{parts[4]}"}, {}
+            if route == 'graphql':
+                return self._graphql(payload)
+        return 404, {"message": "Not Found"}, {}
+
+    def _route(self, method, parts):
+        if method == 'POST' and parts == ['graphql']:
+            return 'graphql'
+        if len(parts) < 4 or parts[:3] != ['repos', SIM_OWNER, SIM_REPO]:
+            return 'unknown'
+        if method == 'GET' and parts[3:] == ['issues']:
+            return 'list_issues'
+        if method == 'GET' and parts[3] == 'labels' and len(parts) == 5:
+            return 'label'
+        if parts[3] == 'issues' and len(parts) == 6 and parts[5] == 'comments' and method == 'POST':
+            return 'comment'
+        if parts[3] == 'issues' and len(parts) == 5 and method == 'PATCH':
+            return 'update_issue'
+        return 'unknown'
+
+    def _list_issues(self, query):
+        per_page = min(int(query.get('per_page', ['30'])[0]), 100)
+        page = int(query.get('page', ['1'])[0])
+        open_numbers = [n for n in self.order if self.issues[n]['state'] == 'open']
+        items = [self.issues[n] for n in open_numbers[(page - 1) * per_page:page * per_page]]
+        headers = {}
+        if page * per_page < len(open_numbers):
+            headers['Link'] = f'<{self.url}/repos/{SIM_OWNER}/{SIM_REPO}/issues?state=open&per_page={per_page}&page={page + 1}>; rel="next"'
+        return 200, items, headers
+
+    def _graphql(self, payload):
+        variables = payload.get('variables') or {}
+        data = {}
+        for name, node_id in variables.items():
+            if not name.startswith('issue'):
+                continue
+            i = name[len('issue'):]
+            number = self.by_node_id.get(node_id)
+            if number is None:
+                data[f"x{i}"] = None
+                continue
+            self.comments[number] += 1
+            self.issues[number]['state'] = 'closed'
+            data[f"c{i}"] = {"clientMutationId": None}
+            data[f"x{i}"] = {"issue": {"number": number}}
+        return 200, {"data": data}, {}
+
+class _FakeGitHubHandler(BaseHTTPRequestHandler):
+    server_version = "FakeGitHub/1.0"
+    protocol_version = "HTTP/1.1"  # Keep-alive, as GitHub does, so clients reuse connections
+    disable_nagle_algorithm = True  # Headers and body go out in separate writes
+
+    def setup(self):
+        super().setup()
+        with self.server.github.lock:
+            self.server.github.connections += 1
+
+    def _dispatch(self, method):
+        url = urlsplit(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            payload = json.loads(self.rfile.read(length) or b'{}') if length else {}
+        except ValueError:
+            # Interleaved writes from two clients sharing one connection
+            self.send_error(400, "Problems parsing JSON")
+            return
+        status, body, headers = self.server.github.handle(method, url.path, parse_qs(url.query), payload)
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_error(self, code, message=None, explain=None):
+        if code == 400:
+            with self.server.github.lock:
+                self.server.github.malformed += 1
+        super().send_error(code, message, explain)
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_PATCH(self):
+        self._dispatch('PATCH')
+
+    def log_message(self, format, *args):
+        pass
+
+# Runs process_answers in a fresh interpreter so config picks up the simulation environment
+_CHILD_SCRIPT = """
+import sys, time
+sys.path.insert(0, {src_dir!r})
+from core.process_answers import process_answers
+start = time.perf_counter()
+process_answers(workers={workers})
+print("SIMULATION_SECONDS", time.perf_counter() - start)
+"""
+
+def run_simulation(n_users=500, n_issues=1000, days=7, latency=0.005, rate_limit=0.01, seed=42, keep_dir=False, workers=1):
+    """
+    Generate answer issues for `days` trivia questions, serve them from a FakeGitHub and run
+    process_answers (with `workers` processes) against it with a temporary database. Returns a summary dict.
+    """
+    from core.database import TriviaDatabase
+    workdir = tempfile.mkdtemp(prefix="trivia-sim-")
+    db_path = os.path.join(workdir, "trivia.db")
+    trivia = build_sim_trivia(days, seed)
+    TriviaDatabase(db_path=db_path).update_trivia_questions(trivia)
+    issues = build_issue_payloads(n_users, n_issues, trivia, seed)
+    github = FakeGitHub(issues, latency=latency, rate_limit=rate_limit, seed=seed).start()
+
+    env = dict(os.environ,
+               GITHUB_API_URL=github.url, GITHUB_TOKEN="sim-token", GITHUB_USERNAME=SIM_OWNER, GITHUB_REPO=SIM_REPO,
+               TRIVIA_DB_PATH=db_path, TRIVIA_DB_COMPRESSED_PATH=os.path.join(workdir, "trivia_database.db.gz"))
+    env.setdefault("OPENAI_API_KEY", "sim")
+    env.setdefault("TRIVIA_DB_PASSWORD", "sim")
+    env.setdefault("TRIVIA_DB_SALT", base64.b64encode(b"simulation-salt!").decode())
+    logging.info("[simulate.py] [run_simulation] %s issues from %s users over %s days against %s", n_issues, n_users, days, github.url)
+    try:
+        start = time.perf_counter()
+        child = subprocess.run([sys.executable, "-c", _CHILD_SCRIPT.format(src_dir=SRC_DIR, workers=int(workers))],
+                               env=env, capture_output=True, text=True)
+        wall_seconds = time.perf_counter() - start
+        if child.returncode != 0:
+            raise RuntimeError(f"process_answers failed (exit {child.returncode}): {child.stderr[-2000:]}")
+        seconds = next((float(line.split()[1]) for line in child.stdout.splitlines() if line.startswith("SIMULATION_SECONDS")), wall_seconds)
+        journal = TriviaDatabase(db_path=db_path).get_processed_issues()
+        leaderboard = TriviaDatabase(db_path=db_path).get_leaderboard()
+    finally:
+        github.stop()
+        if not keep_dir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return {
+        "issues": n_issues,
+        "users": n_users,
+        "days": days,
+        "workers": workers,
+        "seconds": seconds,
+        "issues_per_second": n_issues / seconds if seconds else float("inf"),
+        "outcomes": dict(Counter(entry['outcome'] for entry in journal.values())),
+        "journal_status": dict(Counter(entry['status'] for entry in journal.values())),
+        "leaderboard_users": len(leaderboard),
+        "github": github.stats(),
+        "workdir": workdir if keep_dir else None,
+    }
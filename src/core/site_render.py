@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Site Render Module - Renders the README, the leaderboard.json feed and the static HTML pages from
+one view model, and replaces the files that changed together once all of them are rendered
+"""
+
+import glob
+import html
+import json
+import tempfile
+from datetime import datetime
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from core.config import DATE_FORMAT, README_DIFF_MAX_HUNKS, SITE_DIR, SITE_PAGE_SIZE
+from core import daily_trivia as dt
+from core.readme_sections import content_digest, diff_summary
+from core.tenants import tenant_value
+import logging
+logging.basicConfig(level=logging.INFO, format='[%(levelname)s] %(message)s')
+
+README_FILE = "README.md"
+FEED_FILE = "leaderboard.json"
+RENDER_TARGETS = ('readme', 'json', 'html')
+FEED_VERSION = 1
+
+HTML_PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{title}</title>
+</head>
+<body>
+{body}
+</body>
+</html>
+"""
+
+def leaderboard_feed(view):
+    """leaderboard.json: the view model with yesterday's Wikipedia link, for dashboards that would otherwise read the database"""
+    yesterday = view['yesterday']
+    if yesterday:
+        yesterday = {key: yesterday[key] for key in ('date', 'question', 'options', 'correct_answer', 'correct_text', 'explanation')}
+        yesterday['wikipedia_link'] = dt.yesterday_wikipedia_link(view)
+    feed = {
+        'version': FEED_VERSION,
+        'date': view['date'],
+        'question': view['question'],
+        'daily_fact': view['daily_fact'],
+        'yesterday': yesterday,
+        'users': len(view['ranking']),
+        'leaderboard': view['ranking'],
+    }
+    return json.dumps(feed, indent=2, ensure_ascii=False) + "\n"
+
+def html_page_name(page):
+    return "index.html" if page == 1 else f"leaderboard-{page}.html"
+
+def _html_leaderboard(users):
+    from core.points_system import get_streak_emoji, format_points_display
+    if not users:
+        return "<p><em>No participants yet</em></p>"
+    rows = "".join(
+        f"<tr><td>{user['rank']}</td><td><a href=\"https://github.com/{html.escape(user['username'])}\">@{html.escape(user['username'])}</a></td>"
+        f"<td>{get_streak_emoji(user['current_streak'])} {user['current_streak']}</td><td>{format_points_display(user['total_points'])}</td>"
+        f"<td>{user['total_correct']}</td><td>{html.escape(str(user['first_correct_date'] or '-'))}</td></tr>\n"
+        for user in users)
+    return ("<table>\n<thead><tr><th>Rank</th><th>User</th><th>Streak</th><th>Points</th><th>Total Correct</th><th>Day Joined</th></tr></thead>\n"
+            f"<tbody>\n{rows}</tbody>\n</table>")
+
+def _html_today(view):
+    question = view['question']
+    options = "".join(f"<li><a href=\"{html.escape(question['answer_links'][letter])}\">Answer {letter}</a> - {html.escape(question['options'][letter])}</li>\n"
+                      for letter in ('A', 'B', 'C'))
+    parts = [
+        f"<h1>Daily Trivia • {html.escape(view['date'])}</h1>",
+        f"<h2>Did You Know?</h2>\n<p>{html.escape(view['daily_fact'])}</p>",
+        f"<h2>Today's Trivia</h2>\n<p><strong>{html.escape(question['question'])}</strong></p>\n<ul>\n{options}</ul>",
+    ]
+    yesterday = view['yesterday']
+    if yesterday:
+        parts.append(
+            f"<h2>Yesterday's Results • {html.escape(yesterday['date'])}</h2>\n"
+            f"<p><strong>Question:</strong> {html.escape(yesterday['question'])}<br>\n"
+            f"<strong>Correct Answer:</strong> {yesterday['correct_answer']}) {html.escape(yesterday['correct_text'])} "
+            f"(<a href=\"{html.escape(dt.yesterday_wikipedia_link(view))}\">Wikipedia</a>)<br>\n"
+            f"<strong>Explanation:</strong> {html.escape(str(yesterday['explanation'] or ''))}</p>")
+    return "\n".join(parts)
+
+def html_pages(view, page_size=None):
+    """{file name: HTML} for the static site: today's content and the first leaderboard page in index.html, the rest paginated"""
+    page_size = page_size or SITE_PAGE_SIZE
+    ranking = view['ranking']
+    page_count = max(1, -(-len(ranking) // page_size))
+    pages = {}
+    for page in range(1, page_count + 1):
+        users = ranking[(page - 1) * page_size:page * page_size]
+        nav = []
+        if page > 1:
+            nav.append(f"<a href=\"{html_page_name(page - 1)}\">&larr; Previous</a>")
+        if page < page_count:
+            nav.append(f"<a href=\"{html_page_name(page + 1)}\">Next &rarr;</a>")
+        body = [_html_today(view)] if page == 1 else [f"<h1>Daily Trivia • {html.escape(view['date'])}</h1>"]
+        body.append(f"<h2>Leaderboard (page {page} of {page_count})</h2>\n{_html_leaderboard(users)}")
+        if nav:
+            body.append(f"<nav>{' | '.join(nav)}</nav>")
+        pages[html_page_name(page)] = HTML_PAGE_TEMPLATE.format(title=f"Daily Trivia Leaderboard - page {page}", body="\n".join(body))
+    return pages
+
+def _read(path):
+    if not os.path.exists(path):
+        return ""
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+def write_outputs(outputs, remove=()):
+    """
+    Write {path: content} as one batch: every changed file is first written to a temporary file
+    beside it and only renamed over the target once all of them are on disk, so a failed render
+    never leaves a new README next to yesterday's feed. Paths in remove are deleted afterwards.
+    Returns the paths that were written.
+    """
+    staged = []
+    try:
+        for path, content in outputs.items():
+            if content_digest(content) == content_digest(_read(path)):
+                continue
+            directory = os.path.dirname(path) or "."
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+            staged.append((tmp_path, path))
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(content)
+            # mkstemp creates the file private to its owner; the outputs are meant to be published
+            os.chmod(tmp_path, 0o644)
+    except Exception:
+        for tmp_path, _ in staged:
+            os.unlink(tmp_path)
+        raise
+    for tmp_path, path in staged:
+        os.replace(tmp_path, path)
+    for path in remove:
+        os.unlink(path)
+    return [path for _, path in staged]
+
+def render_site(trivia_data, leaderboard, targets=RENDER_TARGETS, show_diff=False, site_dir=None):
+    """
+    Build the view model once and render the requested targets ('readme', 'json', 'html') from it.
+    Only files whose content changed are written; a tenant's outputs go to its output_dir. Returns
+    the paths written, or None when there is no trivia question for today yet.
+    """
+    logging.debug("[site_render.py] [render_site] Loaded trivia_data: %s", dt.LazyJSON(trivia_data))
+    logging.debug("[site_render.py] [render_site] Loaded leaderboard: %s", dt.LazyJSON(leaderboard))
+    if not trivia_data.get("current"):
+        logging.warning("[site_render.py] [render_site] No trivia question for today, nothing to render.")
+        return None
+    output_dir = tenant_value('output_dir', '')
+    readme_file = os.path.join(output_dir, README_FILE)
+    site_dir = site_dir or os.path.join(output_dir, SITE_DIR)
+    today = datetime.now().strftime(DATE_FORMAT)
+    view = dt.build_view_model(trivia_data, leaderboard, dt.get_todays_fact(), today)
+    outputs = {}
+    remove = []
+    old_readme = _read(readme_file)
+    if 'readme' in targets:
+        # Only sections whose inputs changed are rendered again
+        outputs[readme_file] = dt.render_readme(view, old_readme)
+    if 'json' in targets:
+        outputs[os.path.join(site_dir, FEED_FILE)] = leaderboard_feed(view)
+    if 'html' in targets:
+        pages = {os.path.join(site_dir, name): content for name, content in html_pages(view).items()}
+        outputs.update(pages)
+        # Pages past the end of a leaderboard that got shorter
+        remove = [path for path in glob.glob(os.path.join(site_dir, "leaderboard-*.html")) if path not in pages]
+    written = write_outputs(outputs, remove)
+    if readme_file in written and show_diff:
+        logging.info("[site_render.py] [render_site] README.md has changed. Diff summary:\n%s",
+                     diff_summary(old_readme, outputs[readme_file], README_DIFF_MAX_HUNKS))
+    if written or remove:
+        logging.info("[site_render.py] [render_site] Wrote %s of %s files: %s", len(written), len(outputs), ", ".join(written) or "none")
+    else:
+        logging.info("[site_render.py] [render_site] All %s files are unchanged, no update needed.", len(outputs))
+    return written
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Tenants Module - Registry of the trivia repositories one process can serve, and the context
+variable that points the database, snapshot, GitHub repository and rendered outputs at the
+tenant being worked on
+"""
+
+import contextvars
+import json
+import logging
+import re
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from core.config import TENANTS_FILE, TENANTS_DIR, RUN_ALL_WORKERS
+logging.basicConfig(level=logging.INFO, format='[%(levelname)s] %(message)s')
+
+# Secrets stay in the environment: a tenant names the variables holding its GitHub token and
+# database password and salt, and falls back to GITHUB_TOKEN / TRIVIA_DB_PASSWORD / TRIVIA_DB_SALT
+Tenant = namedtuple('Tenant', ['name', 'github_username', 'github_repo', 'github_token_env', 'password_env', 'salt_env',
+                               'db_path', 'compressed_path', 'output_dir'])
+TENANT_NAME_RE = re.compile(r'^[A-Za-z0-9][A-Za-z0-9_.-]*$')
+RUN_ALL_STEPS = ('import-db', 'daily', 'process-answers', 'render-site', 'export-db')
+
+# manage.py imports this module as src.core.tenants and the pipeline modules import it as core.tenants;
+# both copies must share one variable, or a tenant set through one would be invisible to the other
+_other = sys.modules.get('core.tenants' if __name__ == 'src.core.tenants' else 'src.core.tenants')
+_current_tenant = getattr(_other, '_current_tenant', None) or contextvars.ContextVar('trivia_tenant', default=None)
+
+def current_tenant():
+    """The tenant this thread or task works for, or None in single-repository mode"""
+    return _current_tenant.get()
+
+@contextmanager
+def use_tenant(tenant):
+    """Run the block for tenant; threads started inside it must copy the context to keep it"""
+    token = _current_tenant.set(tenant)
+    try:
+        yield tenant
+    finally:
+        _current_tenant.reset(token)
+
+def tenant_value(field, default):
+    """The current tenant's field, or default (the single-repository setting) without a tenant"""
+    tenant = _current_tenant.get()
+    value = getattr(tenant, field, None) if tenant is not None else None
+    return default if value is None else value
+
+def tenant_env(field, default_name):
+    """Value of the environment variable the current tenant names in field, default_name without one"""
+    return os.getenv(tenant_value(field, default_name))
+
+def load_tenants(path=TENANTS_FILE):
+    """
+    Tenants from the registry file, in file order:
+    {"tenants": [{"name": "acme", "github_username": "acme", "github_repo": "trivia",
+                  "github_token_env": "ACME_GITHUB_TOKEN", ...}]}
+    Paths default to TENANTS_DIR/<name>/; relative paths are relative to the registry file.
+    """
+    with open(path) as f:
+        entries = json.load(f).get('tenants', [])
+    base = os.path.dirname(os.path.abspath(path))
+    tenants = []
+    for entry in entries:
+        name = entry.get('name', '')
+        if not TENANT_NAME_RE.match(name):
+            raise ValueError(f"Invalid tenant name {name!r} in {path}")
+        if any(tenant.name == name for tenant in tenants):
+            raise ValueError(f"Duplicate tenant {name!r} in {path}")
+        missing = [field for field in ('github_username', 'github_repo') if not entry.get(field)]
+        if missing:
+            raise ValueError(f"Tenant {name!r} in {path} is missing {', '.join(missing)}")
+        tenant_dir = os.path.join(TENANTS_DIR, name)
+        def resolve(field, default):
+            value = entry.get(field)
+            return os.path.join(base, value) if value else default
+        tenants.append(Tenant(
+            name=name,
+            github_username=entry['github_username'],
+            github_repo=entry['github_repo'],
+            github_token_env=entry.get('github_token_env'),
+            password_env=entry.get('password_env'),
+            salt_env=entry.get('salt_env'),
+            db_path=resolve('db_path', os.path.join(tenant_dir, "trivia.db")),
+            compressed_path=resolve('compressed_path', os.path.join(tenant_dir, "trivia_database.db.gz")),
+            output_dir=resolve('output_dir', tenant_dir),
+        ))
+    return tenants
+
+def missing_credentials(tenant, steps=RUN_ALL_STEPS):
+    """Environment variables the steps need for tenant that are not set, checked before any tenant starts"""
+    needed = []
+    if 'daily' in steps:
+        needed.append('OPENAI_API_KEY')
+    if 'process-answers' in steps:
+        needed.append(tenant.github_token_env or 'GITHUB_TOKEN')
+    if 'import-db' in steps or 'export-db' in steps:
+        needed += [tenant.password_env or 'TRIVIA_DB_PASSWORD', tenant.salt_env or 'TRIVIA_DB_SALT']
+    return [name for name in needed if not os.getenv(name)]
+
+class TenantLogFilter(logging.Filter):
+    """Prefix log records with the tenant they were logged for, so interleaved runs stay readable"""
+
+    def filter(self, record):
+        tenant = _current_tenant.get()
+        if tenant is not None and not getattr(record, 'tenant', None):
+            record.tenant = tenant.name
+            record.msg = f"[{tenant.name}] {record.msg}"
+        return True
+
+def _run_step(step, process_workers):
+    # Imported per step: a tenant run only loads what its steps use
+    if step == 'import-db':
+        from core.database import TriviaDatabase
+        TriviaDatabase().import_compressed_data()
+    elif step == 'daily':
+        from core.daily_run import run_daily
+        return run_daily()
+    elif step == 'process-answers':
+        from core.process_answers import process_answers
+        process_answers(workers=process_workers) if process_workers else process_answers()
+    elif step == 'render-site':
+        from core.daily_trivia import load_trivia_data, load_leaderboard
+        from core.site_render import render_site
+        if render_site(load_trivia_data(), load_leaderboard()) is None:
+            raise RuntimeError("no trivia question for today")
+    elif step == 'export-db':
+        from core.database import TriviaDatabase
+        TriviaDatabase().export_compressed_data()
+    else:
+        raise ValueError(f"Unknown step {step!r}")
+
+def run_tenant(tenant, steps=RUN_ALL_STEPS, process_workers=None):
+    """
+    Run steps in order for one tenant, stopping at the first failure so a broken run never exports
+    over the tenant's last good snapshot. process_workers overrides the answer scoring processes.
+    Returns {'tenant', 'status', 'steps', 'error', 'seconds'}.
+    """
+    started = time.perf_counter()
+    result = {'tenant': tenant.name, 'status': 'ok', 'steps': {}, 'error': None, 'seconds': 0.0}
+    with use_tenant(tenant):
+        for step in steps:
+            step_started = time.perf_counter()
+            try:
+                _run_step(step, process_workers)
+            except Exception as e:
+                logging.error("[tenants.py] [run_tenant] %s failed: %s", step, e)
+                result.update(status='failed', error=f"{step}: {e}")
+                break
+            finally:
+                result['steps'][step] = time.perf_counter() - step_started
+    result['seconds'] = time.perf_counter() - started
+    return result
+
+def run_all(tenants, steps=RUN_ALL_STEPS, workers=RUN_ALL_WORKERS):
+    """
+    Run steps for every tenant in one process, `workers` tenants at a time. Tenants share the
+    process: imported modules, the OpenAI client settings and resolved model, the response cache,
+    per-thread HTTP sessions and derived database keys. Returns the run_tenant results in tenant order.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    log_filter = TenantLogFilter()
+    handlers = logging.getLogger().handlers
+    for handler in handlers:
+        handler.addFilter(log_filter)
+    try:
+        if workers <= 1:
+            return [run_tenant(tenant, steps) for tenant in tenants]
+        # Forking scoring workers from a threaded process is unsafe, so answers are scored in-process
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='tenant') as executor:
+            return list(executor.map(lambda tenant: run_tenant(tenant, steps, process_workers=1), tenants))
+    finally:
+        for handler in handlers:
+            handler.removeFilter(log_filter)
@@ -4,6 +4,25 @@ from dotenv import load_dotenv
 import logging
 logging.basicConfig(level=logging.INFO, format='[%(levelname)s] %(message)s')
 
+def isolated_db(test):
+    """Run a test with DB_PATH and DB_COMPRESSED_PATH in a temporary directory, so it never touches src/data"""
+    import functools
+    @functools.wraps(test)
+    def wrapper(*args, **kwargs):
+        import sys
+        import tempfile
+        from contextlib import ExitStack
+        from unittest.mock import patch
+        import core.database
+        with tempfile.TemporaryDirectory() as tmpdir, ExitStack() as stack:
+            # The database module is loaded once per import path (database, core.database, src.core.database)
+            for name in ('database', 'core.database', 'src.core.database'):
+                if name in sys.modules:
+                    stack.enter_context(patch.multiple(sys.modules[name], DB_PATH=os.path.join(tmpdir, "trivia.db"),
+                                                       DB_COMPRESSED_PATH=os.path.join(tmpdir, "trivia_database.db.gz")))
+            return test(*args, **kwargs)
+    return wrapper
+
 def test_decrypt_and_decompress():
     try:
         with open("src/data/trivia_database.db.gz", "rb") as f:
@@ -140,6 +159,1123 @@ def test_process_answers_scoring():
     except Exception as e:
         logging.error("[TEST] ERROR: process_answers scoring: %s", e)
 
+@isolated_db
+def test_answer_matcher():
+    from core.issue_parser import AnswerMatcher
+    matcher = AnswerMatcher({
+        '2025-01-01': {'options': {'A': '2007', 'B': '2005', 'C': '2007 edition'}},
+        '2025-01-02': {'options': {'A': 'Jupiter', 'B': '2007', 'C': 'Mars'}},
+    })
+    assert matcher.match("**Answer:** Jupiter") == 'A'
+    assert matcher.match("**Answer:** 2007 edition\n\n**Trivia Date:** 2025-01-01", '2025-01-01') == 'C'
+    assert matcher.match("**Answer:** 2007", '2025-01-02') == 'B'
+    assert matcher.match("**Answer:** 2007") is None, "Ambiguous answer text must not guess a date"
+    assert matcher.match("**Answer:** Pluto") is None
+    print("[TEST] Answer matcher resolves option texts per trivia date (OK)")
+
+@isolated_db
+def test_issue_parser_formats():
+    from core.issue_parser import AnswerMatcher, parse_issue
+    matcher = AnswerMatcher({'2025-01-01': {'options': {'A': 'Apple', 'B': 'Banana', 'C': 'Cherry'}}})
+    cases = [
+        ({'title': 'Trivia Answer B', 'body': '**Trivia Date:** 2025-01-01'}, 'B', 'title', 'bold'),
+        ({'title': 'Trivia Answer', 'body': '**Answer:** C\nTrivia Date: 01.01.2025'}, 'C', 'answer_letter', 'plain'),
+        ({'title': 'Trivia Answer', 'body': '**Answer:** Apple\n\n**Trivia Date:** 2025-01-01'}, 'A', 'answer_text', 'bold'),
+        ({'title': 'Trivia Answer', 'body': 'I choose B on 2025-01-01'}, 'B', 'i_choose', 'iso'),
+        ({'title': 'Trivia Answer', 'body': None}, None, None, None),
+    ]
+    for issue, answer, answer_format, date_format in cases:
+        parsed = parse_issue(issue, matcher)
+        assert (parsed.answer, parsed.answer_format, parsed.date_format) == (answer, answer_format, date_format), parsed
+    print("[TEST] Issue parser formats (OK)")
+
+@isolated_db
+def test_issue_parser_benchmark_corpus():
+    from core.benchmarks import bench_issue_parser
+    # Timing thresholds belong to manage.py bench-parser --min-rate; here only the corpus is checked
+    result = bench_issue_parser(n_issues=600, repeat=1)
+    assert sum(result['formats'].values()) == 600
+    assert None not in result['formats'], f"Benchmark corpus has unparsed issues: {result['formats']}"
+    assert result['issues_per_second'] > 0
+    print("[TEST] Issue parser benchmark corpus parses in every format (OK)")
+
+@isolated_db
+def test_webhook_server_scores_answer():
+    import hashlib
+    import hmac
+    import json
+    import tempfile
+    import threading
+    import urllib.request
+    import urllib.error
+    from unittest.mock import patch
+    from core import process_answers as pa
+    from core.database import TriviaDatabase
+    from core.webhook_server import AnswerProcessor, make_server
+    secret = 'test-secret'
+    trivia = {'2025-01-01': {'question': 'Test Q', 'options': {'A': 'A1', 'B': 'B1', 'C': 'C1'},
+                             'correct_answer': 'A', 'explanation': 'Because A'}}
+    leaderboard = {}
+    closed = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db = TriviaDatabase(db_path=f"{tmpdir}/trivia.db")
+        db.compressed_path = f"{tmpdir}/trivia_database.db.gz"
+        def fake_close(number, comment):
+            # The score is saved and journaled before GitHub sees the comment
+            assert db.get_processed_issues([number])[number]['status'] == 'scored', number
+            closed.append(number)
+            return True
+        with patch.object(pa, 'close_issue', side_effect=fake_close), patch.object(pa, 'TriviaDatabase', lambda: db):
+            processor = AnswerProcessor(trivia, leaderboard, workers=2, batch_size=1, flush_interval=0.1)
+            server = make_server(processor, port=0, secret=secret)
+            processor.start()
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            url = f"http://127.0.0.1:{server.server_address[1]}/"
+            def post(payload, signature=None):
+                body = json.dumps(payload).encode()
+                signature = signature or 'sha256=' + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+                request = urllib.request.Request(url, data=body, headers={'X-GitHub-Event': 'issues', 'X-Hub-Signature-256': signature})
+                try:
+                    return urllib.request.urlopen(request).status
+                except urllib.error.HTTPError as e:
+                    return e.code
+            issue = {'number': 7, 'user': {'login': 'hookuser'}, 'title': 'Trivia Answer A', 'body': '**Trivia Date:** 2025-01-01'}
+            assert post({'action': 'opened', 'issue': issue}, signature='sha256=forged') == 401
+            assert post({'action': 'opened', 'issue': issue}) == 202
+            processor.events.join()
+            processor.flush()
+            # A batch run writes while the server is up: its rows must survive the server's next flush
+            rows = db.get_leaderboard()
+            rows['hookuser'].update(total_points=10, last_answered='2000-01-01T00:00:00')
+            rows['batchuser'] = dict(rows['hookuser'], total_points=3)
+            db.update_leaderboard(rows)
+            late = dict(issue, number=8, body='**Trivia Date:** 2025-01-02')
+            trivia['2025-01-02'] = dict(trivia['2025-01-01'])
+            processor._set_trivia(trivia)
+            # An export that fails after the answers were committed must not queue them a second time
+            with patch.object(db, 'export_compressed_data', side_effect=OSError("disk full")):
+                assert post({'action': 'opened', 'issue': late}) == 202
+                processor.events.join()
+                processor.flush()
+            # Redelivered events, and issues process-answers already journaled, get no second comment
+            db.record_issue_results([(5, 'correct', 'Scored by process-answers')], {})
+            for redelivered in (issue, late, dict(issue, number=5, user={'login': 'batchuser'})):
+                assert post({'action': 'opened', 'issue': redelivered}) == 202
+            processor.events.join()
+            # An answer that cannot be saved is left open and unjournaled, then scored on its next delivery
+            other = dict(issue, number=9, user={'login': 'otheruser'})
+            with patch.object(db, 'record_issue_results', side_effect=OSError("database is locked")):
+                assert post({'action': 'opened', 'issue': other}) == 202
+                processor.events.join()
+            assert 9 not in closed and not db.get_processed_issues([9]) and 'otheruser' not in processor.leaderboard
+            assert post({'action': 'opened', 'issue': other}) == 202
+            processor.events.join()
+            server.shutdown()
+            server.server_close()
+            processor.stop()
+        saved = db.get_leaderboard()
+        events = [row for chunk in db.iter_answer_events() for row in chunk]
+        journal = db.get_processed_issues()
+    assert closed == [7, 8, 9]
+    assert [(row[1], row[2]) for row in events] == [(7, 'hookuser'), (8, 'hookuser'), (9, 'otheruser')], events
+    assert {number: (entry['status'], entry['outcome']) for number, entry in journal.items()} == \
+        {5: ('scored', 'correct'), 7: ('closed', 'correct'), 8: ('closed', 'correct'), 9: ('closed', 'correct')}, journal
+    assert saved['batchuser']['total_points'] == 3, "Flush overwrote a row it did not score"
+    assert saved['hookuser']['total_points'] > 10, "Scoring did not start from the row in the database"
+    print("[TEST] Webhook server verified signature and scored answer (OK)")
+
+@isolated_db
+def test_webhook_server_stops_on_sigterm():
+    import signal
+    import threading
+    from unittest.mock import patch
+    from core import webhook_server
+    from core.webhook_server import AnswerProcessor
+    stopped = []
+    real_stop = AnswerProcessor.stop
+    def stop(processor):
+        real_stop(processor)
+        stopped.append(processor)
+    handler = signal.getsignal(signal.SIGTERM)
+    timer = threading.Timer(0.5, os.kill, (os.getpid(), signal.SIGTERM))
+    with patch.object(webhook_server, 'GITHUB_WEBHOOK_SECRET', 'test-secret'), patch.object(AnswerProcessor, 'stop', stop):
+        timer.start()
+        try:
+            webhook_server.serve_webhooks(port=0, workers=1)
+        finally:
+            timer.cancel()
+    # SIGTERM drains and saves like Ctrl-C, then the previous handler is back
+    assert len(stopped) == 1 and signal.getsignal(signal.SIGTERM) == handler
+    print("[TEST] Webhook server drains its queue on SIGTERM (OK)")
+
+@isolated_db
+def test_process_answers_resumes_from_journal():
+    import tempfile
+    from unittest.mock import patch
+    from core import process_answers as pa
+    from core.database import TriviaDatabase
+    trivia = {'current': {'question': 'Test Q', 'options': {'A': 'A1', 'B': 'B1', 'C': 'C1'}, 'correct_answer': 'A',
+                          'explanation': 'Because A', 'timestamp': '2025-01-01T00:00:00'}, 'history': []}
+    issues = [{'number': n, 'user': {'login': f'journaluser{n}'}, 'title': 'Trivia Answer A',
+               'body': '**Trivia Date:** 2025-01-01'} for n in (1, 2)]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db = TriviaDatabase(db_path=f"{tmpdir}/trivia.db")
+        closed = []
+        def flaky_close(number, comment):
+            closed.append(number)
+            return closed != [1, 2]  # First GitHub write for issue 2 fails
+        with patch.object(pa, 'TriviaDatabase', lambda: db), patch.object(pa, 'load_trivia_data', return_value=trivia), \
+             patch.object(pa, 'get_github_issues', return_value=issues), patch.object(pa, 'close_issue', side_effect=flaky_close), \
+             patch.object(pa, 'save_leaderboard'), patch.object(pa, 'mark_unplanned_issues'):
+            pa.process_answers()
+            assert db.get_processed_issues()[2]['status'] == 'scored'
+            # Rerun: issue 1 is skipped, issue 2 is replayed without being scored twice
+            pa.process_answers()
+        assert closed == [1, 2, 2], closed
+        assert db.get_processed_issues()[2]['status'] == 'closed'
+        assert db.get_leaderboard()['journaluser2']['total_points'] == 1
+    print("[TEST] process_answers resumed from journal without double scoring (OK)")
+
+@isolated_db
+def test_batch_scoring_matches_sequential():
+    import copy
+    from unittest.mock import patch
+    from core import batch_scoring, points_system
+    from core import process_answers as pa
+    from core.benchmarks import build_answer_columns
+    from core.issue_parser import AnswerMatcher
+    columns, trivia_questions_by_date = build_answer_columns(3000, n_users=400, n_days=3)
+    for trivia in trivia_questions_by_date.values():
+        trivia.update({'options': {'A': 'A1', 'B': 'B1', 'C': 'C1'}, 'explanation': 'Because'})
+    initial = {f"user{i}": {'current_streak': i % 7, 'total_correct': 5, 'total_points': 8, 'total_answered': 9,
+                            'last_answered': '2000-01-01T00:00:00', 'last_trivia_date': '2025-01-01' if i % 5 == 0 else None,
+                            'answer_history': []} for i in range(0, 400, 2)}
+    sequential = copy.deepcopy(initial)
+    matcher = AnswerMatcher(trivia_questions_by_date)
+    expected_status = []
+    for number, username, date, answer in zip(*columns):
+        issue = {'number': number, 'user': {'login': username}, 'title': f'Trivia Answer {answer}', 'body': f'**Trivia Date:** {date}'}
+        expected_status.append(pa.score_issue(issue, sequential, trivia_questions_by_date, matcher)[0])
+    def strip(leaderboard):
+        return {user: {k: v for k, v in stats.items() if k not in ('last_answered', 'answer_history')} for user, stats in leaderboard.items()}
+    for numpy_module in (points_system.np, None):
+        with patch.object(batch_scoring, 'np', numpy_module), patch.object(points_system, 'np', numpy_module):
+            batch = copy.deepcopy(initial)
+            scores = batch_scoring.score_answers(columns, batch, trivia_questions_by_date)
+        assert scores.status == expected_status
+        assert strip(batch) == strip(sequential)
+    print("[TEST] Batch scoring matches sequential scoring (OK)")
+
+@isolated_db
+def test_rebuild_leaderboard_from_events():
+    import tempfile
+    from unittest.mock import patch
+    from core import leaderboard_events as le
+    from core.database import TriviaDatabase
+    from core.process_answers import update_user_stats
+    events = [(n, f"eventuser{n % 3}", f"2025-01-{n // 3 + 1:02d}", 'A', n % 4 != 0, f"2025-01-{n // 3 + 1:02d}T12:00:00")
+              for n in range(1, 30)]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db = TriviaDatabase(db_path=f"{tmpdir}/trivia.db")
+        legacy = {'legacyuser': {'current_streak': 2, 'total_correct': 5, 'total_points': 6, 'total_answered': 7,
+                                 'last_answered': '2024-12-31T12:00:00', 'last_trivia_date': '2024-12-31', 'answer_history': []}}
+        db.save_leaderboard_checkpoint(0, legacy, rules_version=0)
+        db.append_answer_events(events[:10])
+        db.append_answer_events(events[10:] + [(99, 'legacyuser', '2025-01-01', 'A', True, '2025-01-01T12:00:00')])
+        # Same answers applied one by one through the live scoring path
+        expected = dict(legacy, legacyuser=dict(legacy['legacyuser']))
+        for issue_number, username, trivia_date, answer, correct, answered_at in events + [(99, 'legacyuser', '2025-01-01', 'A', True, '2025-01-01T12:00:00')]:
+            update_user_stats(expected, username, correct, trivia_date, answered_at)
+        with patch.object(le, 'TriviaDatabase', lambda: db), patch.object(db, 'export_compressed_data'):
+            summary = le.rebuild_leaderboard(chunk_size=7)
+            assert summary['events'] == 30 and summary['from_event_id'] == 0, summary
+            rebuilt = db.get_leaderboard()
+            for username, stats in expected.items():
+                for field in le.PROJECTED_FIELDS + ('last_answered', 'answer_history'):
+                    assert rebuilt[username][field] == stats[field], (username, field)
+            # Second rebuild starts from the checkpoint and changes nothing
+            summary = le.rebuild_leaderboard()
+            assert summary['events'] == 0 and summary['from_event_id'] == 30 and summary['changed_users'] == 0, summary
+            # A rules change ignores the old checkpoint and replays everything
+            with patch.object(le, 'POINTS_RULES_VERSION', 2), patch.object(le, 'calculate_points_for_streak', lambda streak: 10):
+                summary = le.rebuild_leaderboard(dry_run=True)
+            assert summary['events'] == 30 and summary['changed_users'] == len(expected), summary
+    print("[TEST] Leaderboard rebuilt from answer events and checkpoints (OK)")
+
+@isolated_db
+def test_run_log_reaches_exported_database():
+    import json
+    import tempfile
+    from unittest.mock import patch
+    from core import leaderboard_events as le
+    from core.database import TriviaDatabase
+    with tempfile.TemporaryDirectory() as tmpdir:
+        # The workflow's process-answers and update-db jobs each import the same committed snapshot
+        job, committed = TriviaDatabase(db_path=f"{tmpdir}/job.db"), TriviaDatabase(db_path=f"{tmpdir}/committed.db")
+        for db in (job, committed):
+            db.append_answer_events([(1, 'loguser', '2025-01-01', 'A', True, '2025-01-01T12:00:00')])
+        marks = job.get_run_marks()
+        job.record_issue_results([(2, 'correct', 'Well done')], {}, [(2, 'loguser', '2025-01-02', 'A', True, '2025-01-02T12:00:00')])
+        job.record_model_usage({'call_site': 'trivia', 'model': 'gpt-4o-mini', 'prompt_tokens': 10, 'completion_tokens': 5,
+                                'latency_ms': 80, 'retries': 0, 'cached': 0, 'status': 'ok', 'created_at': '2025-01-02T12:00:00'})
+        run_log = json.loads(json.dumps(job.get_run_log(marks)))
+        assert run_log['answer_events'] == [[2, 'loguser', '2025-01-02', 'A', 1, '2025-01-02T12:00:00']], run_log
+        committed.apply_run_log(run_log)
+        assert [row[1] for chunk in committed.iter_answer_events() for row in chunk] == [1, 2]
+        assert committed.get_processed_issues()[2]['outcome'] == 'correct'
+        assert [row['call_site'] for row in committed.get_model_usage()] == ['trivia']
+        with patch.object(le, 'TriviaDatabase', lambda: committed), patch.object(committed, 'export_compressed_data'):
+            assert le.rebuild_leaderboard()['users'] == 1
+            # A leaderboard row the event log does not explain is never silently replaced
+            rows = committed.get_leaderboard()
+            rows['unloggeduser'] = dict(rows['loguser'])
+            committed.update_leaderboard(rows)
+            assert le.rebuild_leaderboard(full=True, dry_run=True)['lost_users'] == 1
+            try:
+                le.rebuild_leaderboard(full=True)
+                assert False, "Rebuild dropped a current user"
+            except RuntimeError:
+                pass
+            assert 'unloggeduser' in committed.get_leaderboard()
+            assert le.rebuild_leaderboard(full=True, force=True)['lost_users'] == 1
+            assert 'unloggeduser' not in committed.get_leaderboard()
+    print("[TEST] Run log carried answer events, journal and model usage to the exported database (OK)")
+
+@isolated_db
+def test_duplicate_answers_closed_in_one_batch():
+    import tempfile
+    from unittest.mock import patch, MagicMock
+    from core import process_answers as pa
+    from core.database import TriviaDatabase
+    trivia = {'current': {'question': 'Test Q', 'options': {'A': 'A1', 'B': 'B1', 'C': 'C1'}, 'correct_answer': 'A',
+                          'explanation': 'Because A', 'timestamp': '2025-01-01T00:00:00'}, 'history': []}
+    # A spammy user opens 20 issues; the oldest one (number 7) is the answer that counts
+    issues = [{'number': n, 'node_id': f'I_{n}', 'user': {'login': 'spammer'}, 'title': f"Trivia Answer {'A' if n == 7 else 'B'}",
+               'body': '**Trivia Date:** 2025-01-01', 'created_at': f'2025-01-01T{(n + 13) % 20:02d}:00:00Z'}
+              for n in range(1, 21)]
+    calls = []
+    def fake_request(method, url, **kwargs):
+        calls.append((method, url))
+        resp = MagicMock(status_code=200)
+        if url.endswith('/graphql'):
+            count = len([k for k in kwargs['json']['variables'] if k.startswith('issue')])
+            resp.json.return_value = {'data': {f'x{i}': {'issue': {'number': 0}} for i in range(count)}}
+        else:
+            resp.json.return_value = {'node_id': 'LA_duplicate'}
+        return resp
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db = TriviaDatabase(db_path=f"{tmpdir}/trivia.db")
+        with patch.object(pa, 'TriviaDatabase', lambda: db), patch.object(pa, 'load_trivia_data', return_value=trivia), \
+             patch.object(pa, 'get_github_issues', return_value=issues), patch.object(pa, 'requests_with_retries', side_effect=fake_request), \
+             patch.object(pa, 'save_leaderboard'), patch.object(pa, 'mark_unplanned_issues'), patch.object(pa, 'GITHUB_TOKEN', 'test-token'):
+            pa.process_answers()
+        # Winner: comment + close; 19 duplicates: label lookup + one GraphQL request
+        assert [method for method, _ in calls].count('post') == 2, calls
+        assert len(calls) == 4, calls
+        assert db.get_leaderboard()['spammer']['total_correct'] == 1
+        journal = db.get_processed_issues()
+        assert journal[7]['outcome'] == 'correct'
+        assert all(journal[n]['status'] == 'closed' and journal[n]['outcome'] == 'duplicate' for n in range(1, 21) if n != 7)
+    print("[TEST] Duplicate answers coalesced and closed in one batch (OK)")
+
+@isolated_db
+def test_simulated_github_load():
+    import tempfile
+    from unittest.mock import patch
+    from core import process_answers as pa
+    from core import simulate
+    from core.database import TriviaDatabase
+    trivia = simulate.build_sim_trivia(days=3)
+    issues = simulate.build_issue_payloads(n_users=40, n_issues=250, trivia=trivia)
+    github = simulate.FakeGitHub(issues).start()
+    try:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db = TriviaDatabase(db_path=f"{tmpdir}/trivia.db")
+            db.update_trivia_questions(trivia)
+            with patch.object(pa, 'TriviaDatabase', lambda: db), patch.object(pa, 'GITHUB_API_URL', github.url), \
+                 patch.object(pa, 'GITHUB_USERNAME', simulate.SIM_OWNER), patch.object(pa, 'GITHUB_REPO', simulate.SIM_REPO), \
+                 patch.object(pa, 'save_leaderboard'), patch.object(pa, 'GITHUB_TOKEN', 'test-token'):
+                pa.process_answers()
+            outcomes = {entry['outcome'] for entry in db.get_processed_issues().values()}
+    finally:
+        github.stop()
+    stats = github.stats()
+    assert stats['requests']['list_issues'] == 3, stats  # 250 issues over pages of 100
+    assert stats['open'] == 0 and stats['issues_commented_twice'] == 0, stats
+    assert {'correct', 'incorrect', 'duplicate'} <= outcomes, outcomes
+    print(f"[TEST] process_answers against simulated GitHub: {stats['requests']} (OK)")
+
+@isolated_db
+def test_comment_templates():
+    from core.comment_templates import CommentTemplates
+    from core.config import CORRECT_MESSAGES
+    trivia = {'options': {'A': 'Set {x}', 'B': 'B1', 'C': 'C1'}, 'correct_answer': 'A', 'explanation': 'Braces {stay} as typed'}
+    templates = CommentTemplates({'2025-01-01': trivia})
+    comment = templates.answer_comment('alice', '2025-01-01', 'A', True, 6, 10, 3, 42, message_index=0)
+    assert comment.startswith(f"{CORRECT_MESSAGES[0]} @alice\n\nYour answer **A) Set {{x}}** is absolutely right!")
+    assert "**Explanation:** Braces {stay} as typed" in comment
+    assert "🔥 Your current streak: **6**" in comment and "💎 Total points: **42**" in comment
+    assert "🏆 Points earned: **3 points**" in comment and "+1 point for 6-day streak!" in comment
+    assert "Next 3-day bonus:** 2 more day(s)" in templates.answer_comment('alice', '2025-01-01', 'A', True, 1, 1, 1, 1)
+    wrong = templates.answer_comment('bob', '2025-01-01', 'B', False)
+    assert "@bob" in wrong and "**Correct Answer:** A) Set {x}" in wrong
+    rows = [('carol', '2025-01-01', 'A', True, 3, 3, 2, 4), ('dave', '2025-01-01', 'C', False, 0, 0, 0, 0)]
+    bulk = templates.answer_comments(rows)
+    assert len(bulk) == 2 and "@carol" in bulk[0] and "was wrong" in bulk[1]
+    print("[TEST] Comment templates render per-user fields (OK)")
+
+@isolated_db
+def test_retry_policy_rate_limits():
+    import tempfile
+    from unittest.mock import patch
+    from core import process_answers as pa
+    from core import retry_policy
+    from core import simulate
+    from core.database import TriviaDatabase
+    assert retry_policy.retry_after_seconds({'Retry-After': '7'}) == 7
+    assert retry_policy.retry_after_seconds({'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': '1100'}, now=1000) == 100
+    assert retry_policy.retry_after_seconds({'x-ratelimit-reset-requests': '1m30s'}) == 90
+    assert retry_policy.retry_after_seconds({'X-RateLimit-Remaining': '12'}) is None
+    trivia = simulate.build_sim_trivia(days=3)
+    issues = simulate.build_issue_payloads(n_users=40, n_issues=250, trivia=trivia)
+    sleeps = []
+    retry_policy.breaker.reset()
+    github = simulate.FakeGitHub(issues, rate_limit=0.05).start()
+    try:
+        with tempfile.TemporaryDirectory() as tmpdir, patch.object(retry_policy, '_sleep', sleeps.append):
+            db = TriviaDatabase(db_path=f"{tmpdir}/trivia.db")
+            db.update_trivia_questions(trivia)
+            with patch.object(pa, 'TriviaDatabase', lambda: db), patch.object(pa, 'GITHUB_API_URL', github.url), \
+                 patch.object(pa, 'GITHUB_USERNAME', simulate.SIM_OWNER), patch.object(pa, 'GITHUB_REPO', simulate.SIM_REPO), \
+                 patch.object(pa, 'save_leaderboard'), patch.object(pa, 'GITHUB_TOKEN', 'test-token'):
+                pa.process_answers()
+    finally:
+        github.stop()
+    stats = github.stats()
+    # Every 429 was retried after its Retry-After hint, so nothing is left open
+    assert stats['rate_limited'] > 0 and stats['open'] == 0, stats
+    assert len(sleeps) == stats['rate_limited'] and all(1 <= s <= 2 for s in sleeps), sleeps
+    # A host that keeps failing trips the breaker and later calls fail without a request
+    github = simulate.FakeGitHub([], rate_limit=1.0).start()
+    try:
+        with patch.object(retry_policy, '_sleep', lambda seconds: None):
+            assert retry_policy.http_request('get', f"{github.url}/rate_limit").status_code == 429
+            try:
+                retry_policy.http_request('get', f"{github.url}/rate_limit")
+                assert False, "circuit breaker did not open"
+            except retry_policy.CircuitOpenError:
+                pass
+    finally:
+        github.stop()
+        retry_policy.breaker.reset()
+    assert github.stats()['rate_limited'] == retry_policy.CIRCUIT_BREAKER_THRESHOLD
+    print(f"[TEST] Retry policy honours Retry-After ({len(sleeps)} retries) and opens the circuit (OK)")
+
+@isolated_db
+def test_retry_policy_never_resends_posts():
+    import socket
+    import threading
+    import time
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from unittest.mock import patch
+    from core import retry_policy
+    received = []
+    class SlowHandler(BaseHTTPRequestHandler):
+        def _answer(self):
+            self.rfile.read(int(self.headers.get('Content-Length') or 0))
+            received.append((self.command, self.path))
+            if self.path == '/slow':
+                time.sleep(0.3)  # Acted on, but the client times out reading the response
+            status = 502 if self.path == '/bad-gateway' else 429 if self.path == '/limited' else 201
+            self.send_response(status)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        do_GET = do_POST = _answer
+        def log_message(self, format, *args):
+            pass
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        closed_url = f"http://127.0.0.1:{probe.getsockname()[1]}"  # Bound but not listening: connection refused
+    sleeps = []
+    retry_policy.breaker.reset()
+    try:
+        with patch.object(retry_policy, '_sleep', sleeps.append):
+            for method, path in (('post', '/slow'), ('get', '/slow')):
+                try:
+                    retry_policy.http_request(method, url + path, timeout=0.1)
+                    assert False, "read timeout was not raised"
+                except Exception as e:
+                    assert 'Timeout' in type(e).__name__, e
+            retry_policy.breaker.reset()
+            assert retry_policy.http_request('post', url + '/bad-gateway').status_code == 502
+            # Not resent, but a 5xx still counts towards opening the host's circuit
+            assert retry_policy.breaker.failures.get(url.split('//')[1]) == 1, retry_policy.breaker.failures
+            retry_policy.breaker.reset()
+            assert retry_policy.http_request('post', url + '/limited').status_code == 429
+            retry_policy.breaker.reset()
+            try:
+                retry_policy.http_request('post', closed_url + '/refused')
+                assert False, "connection error was not raised"
+            except Exception as e:
+                assert retry_policy.failed_before_sending(e), e
+    finally:
+        server.shutdown()
+        server.server_close()
+        retry_policy.breaker.reset()
+    attempts = retry_policy.MAX_RETRIES
+    # A POST that reached the server is sent once; a GET, a rate-limited POST and a refused connection are retried
+    assert received.count(('POST', '/slow')) == 1 and received.count(('GET', '/slow')) == attempts, received
+    assert received.count(('POST', '/bad-gateway')) == 1 and received.count(('POST', '/limited')) == attempts, received
+    assert len(sleeps) == (attempts - 1) * 3, sleeps
+    print("[TEST] Retry policy resends POSTs only when the server cannot have acted on them (OK)")
+
+@isolated_db
+def test_sharded_process_answers():
+    import copy
+    import tempfile
+    from unittest.mock import patch
+    from core import process_answers as pa
+    from core import simulate
+    from core.database import TriviaDatabase
+    trivia = simulate.build_sim_trivia(days=3)
+    issues = simulate.build_issue_payloads(n_users=60, n_issues=300, trivia=trivia)
+    runs = {}
+    for workers in (1, 3):
+        github = simulate.FakeGitHub(copy.deepcopy(issues)).start()
+        try:
+            with tempfile.TemporaryDirectory() as tmpdir:
+                db = TriviaDatabase(db_path=f"{tmpdir}/trivia.db")
+                db.update_trivia_questions(trivia)
+                with patch.object(pa, 'TriviaDatabase', lambda: db), patch.object(pa, 'GITHUB_API_URL', github.url), \
+                     patch.object(pa, 'GITHUB_USERNAME', simulate.SIM_OWNER), patch.object(pa, 'GITHUB_REPO', simulate.SIM_REPO), \
+                     patch.object(pa, 'save_leaderboard'), patch.object(pa, 'GITHUB_TOKEN', 'test-token'), \
+                     patch.object(db, 'mark_issues_closed', wraps=db.mark_issues_closed) as mark_closed:
+                    pa.process_answers(workers=workers)
+                journal = {number: (entry['outcome'], entry['status']) for number, entry in db.get_processed_issues().items()}
+                # Workers only close issues on GitHub; the parent marks them all closed in one transaction
+                assert mark_closed.call_count == 1 and {status for _, status in journal.values()} == {'closed'}, mark_closed.call_args_list
+                leaderboard = {user: (stats['current_streak'], stats['total_points'], stats['total_answered'])
+                               for user, stats in db.get_leaderboard().items()}
+        finally:
+            github.stop()
+        stats = github.stats()
+        assert stats['open'] == 0 and stats['issues_commented_twice'] == 0 and stats['malformed'] == 0, stats
+        # FakeGitHub keeps connections alive: each worker opens its own instead of writing to the parent's
+        assert stats['connections'] == (1 if workers == 1 else 1 + workers), stats
+        runs[workers] = (journal, leaderboard)
+    # Users never interact, so sharding must not change any outcome or score
+    assert runs[1] == runs[3]
+    assert len({pa.shard_of(user, 3) for user in runs[3][1]}) == 3
+    # A forked child never gets the parent's session, whatever started the process
+    from core import retry_policy
+    parent_session = retry_policy.get_session()
+    read_end, write_end = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.write(write_end, b'1' if retry_policy.get_session() is not parent_session else b'0')
+        os._exit(0)
+    os.waitpid(pid, 0)
+    assert os.read(read_end, 1) == b'1', "Forked child reused the parent's HTTP session"
+    os.close(read_end)
+    os.close(write_end)
+    print(f"[TEST] process_answers over 3 worker processes matches the serial run ({len(runs[3][0])} issues) (OK)")
+
+@isolated_db
+def test_streamed_issue_records():
+    import json
+    import pickle
+    from core.issue_parser import iter_json_array, IssueRecord, parse_issue
+    payloads = [{'number': n, 'title': f'Trivia Answer {"ABC"[n % 3]}', 'body': f'**Trivia Date:** 2025-01-0{n % 9 + 1}\nAnswer ✓ {{"x": [1, 2]}}',
+                 'user': {'login': f'user{n}', 'id': n, 'avatar_url': 'https://example.com/' + 'a' * 200},
+                 'labels': [{'name': 'trivia', 'color': 'fff'}], 'reactions': {'+1': n}, 'created_at': f'2025-01-01T00:00:{n:02d}Z',
+                 'node_id': f'I_{n}'} for n in range(25)]
+    raw = json.dumps(payloads, ensure_ascii=False, indent=1).encode('utf-8')
+    # Chunk boundaries may split elements, strings and multi-byte characters
+    for size in (1, 7, 1000, len(raw)):
+        chunks = [raw[i:i + size] for i in range(0, len(raw), size)]
+        assert list(iter_json_array(chunks)) == payloads, size
+    assert list(iter_json_array([b'[', b' ]'])) == []
+    # A number split exactly at a chunk boundary is not yielded early
+    assert list(iter_json_array([b'[12', b'34, true]'])) == [1234, True]
+    assert list(iter_json_array([b'[1', b'2', b']'])) == [12]
+    # A large element spread over many chunks is decoded a logarithmic number of times
+    class CountingDecoder(json.JSONDecoder):
+        calls = 0
+        def raw_decode(self, s, idx=0):
+            CountingDecoder.calls += 1
+            return super().raw_decode(s, idx)
+    big = json.dumps([{'body': 'x' * 200000}, 1]).encode('utf-8')
+    chunks = [big[i:i + 100] for i in range(0, len(big), 100)]
+    assert list(iter_json_array(chunks, decoder=CountingDecoder())) == [{'body': 'x' * 200000}, 1]
+    assert CountingDecoder.calls < 30, CountingDecoder.calls
+    try:
+        list(iter_json_array([raw[:-40]]))
+        assert False, "truncated page was accepted"
+    except ValueError:
+        pass
+    record = IssueRecord.from_payload(payloads[4])
+    assert record['number'] == 4 and record['user']['login'] == 'user4' and record.get('node_id') == 'I_4'
+    assert record.get('labels') == [{'name': 'trivia'}] and record.get('reactions') is None
+    assert parse_issue(record) == parse_issue(payloads[4])
+    restored = pickle.loads(pickle.dumps(record))
+    assert (restored.number, restored.login, restored.body) == (4, 'user4', payloads[4]['body'])
+    print("[TEST] Streamed issue pages decode into compact IssueRecords (OK)")
+
+@isolated_db
+def test_wikipedia_link_cache():
+    import tempfile
+    from unittest.mock import patch
+    from core import daily_trivia as dt
+    from core.database import TriviaDatabase
+    replies = ["https://en.wikipedia.org/wiki/Mount_Everest", "Sure! Here it is: en.wikipedia.org", None]
+    calls = []
+    def fake_fetch(answer_text, question_text):
+        calls.append(answer_text)
+        return replies[len(calls) - 1]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db = TriviaDatabase(db_path=f"{tmpdir}/trivia.db")
+        with patch.object(dt, 'TriviaDatabase', lambda: db), patch.object(dt, 'fetch_wikipedia_link', side_effect=fake_fetch):
+            assert dt.get_wikipedia_link("Mount Everest", "Highest mountain?") == replies[0]
+            assert dt.get_wikipedia_link("Mount Everest", "Highest mountain?") == replies[0]
+            assert len(calls) == 1  # The second render costs no model call
+            # A reply that is not a Wikipedia article link is replaced by the heuristic link and cached
+            assert dt.get_wikipedia_link("K2", "Second highest?") == "https://en.wikipedia.org/wiki/K2"
+            assert dt.get_wikipedia_link("K2", "Second highest?") == "https://en.wikipedia.org/wiki/K2" and len(calls) == 2
+            # A failed call is not cached, so a later run asks again
+            assert dt.get_wikipedia_link("Lhotse", "Fourth highest?") == "https://en.wikipedia.org/wiki/Lhotse"
+            links = db.get_wikipedia_links()
+    assert sorted(entry['source'] for entry in links.values()) == ['fallback', 'openai']
+    print("[TEST] Wikipedia links are cached per question and answer (OK)")
+
+@isolated_db
+def test_trivia_queue():
+    import tempfile
+    import threading
+    from unittest.mock import patch
+    from core import daily_trivia as dt
+    from core.database import TriviaDatabase
+    counter = iter(range(1000))
+    questions = ["Which gas do plants absorb from the air?", "How many legs does a spider have?",
+                 "Who invented the telephone?", "Which ocean lies between Africa and Australia?",
+                 "In which year did the Berlin Wall fall?", "What language has the most native speakers?",
+                 "Which metal is liquid at room temperature?", "How many strings does a standard violin have?",
+                 "Which country hosted the 2016 Summer Olympics?", "What is the hardest natural mineral?"]
+    lock = threading.Lock()
+    def fake_generate(category=None):
+        with lock:
+            n = next(counter)
+        if n == 1:
+            return {'question': 'Which planet is red?', 'options': {'A': 'Mars', 'B': 'Venus', 'C': 'Mars'},
+                    'correct_answer': 'A', 'category': category, 'explanation': 'Iron oxide.'}
+        if n == 2:
+            raise dt.TriviaGenerationError("no reply")
+        return {'question': questions[n], 'options': {'A': 'x', 'B': 'y', 'C': 'z'},
+                'correct_answer': 'B', 'category': category, 'explanation': 'Because.'}
+    assert dt.validate_trivia({'question': 'Who invented the telephone ?', 'options': {'A': 'x', 'B': 'y', 'C': 'z'},
+                               'correct_answer': 'A', 'explanation': 'e'}, {dt.normalize_question('Who invented the telephone?')}) == ['duplicate question']
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db = TriviaDatabase(db_path=f"{tmpdir}/trivia.db")
+        with patch.object(dt, 'TriviaDatabase', lambda: db), patch.object(dt, 'generate_trivia_question', side_effect=fake_generate):
+            summary = dt.fill_trivia_queue(days=5, concurrency=2)
+            assert summary['requested'] == 5 and summary['rejected'] == 1 and summary['failed'] == 1
+            assert summary['added'] == 3 and db.count_trivia_queue() == 3
+            # A second run only generates what is missing
+            summary = dt.fill_trivia_queue(days=5, concurrency=2)
+            assert summary['requested'] == 2 and db.count_trivia_queue() == 5
+            queued = [q['question'] for q in db.get_trivia_queue()]
+            # Saving a question as a day's trivia takes it out of the queue
+            db.update_trivia_questions({'2025-01-01T00:00:00': db.get_trivia_queue()[1]})
+            assert db.count_trivia_queue() == 4
+            # The oldest unused question comes first; the current one is skipped
+            trivia = dt.next_trivia_question({'question': queued[0]})
+            assert trivia['question'] == queued[2] and db.count_trivia_queue() == 2
+            db.pop_trivia(); db.pop_trivia()
+            # An empty queue falls back to generating a question on the spot
+            assert dt.next_trivia_question()['question'] in questions
+    print("[TEST] Trivia queue is filled in batches and drained in order (OK)")
+
+@isolated_db
+def test_similarity_index():
+    import sqlite3
+    import tempfile
+    from unittest.mock import patch
+    from core import daily_trivia as dt
+    from core.database import TriviaDatabase
+    from core.similarity_index import find_near_duplicates
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db = TriviaDatabase(db_path=f"{tmpdir}/trivia.db")
+        questions = {f"2024-01-{day:02d}T00:00:00": {'question': q, 'options': {'A': 'a', 'B': 'b', 'C': 'c'}, 'correct_answer': 'A', 'explanation': 'e'}
+                     for day, q in enumerate(["Which planet is known as the Red Planet?", "Who painted the Mona Lisa?",
+                                              "What is the largest ocean on Earth?", "Who wrote Romeo and Juliet?"], start=1)}
+        db.update_trivia_questions(questions)
+        db.update_daily_facts({'2024-01-01': {'fact': "Did you know? Octopuses have three hearts and blue blood!"}})
+        assert find_near_duplicates(db, 'trivia', "What planet is called the Red Planet?")[0][0] == "2024-01-01T00:00:00"
+        assert find_near_duplicates(db, 'trivia', "The Mona Lisa was painted by which artist?")[0][0] == "2024-01-02T00:00:00"
+        assert find_near_duplicates(db, 'trivia', "What is the tallest mountain in Africa?") == []
+        # Fact templates are ignored, so a reworded fact with another template is still caught
+        assert find_near_duplicates(db, 'fact', "Fun fact: Octopuses have three hearts and blue blood.")
+        # Pruned questions stay in the index and survive an export/import round trip
+        db.prune_trivia_questions(days=1)
+        assert db.get_trivia_questions() == {} and find_near_duplicates(db, 'trivia', "Who was the author of Romeo and Juliet?")
+        texts = db.get_similarity_texts()
+        copy = TriviaDatabase(db_path=f"{tmpdir}/copy.db")
+        for kind, items in texts.items():
+            copy.update_similarity_index(kind, items)
+        assert find_near_duplicates(copy, 'trivia', "Who was the author of Romeo and Juliet?")
+        # Migrating a version 5 database indexes its existing rows
+        with sqlite3.connect(copy.db_path) as conn:
+            conn.execute("DROP TABLE similarity_signatures")
+            conn.execute("DROP TABLE similarity_buckets")
+            conn.execute("UPDATE meta SET schema_version = 5")
+        with sqlite3.connect(copy.db_path) as conn:
+            conn.execute("INSERT INTO trivia_questions VALUES ('2024-02-01T00:00:00', 'Who discovered penicillin?', ?, 'A', 'e')", (copy.compress_data({}),))
+        migrated = TriviaDatabase(db_path=copy.db_path)
+        assert find_near_duplicates(migrated, 'trivia', "Penicillin was discovered by whom?")
+        # Generation rejects a reworded repeat and keeps the next new question
+        replies = iter([{'question': "What planet is called the Red Planet?", 'category': 'Science'},
+                        {'question': "What is the tallest mountain in Africa?", 'category': 'Geography'}])
+        with patch.object(dt, 'TriviaDatabase', lambda: db), patch.object(dt, 'generate_trivia_question', lambda category=None: next(replies)), \
+             patch.object(dt, 'create_standalone_trivia', lambda category: next(replies)):
+            assert dt.generate_unique_trivia(None, max_tries=1)['question'] == "What is the tallest mountain in Africa?"
+        # An import signs every text once: live rows when they are imported, then only the pruned texts
+        from core import database as core_database
+        signed = []
+        real_index_entries = core_database.index_entries
+        def count_signed(kind, items):
+            signed.extend((kind, item_key) for item_key in items)
+            return real_index_entries(kind, items)
+        with patch.dict(os.environ, {'TRIVIA_DB_PASSWORD': 'pw', 'TRIVIA_DB_SALT': 'MDAwMDAwMDAwMDAwMDAwMA=='}):
+            db.update_trivia_questions({"2024-03-01T00:00:00": dict(questions["2024-01-01T00:00:00"], question="Who discovered penicillin?")})
+            db.compressed_path = f"{tmpdir}/export.db.gz"
+            db.export_compressed_data()
+            restored = TriviaDatabase(db_path=f"{tmpdir}/restored.db")
+            restored.compressed_path = db.compressed_path
+            with patch.object(core_database, 'index_entries', count_signed):
+                restored.import_compressed_data()
+        expected = db.get_similarity_texts()
+        assert sorted(signed) == sorted((kind, item_key) for kind, items in expected.items() for item_key in items), signed
+        assert restored.get_similarity_texts() == expected
+    print("[TEST] Similarity index catches reworded questions and facts (OK)")
+
+@isolated_db
+def test_daily_run_concurrent():
+    import asyncio
+    import json
+    import tempfile
+    import time
+    from datetime import datetime, timedelta, timezone
+    from types import SimpleNamespace
+    from unittest.mock import patch
+    from core import daily_run, daily_trivia as dt
+    from core.database import TriviaDatabase
+    yesterday = (datetime.now(timezone.utc) - timedelta(days=1)).strftime('%Y-%m-%d')
+    trivia = {'question': 'Which metal is liquid at room temperature?', 'options': {'A': 'Mercury', 'B': 'Lead', 'C': 'Tin'},
+              'correct_answer': 'A', 'category': 'science', 'explanation': 'Mercury melts at -39 C.'}
+    class FakeCompletions:
+        def __init__(self, wiki_delay):
+            self.wiki_delay = wiki_delay
+        async def create(self, model, messages, **kwargs):
+            wiki = 'wikipedia' in messages[0]['content']
+            await asyncio.sleep(self.wiki_delay if wiki else 0.3)
+            content = "https://en.wikipedia.org/wiki/Pablo_Picasso" if wiki else json.dumps(trivia)
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+    class FakeClient:
+        def __init__(self, wiki_delay):
+            self.chat = SimpleNamespace(completions=FakeCompletions(wiki_delay))
+        async def close(self):
+            pass
+    def slow_fact(facts, db=None):
+        time.sleep(0.3)
+        return {'fact': 'Did you know? Sloths can hold their breath for 40 minutes.'}
+    for wiki_delay, call_timeout in ((0.3, 5), (3, 0.6)):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db = TriviaDatabase(db_path=f"{tmpdir}/trivia.db")
+            db.update_trivia_questions({f'{yesterday}T00:00:00': {'question': 'Who painted Guernica?', 'options': {'A': 'Picasso', 'B': 'Dali', 'C': 'Miro'},
+                                                                  'correct_answer': 'A', 'explanation': 'Painted in 1937.'}})
+            with patch.object(daily_run, 'TriviaDatabase', lambda: db), patch.object(dt, 'TriviaDatabase', lambda: db), \
+                 patch.object(daily_run, 'setup_async_openai', lambda timeout: FakeClient(wiki_delay)), \
+                 patch.object(daily_run, 'pick_new_fact', slow_fact), patch.object(daily_run, 'get_model', lambda: 'gpt-test'):
+                summary = daily_run.run_daily(deadline=5, call_timeout=call_timeout)
+            # The three 0.3s calls overlap instead of adding up
+            assert summary['seconds'] < 0.8 if wiki_delay < 1 else summary['seconds'] < 1.2, summary
+            assert summary['trivia'] == 'generated' and summary['fact'] == 'new'
+            assert summary['link'] == ('openai' if wiki_delay < 1 else 'failed')
+            assert any(q['question'] == trivia['question'] for q in db.get_trivia_questions().values())
+            assert len(db.get_wikipedia_links()) == (1 if wiki_delay < 1 else 0)
+    print("[TEST] Daily run fetches trivia, fact and link concurrently (OK)")
+
+def fake_chat_completion(content, model="gpt-test", usage=None):
+    from openai.types.chat import ChatCompletion
+    payload = {
+        'id': 'chatcmpl-test', 'object': 'chat.completion', 'created': 0, 'model': model,
+        'choices': [{'index': 0, 'finish_reason': 'stop', 'message': {'role': 'assistant', 'content': content}}],
+    }
+    if usage:
+        payload['usage'] = {'prompt_tokens': usage[0], 'completion_tokens': usage[1], 'total_tokens': sum(usage)}
+    return ChatCompletion.model_validate(payload)
+
+@isolated_db
+def test_openai_cache_record_replay():
+    import sqlite3
+    import tempfile
+    from core import openai_cache
+    from core.openai_cache import ResponseCache, CacheMissError, cache_key
+    request = {'model': 'gpt-test', 'messages': [{'role': 'user', 'content': 'Name a planet'}], 'max_tokens': 10, 'temperature': 0.2}
+    calls = []
+    def call():
+        calls.append(1)
+        return fake_chat_completion(f"Mars {len(calls)}")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = f"{tmpdir}/cache.db"
+        passthrough = ResponseCache(path=path, mode='passthrough')
+        assert passthrough.complete(call, request).choices[0].message.content == "Mars 1" and not os.path.exists(path)
+        recorder = ResponseCache(path=path, mode='record', ttl=3600)
+        assert recorder.complete(call, request).choices[0].message.content == "Mars 2"
+        assert recorder.complete(call, dict(request)).choices[0].message.content == "Mars 2" and len(calls) == 2
+        # Any change to the prompt or sampling settings is a different entry
+        assert cache_key(dict(request, temperature=0.3)) != cache_key(request)
+        # Expired entries are fetched again in record mode but still replayed
+        with sqlite3.connect(path) as conn:
+            conn.execute("UPDATE responses SET created_at = created_at - 7200")
+        replayer = ResponseCache(path=path, mode='replay')
+        assert replayer.complete(call, request).choices[0].message.content == "Mars 2" and len(calls) == 2
+        assert recorder.complete(call, request).choices[0].message.content == "Mars 3" and len(calls) == 3
+        try:
+            replayer.complete(call, dict(request, max_tokens=11))
+            assert False, "replay mode must not call OpenAI"
+        except CacheMissError:
+            pass
+        assert len(calls) == 3 and replayer.stats == {'hits': 1, 'misses': 1, 'stored': 0}
+        replayer.discard(request)
+        assert replayer.count() == 1
+        recorder.discard(request)
+        assert recorder.count() == 0
+    print("[TEST] OpenAI responses are recorded and replayed (OK)")
+
+@isolated_db
+def test_model_usage_accounting():
+    import tempfile
+    from types import SimpleNamespace
+    from unittest.mock import patch
+    from core import daily_trivia as dt, model_usage, openai_cache, retry_policy
+    from core.database import TriviaDatabase
+    from core.openai_cache import ResponseCache
+    class Timeout(Exception):
+        pass
+    calls = []
+    def create(**kwargs):
+        calls.append(kwargs)
+        if kwargs['messages'][0]['content'] == 'flaky' and len(calls) == 1:
+            raise Timeout("read timed out")
+        if kwargs['messages'][0]['content'] == 'broken':
+            raise ValueError("bad request")
+        return fake_chat_completion("ok", model=kwargs['model'], usage=(120, 30))
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    def ask(content, **kwargs):
+        return dt.openai_with_retries(client, model='gpt-4o-mini', messages=[{'role': 'user', 'content': content}],
+                                      max_tokens=50, temperature=0.2, **kwargs)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db = TriviaDatabase(db_path=f"{tmpdir}/trivia.db")
+        cache = ResponseCache(path=f"{tmpdir}/cache.db", mode='record', ttl=3600)
+        with patch.object(model_usage, 'TriviaDatabase', lambda: db), patch.object(openai_cache, '_cache', cache), \
+             patch.object(retry_policy, '_sleep', lambda seconds: None):
+            ask('flaky')
+            ask('flaky')  # Answered by the response cache
+            dt.openai_wiki_with_retries(client, model='gpt-4o-mini', messages=[{'role': 'user', 'content': 'link'}], max_tokens=20)
+            try:
+                ask('broken')
+                assert False, "the error must reach the caller"
+            except ValueError:
+                pass
+        rows = db.get_model_usage()
+        assert [(row['call_site'], row['retries'], row['cached'], row['status']) for row in rows] == [
+            ('trivia', 1, 0, 'ok'), ('trivia', 0, 1, 'ok'), ('wikipedia_link', 0, 0, 'ok'), ('trivia', 0, 0, 'error')], rows
+        assert rows[0]['prompt_tokens'] == 120 and rows[0]['completion_tokens'] == 30 and 'bad request' in rows[3]['error']
+        # Exported rows are restored once, however often the export is imported
+        restored = TriviaDatabase(db_path=f"{tmpdir}/restored.db")
+        restored.update_model_usage(rows)
+        restored.update_model_usage(rows)
+        assert restored.get_model_usage() == rows
+        report = model_usage.usage_report(db=db)
+        trivia = report['trivia']
+        assert list(report) == ['trivia', 'wikipedia_link']
+        assert (trivia['calls'], trivia['cached'], trivia['errors'], trivia['retries']) == (3, 1, 1, 1), trivia
+        # Only the call that reached the API counts towards tokens, latency and cost
+        assert trivia['total_tokens'] == 150 and trivia['prompt_tokens']['p50'] == 120
+        assert abs(trivia['cost_usd'] - (120 * 0.15 + 30 * 0.60) / 1e6) < 1e-12
+        assert model_usage.model_price('gpt-4o-mini-2024-07-18') == (0.15, 0.60) and model_usage.model_price('o9') is None
+        # Recording problems never fail the call itself
+        with patch.object(db, 'record_model_usage', side_effect=RuntimeError("disk full")):
+            model_usage.record_usage(model_usage.usage_row('trivia', {}, None, 0.1, 1), db=db)
+    assert [model_usage.percentile(list(range(1, 101)), q) for q in (50, 90, 99)] == [50, 90, 99]
+    assert model_usage.percentile([], 50) is None
+    print("[TEST] Model calls record tokens, latency, retries and cost per call site (OK)")
+
+@isolated_db
+def test_lazy_config_and_model_cache():
+    import json
+    import subprocess
+    import sys
+    import tempfile
+    import time
+    from unittest.mock import patch
+    from core import config
+    # Importing config neither needs credentials nor loads the OpenAI client
+    env = {k: v for k, v in os.environ.items() if k not in ('OPENAI_API_KEY', 'GITHUB_TOKEN')}
+    result = subprocess.run([sys.executable, '-c', "import sys, core.config; assert 'openai' not in sys.modules"],
+                            env=dict(env, PYTHONPATH=os.pathsep.join(sys.path)), capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    detections = []
+    def detect():
+        detections.append(1)
+        return "gpt-detected"
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cache_path = os.path.join(tmpdir, "model_cache.json")
+        with patch.object(config, 'MODEL_CACHE_PATH', cache_path), patch.object(config, 'get_latest_model', detect), \
+             patch.object(config, 'OPENAI_MODEL', None), patch.object(config, '_resolved_model', None):
+            assert config.MODEL == "gpt-detected" and config.get_model() == "gpt-detected" and len(detections) == 1
+            # A fresh cache file answers the next process without asking the API
+            config._resolved_model = None
+            assert config.get_model() == "gpt-detected" and len(detections) == 1
+            # A stale one is refreshed
+            with open(cache_path, 'w') as f:
+                json.dump({'model': 'gpt-old', 'resolved_at': time.time() - config.MODEL_CACHE_TTL - 1}, f)
+            config._resolved_model = None
+            assert config.get_model() == "gpt-detected" and len(detections) == 2
+            # The environment wins over detection and cache
+            config._resolved_model = None
+            config.OPENAI_MODEL = "gpt-pinned"
+            assert config.get_model() == "gpt-pinned" and len(detections) == 2
+    print("[TEST] Config imports without side effects and caches the detected model (OK)")
+
+@isolated_db
+def test_lazy_command_imports():
+    import subprocess
+    import sys
+    from core.benchmarks import command_imports, parse_importtime
+    # README and trivia commands load neither the OpenAI client, cryptography nor NumPy until they need them
+    probe = ("import sys, core.daily_trivia, core.daily_facts; "
+             "loaded = [m for m in ('openai', 'cryptography', 'numpy', 'requests', 'asyncio') if m in sys.modules]; "
+             "assert not loaded, loaded")
+    result = subprocess.run([sys.executable, '-c', probe], env=dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path)),
+                            capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    manage_path = os.path.join(os.path.dirname(__file__), '..', '..', 'manage.py')
+    commands = command_imports(manage_path)
+    assert commands['print-db'] == ['src.core.database'], commands['print-db']
+    assert 'src.core.daily_run' in commands['daily'] and 'src.core.benchmarks' in commands['bench-startup']
+    total, top_level = parse_importtime("import time: self [us] | cumulative | imported package\n"
+                                        "import time:       100 |        100 |   zlib\n"
+                                        "import time:       250 |        350 | core.similarity_index\n")
+    assert total == 350 and top_level == {'core.similarity_index': 350}, (total, top_level)
+    print("[TEST] Commands import only what they use (OK)")
+
+@isolated_db
+def test_readme_sections_incremental():
+    import tempfile
+    from datetime import datetime, timezone, timedelta
+    from unittest.mock import patch
+    from core import daily_trivia as dt
+    from core.readme_sections import parse_sections
+    yesterday = (datetime.now(timezone.utc) - timedelta(days=1)).strftime('%Y-%m-%d')
+    trivia_data = {
+        'current': {'timestamp': datetime.now().isoformat(), 'question': 'Q today?', 'options': {'A': 'a', 'B': 'b', 'C': 'c'}, 'correct_answer': 'A'},
+        'history': [{'timestamp': f'{yesterday}T00:00:00', 'question': 'Q yesterday?', 'options': {'A': 'x', 'B': 'y', 'C': 'z'},
+                     'correct_answer': 'B', 'explanation': 'Because.'}],
+    }
+    leaderboard = {'alice': {'current_streak': 2, 'total_points': 5, 'total_correct': 4, 'first_correct_date': '2025-01-01'}}
+    wiki_calls = []
+    def fake_wiki(answer_text, question_text):
+        wiki_calls.append(answer_text)
+        return 'https://en.wikipedia.org/wiki/Y'
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmpdir, patch.object(dt, 'get_utc_yesterday', return_value=yesterday), \
+         patch.object(dt, 'get_todays_fact', return_value={'fact': 'Octopuses have three hearts.'}), \
+         patch.object(dt, 'get_wikipedia_link', side_effect=fake_wiki):
+        os.chdir(tmpdir)
+        try:
+            dt.update_readme(trivia_data, leaderboard)
+            first = open('README.md').read()
+            written_at = os.stat('README.md').st_mtime_ns
+            dt.update_readme(trivia_data, leaderboard)
+            second = open('README.md').read()
+            assert os.stat('README.md').st_mtime_ns == written_at  # Unchanged content is not rewritten
+            leaderboard['bob'] = {'current_streak': 1, 'total_points': 9, 'total_correct': 9, 'first_correct_date': None}
+            with patch.object(dt, 'render_leaderboard_rows', wraps=dt.render_leaderboard_rows) as rows:
+                dt.update_readme(trivia_data, leaderboard)
+            third = open('README.md').read()
+        finally:
+            os.chdir(cwd)
+    assert first == second and len(wiki_calls) == 1  # Unchanged inputs render nothing again
+    assert rows.call_count == 1 and "| 1 | @bob |" in third and "| 2 | @alice |" in third
+    before, after = parse_sections(second), parse_sections(third)
+    assert [name for name in before if before[name] != after[name]] == ['leaderboard']
+    assert "**Correct Answer:** B) y ([Wikipedia](https://en.wikipedia.org/wiki/Y))" in third
+    assert "Octopuses have three hearts." in third and "[Answer A](https://github.com/" in third
+    print("[TEST] README sections are only re-rendered when their inputs change (OK)")
+
+@isolated_db
+def test_site_render_outputs():
+    import json
+    import tempfile
+    from datetime import datetime, timezone, timedelta
+    from unittest.mock import patch
+    from core import daily_trivia as dt
+    from core import site_render as sr
+    yesterday = (datetime.now(timezone.utc) - timedelta(days=1)).strftime('%Y-%m-%d')
+    trivia_data = {
+        'current': {'timestamp': datetime.now().isoformat(), 'question': 'Q <today>?', 'options': {'A': 'a', 'B': 'b', 'C': 'c'}, 'correct_answer': 'C'},
+        'history': [{'timestamp': f'{yesterday}T00:00:00', 'question': 'Q yesterday?', 'options': {'A': 'x', 'B': 'y', 'C': 'z'},
+                     'correct_answer': 'B', 'explanation': 'Because.'}],
+    }
+    leaderboard = {f'user{i}': {'current_streak': i, 'total_points': 10 * i, 'total_correct': i, 'first_correct_date': '2025-01-01'}
+                   for i in range(1, 6)}
+    wiki_calls = []
+    def fake_wiki(answer_text, question_text):
+        wiki_calls.append(answer_text)
+        return 'https://en.wikipedia.org/wiki/Y'
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmpdir, patch.object(dt, 'get_utc_yesterday', return_value=yesterday), \
+         patch.object(dt, 'get_todays_fact', return_value={'fact': 'Octopuses have three hearts.'}), \
+         patch.object(dt, 'get_wikipedia_link', side_effect=fake_wiki), patch.object(sr, 'SITE_PAGE_SIZE', 2):
+        os.chdir(tmpdir)
+        try:
+            written = sr.render_site(trivia_data, leaderboard, site_dir='site')
+            # One view model feeds all outputs: yesterday's link is looked up once for README, feed and HTML
+            assert len(wiki_calls) == 1, wiki_calls
+            assert sorted(written) == ['README.md', 'site/index.html', 'site/leaderboard-2.html', 'site/leaderboard-3.html',
+                                       'site/leaderboard.json'], written
+            feed = json.load(open('site/leaderboard.json'))
+            assert [user['username'] for user in feed['leaderboard']] == ['user5', 'user4', 'user3', 'user2', 'user1']
+            assert feed['leaderboard'][0]['rank'] == 1 and feed['users'] == 5
+            assert 'correct_answer' not in feed['question'] and feed['yesterday']['wikipedia_link'] == 'https://en.wikipedia.org/wiki/Y'
+            index = open('site/index.html').read()
+            assert 'Q &lt;today&gt;?' in index and '@user5' in index and '@user3' not in index and 'leaderboard-2.html' in index
+            assert sr.render_site(trivia_data, leaderboard, site_dir='site') == []  # Nothing changed, nothing written
+            # A shorter leaderboard drops the pages past its end
+            del leaderboard['user1'], leaderboard['user2']
+            written = sr.render_site(trivia_data, leaderboard, site_dir='site')
+            assert not os.path.exists('site/leaderboard-3.html') and 'site/leaderboard.json' in written
+            # A failing target leaves every file as it was
+            readme = open('README.md').read()
+            leaderboard['user6'] = {'current_streak': 1, 'total_points': 99, 'total_correct': 9, 'first_correct_date': None}
+            with patch.object(sr, 'leaderboard_feed', side_effect=RuntimeError("feed failed")):
+                try:
+                    sr.render_site(trivia_data, leaderboard, site_dir='site')
+                    assert False, "render_site must raise when a target fails"
+                except RuntimeError:
+                    pass
+            assert open('README.md').read() == readme and '@user6' not in open('site/index.html').read()
+            assert not [name for name in os.listdir('.') + os.listdir('site') if name.endswith('.tmp')]
+        finally:
+            os.chdir(cwd)
+    print("[TEST] README, leaderboard.json and HTML pages are rendered from one view model and written together (OK)")
+
+@isolated_db
+def test_tenants_run_all():
+    import json
+    import tempfile
+    import threading
+    from datetime import datetime
+    from unittest.mock import patch
+    from core import tenants, database
+    from core import daily_trivia as dt, process_answers as pa
+    with tempfile.TemporaryDirectory() as tmpdir:
+        registry = os.path.join(tmpdir, 'tenants.json')
+        with open(registry, 'w') as f:
+            json.dump({'tenants': [
+                {'name': 'acme', 'github_username': 'acme', 'github_repo': 'trivia', 'github_token_env': 'ACME_GITHUB_TOKEN',
+                 'password_env': 'ACME_DB_PASSWORD'},
+                {'name': 'globex', 'github_username': 'globex', 'github_repo': 'quiz', 'db_path': 'globex/data.db', 'output_dir': 'globex'},
+            ]}, f)
+        with patch.object(tenants, 'TENANTS_DIR', os.path.join(tmpdir, 'tenants')):
+            acme, globex = tenants.load_tenants(registry)
+        assert acme.db_path == os.path.join(tmpdir, 'tenants', 'acme', 'trivia.db'), acme.db_path
+        assert globex.db_path == os.path.join(tmpdir, 'globex', 'data.db') and globex.output_dir == os.path.join(tmpdir, 'globex')
+        assert tenants.current_tenant() is None and database.TriviaDatabase(db_path=f"{tmpdir}/plain.db").db_path == f"{tmpdir}/plain.db"
+        with open(registry, 'w') as f:
+            json.dump({'tenants': [{'name': 'acme', 'github_username': 'a', 'github_repo': 'r'}] * 2}, f)
+        try:
+            tenants.load_tenants(registry)
+            assert False, "duplicate tenant accepted"
+        except ValueError:
+            pass
+
+        # Exactly these credentials are set, whatever the shell running the tests exports
+        env = {'PATH': os.environ.get('PATH', ''), 'OPENAI_API_KEY': 'test-key',
+               'ACME_GITHUB_TOKEN': 'acme-token', 'GITHUB_TOKEN': 'shared-token', 'ACME_DB_PASSWORD': 'acme-pw',
+               'TRIVIA_DB_PASSWORD': 'shared-pw', 'TRIVIA_DB_SALT': 'MDAwMDAwMDAwMDAwMDAwMA=='}
+        with patch.dict(os.environ, env, clear=True):
+            assert tenants.missing_credentials(acme, ['process-answers', 'export-db']) == []
+            assert tenants.missing_credentials(globex._replace(github_token_env='GLOBEX_TOKEN'), ['daily', 'process-answers']) == ['GLOBEX_TOKEN']
+            real_step = tenants._run_step
+            both_running = threading.Barrier(2, timeout=10)
+            seen = {}
+            def fake_step(step, process_workers):
+                tenant = tenants.current_tenant()
+                if step == 'daily':
+                    both_running.wait()  # Both tenants are in flight at once, each with its own context
+                    seen[tenant.name] = (database.TriviaDatabase().db_path, pa.github_repo_url(), pa.github_token(), process_workers)
+                elif step == 'process-answers' and tenant.name == 'globex':
+                    raise RuntimeError("GitHub is down")
+                elif step != 'process-answers':
+                    real_step(step, process_workers)
+            with tenants.use_tenant(acme):
+                db = database.TriviaDatabase()
+                now = datetime.now().isoformat()
+                db.update_trivia_questions({now: {'timestamp': now, 'question': 'Acme question?',
+                                                    'options': {'A': 'a', 'B': 'b', 'C': 'c'}, 'correct_answer': 'A', 'explanation': ''}})
+            database._derive_key.cache_clear()
+            with patch.object(tenants, '_run_step', fake_step), patch.object(dt, 'get_todays_fact', lambda: {'fact': 'Acme fact.'}):
+                results = tenants.run_all([acme, globex], steps=('daily', 'export-db', 'process-answers', 'render-site'), workers=2)
+        assert [result['tenant'] for result in results] == ['acme', 'globex']
+        assert results[0]['status'] == 'ok' and list(results[0]['steps']) == ['daily', 'export-db', 'process-answers', 'render-site'], results[0]
+        # A failed step stops the tenant's run without touching the other tenant
+        assert results[1]['status'] == 'failed' and 'render-site' not in results[1]['steps'], results[1]
+        # Answers are scored in-process while tenants run in threads
+        assert seen['acme'] == (acme.db_path, f"{pa.GITHUB_API_URL}/repos/acme/trivia", 'acme-token', 1), seen['acme']
+        assert seen['globex'] == (globex.db_path, f"{pa.GITHUB_API_URL}/repos/globex/quiz", 'shared-token', 1), seen['globex']
+        assert os.path.exists(acme.compressed_path) and os.path.exists(globex.compressed_path)
+        with open(os.path.join(acme.output_dir, 'site', 'index.html')) as f:
+            assert 'Acme question?' in f.read()
+        assert os.path.exists(os.path.join(acme.output_dir, 'README.md')) and not os.path.exists(os.path.join(globex.output_dir, 'README.md'))
+        assert database._derive_key.cache_info().misses == 2  # One key per distinct password
+        # Each snapshot only opens with its own tenant's password
+        with patch.dict(os.environ, env), tenants.use_tenant(acme):
+            db = database.TriviaDatabase()
+            with open(acme.compressed_path, 'rb') as f:
+                assert isinstance(db.decompress_data(db.decrypt_data(f.read())), dict)
+        assert database._derive_key.cache_info().hits >= 1
+        assert tenants.current_tenant() is None
+    print("[TEST] Tenants run in parallel with separate databases, snapshots and repositories (OK)")
+
+@isolated_db
+def test_readme_diff_summary_and_lazy_logging():
+    import logging
+    from core.readme_sections import diff_summary
+    from core.daily_trivia import LazyJSON
+    old = "\n".join(f"line {i}" for i in range(100))
+    new = old.replace("line 10\n", "line ten\n").replace("line 50\n", "---\n").replace("line 90\n", "")
+    summary = diff_summary(old, new, max_hunks=2)
+    assert summary.splitlines()[0] == "+2 -3 lines in 3 hunk(s)", summary
+    assert "+line ten" in summary and "+---" in summary and "-line 90" not in summary
+    assert summary.endswith("... 1 more hunk(s) not shown")
+    serialized = []
+    class Marker:
+        def __str__(self):
+            serialized.append(True)
+            return "marker"
+    logging.getLogger().setLevel(logging.INFO)
+    logging.debug("payload %s", LazyJSON({'a': Marker()}))
+    assert not serialized  # Disabled debug records never serialize their payload
+    assert '"marker"' in str(LazyJSON({'a': Marker()})) and serialized
+    assert str(LazyJSON({'a': [1]})) == '{\n  "a": [\n    1\n  ]\n}'
+    print("[TEST] README diff summary is bounded and debug payloads are lazy (OK)")
+
 def test_fallback_trivia_pool():
     from core.daily_trivia import create_standalone_trivia, TRIVIA_CATEGORIES
     seen_questions = set()
@@ -151,6 +1287,64 @@ def test_fallback_trivia_pool():
     assert len(seen_questions) >= 20, f"Trivia fallback pool too small: {len(seen_questions)}"
     print(f"[TEST] Trivia fallback pool size: {len(seen_questions)} (OK)")
 
+@isolated_db
+def test_fallback_bank():
+    import json
+    import shutil
+    import tempfile
+    from unittest.mock import patch
+    from core import daily_trivia as dt, fallback_bank as fb
+    from core.config import FALLBACK_BANK_SOURCE
+    from core.database import TriviaDatabase
+    with tempfile.TemporaryDirectory() as tmpdir:
+        source, path = f"{tmpdir}/bank.jsonl", f"{tmpdir}/bank.bin"
+        shutil.copy(FALLBACK_BANK_SOURCE, source)
+        assert not fb.bank_is_current(path, source)
+        stats = fb.compile_bank(source, path)
+        assert fb.bank_is_current(path, source) and stats['categories'] == len(fb.BANK_CATEGORIES) and stats['questions'] >= 200, stats
+        bank = fb.FallbackBank(path)
+        with open(source, encoding='utf-8') as f:
+            compiled = {json.loads(line)['question']: json.loads(line) for line in f}
+        assert len(bank) == len(compiled) and all(bank.entry(i) == compiled[bank.entry(i)['question']] for i in range(len(bank)))
+        # Options are shuffled, but the correct letter still points at the correct text
+        for _ in range(50):
+            trivia = bank.sample('space')
+            original = compiled[trivia['question']]
+            assert trivia['category'] == 'space' and trivia['options'][trivia['correct_answer']] == original['options'][original['correct_answer']]
+        # Used questions are skipped, down to the last unused one; none is left once all were used
+        first, count = bank.categories['music']
+        keys = {bank.key(i) for i in range(len(bank))}
+        last = bank.entry(first + count - 1)['question']
+        used = keys - {fb.question_key(last)}
+        assert all(bank.sample('music', used)['question'] == last for _ in range(5))
+        assert bank.sample('music', keys) is None
+        # A question already in the history, however it was punctuated, is never drawn again
+        db = TriviaDatabase(db_path=f"{tmpdir}/trivia.db")
+        music = [bank.entry(i)['question'] for i in range(first, first + count)]
+        db.update_trivia_questions({f'2024-01-{day:02d}T00:00:00': {'question': question.upper() + '!!', 'options': {}, 'correct_answer': 'A', 'explanation': ''}
+                                    for day, question in enumerate(music[:-2], 1)})
+        with patch.object(fb, '_bank', bank), patch.object(dt, 'TriviaDatabase', lambda: db):
+            assert {dt.create_standalone_trivia('music')['question'] for _ in range(30)} <= set(music[-2:])
+            # With OpenAI down the bank stands in for generation
+            def unavailable(category=None):
+                raise dt.TriviaGenerationError("OpenAI is down")
+            with patch.object(dt, 'generate_trivia_question', unavailable):
+                assert dt.generate_unique_trivia(None, max_tries=1)['question'] in compiled
+        # Editing the source makes the compiled bank stale
+        with open(source, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'category': 'general', 'question': 'How many hours are in a week?', 'options': {'A': '168', 'B': '144', 'C': '172'},
+                                'correct_answer': 'A', 'explanation': '7 days of 24 hours.'}) + "\n")
+        assert not fb.bank_is_current(path, source)
+        assert fb.compile_bank(source, path)['questions'] == len(compiled) + 1
+        with open(source, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(dict(compiled[music[0]], question=music[0].lower())) + "\n")
+        try:
+            fb.compile_bank(source, path)
+            assert False, "duplicate question compiled"
+        except ValueError as e:
+            assert "duplicate question" in str(e)
+    print(f"[TEST] Fallback bank of {stats['questions']} questions samples unused questions (OK)")
+
 def test_fallback_facts_pool():
     from core.daily_facts import generate_fallback_daily_fact
     facts = set()
@@ -162,6 +1356,10 @@ def test_fallback_facts_pool():
 
 def test_end_to_end_workflow():
     import os
+    import json
+    from unittest.mock import patch
+    from core import openai_cache
+    from core import daily_trivia as dt
     from core.daily_trivia import generate_trivia_question, save_trivia_data, load_trivia_data
     from core.daily_facts import get_todays_fact, save_daily_facts, load_daily_facts
     from core.process_answers import update_user_stats
@@ -169,11 +1367,23 @@ def test_end_to_end_workflow():
     import tempfile
     import shutil
     # Use a temp dir for DB
-    with tempfile.TemporaryDirectory() as tmpdir:
+    with tempfile.TemporaryDirectory() as tmpdir, patch.object(dt, 'TRIVIA_CATEGORIES', ['science']), \
+         patch.object(dt, 'OPENAI_API_KEY', 'test-key'):
         db_path = os.path.join(tmpdir, 'trivia.db')
         db = TriviaDatabase(db_path=db_path)
+        # Replay recorded OpenAI responses instead of calling the API
+        cache = openai_cache.configure(mode='replay', path=os.path.join(tmpdir, 'openai_cache.db'))
+        for letter in "ABC":
+            request = dict(model=dt.get_model(), messages=[{"role": "user", "content": dt.trivia_prompt('science', letter)}],
+                           max_tokens=dt.MAX_TOKENS, temperature=dt.TEMPERATURE)
+            reply = {'question': 'Which gas do plants absorb?', 'options': {'A': 'CO2', 'B': 'O2', 'C': 'N2'},
+                     'correct_answer': letter, 'category': 'science', 'explanation': 'Photosynthesis.'}
+            cache.store(openai_cache.cache_key(request), request, fake_chat_completion(json.dumps(reply)).model_dump(mode='json'))
         # Step 1: Generate trivia
-        trivia = generate_trivia_question()
+        try:
+            trivia = generate_trivia_question()
+        finally:
+            openai_cache.configure()
         today = trivia.get('timestamp', '')[:10] if 'timestamp' in trivia else None
         trivia['timestamp'] = trivia.get('timestamp') or '2024-01-01T00:00:00Z'
         save_trivia_data({'current': trivia, 'history': []})
@@ -207,7 +1417,36 @@ def main():
     test_process_answers_malformed_issue()
     test_process_answers_duplicate_answers()
     test_process_answers_scoring()
+    test_process_answers_resumes_from_journal()
+    test_batch_scoring_matches_sequential()
+    test_rebuild_leaderboard_from_events()
+    test_run_log_reaches_exported_database()
+    test_duplicate_answers_closed_in_one_batch()
+    test_simulated_github_load()
+    test_comment_templates()
+    test_retry_policy_rate_limits()
+    test_retry_policy_never_resends_posts()
+    test_sharded_process_answers()
+    test_streamed_issue_records()
+    test_wikipedia_link_cache()
+    test_trivia_queue()
+    test_similarity_index()
+    test_daily_run_concurrent()
+    test_openai_cache_record_replay()
+    test_model_usage_accounting()
+    test_lazy_config_and_model_cache()
+    test_lazy_command_imports()
+    test_readme_sections_incremental()
+    test_site_render_outputs()
+    test_tenants_run_all()
+    test_readme_diff_summary_and_lazy_logging()
+    test_answer_matcher()
+    test_issue_parser_formats()
+    test_issue_parser_benchmark_corpus()
+    test_webhook_server_scores_answer()
+    test_webhook_server_stops_on_sigterm()
     test_fallback_trivia_pool()
+    test_fallback_bank()
     test_fallback_facts_pool()
     test_end_to_end_workflow()
 
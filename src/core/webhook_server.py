@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Webhook Server - Scores trivia answers as soon as GitHub reports a new issue
+"""
+
+import copy
+import hashlib
+import hmac
+import json
+import queue
+import signal
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from core.config import *
+from core.issue_parser import AnswerMatcher
+from core.comment_templates import CommentTemplates
+from core import process_answers as pa
+import logging
+logging.basicConfig(level=logging.INFO, format='[%(levelname)s] %(message)s')
+
+TRIVIA_REFRESH_SECONDS = 60  # Reload trivia at most this often when an issue names an unknown date
+
+def verify_signature(secret, payload, signature_header):
+    """Check a GitHub X-Hub-Signature-256 header against the raw request body"""
+    if not secret or not signature_header or not signature_header.startswith('sha256='):
+        return False
+    expected = 'sha256=' + hmac.new(secret.encode(), payload, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature_header)
+
+class AnswerProcessor:
+    """
+    Queue of opened issues scored by a pool of worker threads.
+
+    Each event is scored incrementally through process_answers.score_issue against an in-memory
+    leaderboard whose row for the answering user is first refreshed from the database, so writes by
+    process-answers, rebuild-leaderboard or update-db are picked up. The user's row, the answer
+    event and a processed_issues journal entry are saved in one transaction before the issue is
+    closed, so an answer is never closed without its score. A separate writer thread exports the
+    database snapshot in batches.
+    """
+
+    def __init__(self, trivia_questions_by_date=None, leaderboard=None, workers=WEBHOOK_WORKERS,
+                 batch_size=WEBHOOK_BATCH_SIZE, flush_interval=WEBHOOK_FLUSH_INTERVAL):
+        self.leaderboard = pa.load_leaderboard() if leaderboard is None else leaderboard
+        self.trivia_questions_by_date = None
+        self.answer_matcher = None
+        self.comment_templates = None
+        self.trivia_loaded_at = 0
+        self._fixed_trivia = trivia_questions_by_date is not None
+        self._set_trivia(trivia_questions_by_date if self._fixed_trivia else pa.build_trivia_questions_by_date(pa.load_trivia_data()))
+        self.workers = workers
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.events = queue.Queue()
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()  # One flush at a time: flush() returns after the export in progress
+        self.flush_needed = threading.Condition()
+        self.pending = 0
+        self.handled = set()  # Issue numbers journaled by this process; GitHub may deliver an event twice
+        self.scored = 0
+        self.stopping = False
+        self.threads = []
+
+    def _set_trivia(self, trivia_questions_by_date):
+        self.trivia_questions_by_date = trivia_questions_by_date
+        self.answer_matcher = AnswerMatcher(trivia_questions_by_date)
+        self.comment_templates = CommentTemplates(trivia_questions_by_date)
+        self.trivia_loaded_at = time.monotonic()
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"webhook-worker-{i}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        self.writer = threading.Thread(target=self._write, name="webhook-writer", daemon=True)
+        self.writer.start()
+
+    def submit(self, issue):
+        self.events.put(issue)
+
+    def stop(self):
+        """Drain the queue, stop the workers and write any pending answers"""
+        self.events.join()
+        for _ in self.threads:
+            self.events.put(None)
+        for thread in self.threads:
+            thread.join()
+        with self.flush_needed:
+            self.stopping = True
+            self.flush_needed.notify()
+        self.writer.join()
+
+    def _refresh_user(self, username):
+        row = pa.load_leaderboard_users([username]).get(username)
+        if row is not None:
+            self.leaderboard[username] = row
+
+    def _score(self, issue, answer_events):
+        status, comment = pa.score_issue(issue, self.leaderboard, self.trivia_questions_by_date, self.answer_matcher,
+                                         answer_events, self.comment_templates)
+        if status == 'unknown_date' and not self._fixed_trivia and time.monotonic() - self.trivia_loaded_at > TRIVIA_REFRESH_SECONDS:
+            # A new day's trivia may have been generated since the server started
+            self._set_trivia(pa.build_trivia_questions_by_date(pa.load_trivia_data()))
+            status, comment = pa.score_issue(issue, self.leaderboard, self.trivia_questions_by_date, self.answer_matcher,
+                                             answer_events, self.comment_templates)
+        return status, comment
+
+    def handle(self, issue):
+        """
+        Score an opened issue, journal its result with the user's row and answer event, then close it.
+        Returns the score_issue status, or 'seen' for an issue that was journaled before.
+        """
+        issue_number = issue['number']
+        username = issue['user']['login']
+        with self.lock:
+            # A redelivered event, or an issue process-answers already scored, must not be commented on again
+            if issue_number in self.handled or pa.load_processed_issues([issue_number]):
+                self.handled.add(issue_number)
+                return 'seen'
+            self._refresh_user(username)
+            previous = copy.deepcopy(self.leaderboard.get(username))
+            answer_events = []
+            status, comment = self._score(issue, answer_events)
+            if comment is None:
+                return status
+            stats = self.leaderboard.get(username, {})
+            # Users that never answered correctly are pruned from the leaderboard, as process-answers does
+            changed_users = {username} if stats.get('total_answered', 0) and stats.get('total_correct', 0) else set()
+            try:
+                pa.record_issue_results([(issue_number, status, comment)], self.leaderboard, changed_users, answer_events)
+            except Exception:
+                # Left open and unjournaled, the issue is scored again by the next delivery or process-answers
+                if previous is None:
+                    self.leaderboard.pop(username, None)
+                else:
+                    self.leaderboard[username] = previous
+                raise
+            self.handled.add(issue_number)
+        if pa.close_issue(issue_number, comment):
+            pa.mark_issue_closed(issue_number)
+        return status
+
+    def _work(self):
+        while True:
+            issue = self.events.get()
+            try:
+                if issue is None:
+                    return
+                status = self.handle(issue)
+                if status in ('correct', 'incorrect'):
+                    logging.info("[webhook_server.py] [_work] Scored issue #%s from @%s: %s", issue['number'], issue['user']['login'], status)
+                    with self.flush_needed:
+                        self.pending += 1
+                        self.scored += 1
+                        if self.pending >= self.batch_size:
+                            self.flush_needed.notify()
+            except Exception as e:
+                logging.error("[webhook_server.py] [_work] Error processing issue #%s: %s", issue.get('number', '?') if issue else '?', e)
+            finally:
+                self.events.task_done()
+
+    def _write(self):
+        while True:
+            with self.flush_needed:
+                if not self.stopping and self.pending < self.batch_size:
+                    self.flush_needed.wait(timeout=self.flush_interval)
+                pending, self.pending = self.pending, 0
+                stopping = self.stopping
+            if pending:
+                self.flush(pending)
+            if stopping:
+                return
+
+    def flush(self, pending=None):
+        """Export the database snapshot; the answers scored since the last flush are already saved"""
+        with self.save_lock:
+            try:
+                pa.export_database()
+            except Exception as e:
+                logging.error("[webhook_server.py] [flush] Error exporting the database after %s answer(s), retrying on the next flush: %s", pending, e)
+                with self.flush_needed:
+                    self.pending += pending or 0
+                return
+            logging.info("[webhook_server.py] [flush] Exported the database after %s new answer(s)", pending)
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    server_version = "TriviaWebhooks/1.0"
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > WEBHOOK_MAX_BODY_BYTES:
+            self._reply(413, "payload too large")
+            return
+        payload = self.rfile.read(length)
+        if not verify_signature(self.server.secret, payload, self.headers.get('X-Hub-Signature-256')):
+            logging.warning("[webhook_server.py] [do_POST] Rejected webhook with invalid signature")
+            self._reply(401, "invalid signature")
+            return
+        event = self.headers.get('X-GitHub-Event')
+        if event == 'ping':
+            self._reply(200, "pong")
+            return
+        try:
+            data = json.loads(payload)
+        except ValueError:
+            self._reply(400, "invalid json")
+            return
+        if event != 'issues' or data.get('action') != 'opened' or not data.get('issue'):
+            self._reply(202, "ignored")
+            return
+        self.server.processor.submit(data['issue'])
+        self._reply(202, "queued")
+
+    def _reply(self, status, message):
+        body = json.dumps({"status": message}).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.debug("[webhook_server.py] [WebhookHandler] %s - %s", self.address_string(), format % args)
+
+def make_server(processor, host=WEBHOOK_HOST, port=WEBHOOK_PORT, secret=None):
+    """Create the HTTP server; port 0 picks a free port (see server.server_address)"""
+    secret = secret or GITHUB_WEBHOOK_SECRET
+    if not secret:
+        raise RuntimeError("GITHUB_WEBHOOK_SECRET environment variable is required to verify webhook signatures.")
+    server = ThreadingHTTPServer((host, port), WebhookHandler)
+    server.processor = processor
+    server.secret = secret
+    return server
+
+def serve_webhooks(host=WEBHOOK_HOST, port=WEBHOOK_PORT, workers=WEBHOOK_WORKERS,
+                   batch_size=WEBHOOK_BATCH_SIZE, flush_interval=WEBHOOK_FLUSH_INTERVAL):
+    """Run the webhook server until interrupted (Ctrl-C or SIGTERM), then drain the queue and save"""
+    processor = AnswerProcessor(workers=workers, batch_size=batch_size, flush_interval=flush_interval)
+    server = make_server(processor, host, port)
+    processor.start()
+    logging.info("[webhook_server.py] [serve_webhooks] Listening on %s:%s with %s worker(s)", host, server.server_address[1], workers)
+    def terminate(signum, frame):
+        raise KeyboardInterrupt
+    # systemd and docker stop the server with SIGTERM
+    previous_handler = signal.signal(signal.SIGTERM, terminate)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logging.info("[webhook_server.py] [serve_webhooks] Shutting down...")
+    finally:
+        server.server_close()
+        processor.stop()
+        signal.signal(signal.SIGTERM, previous_handler)
+        logging.info("[webhook_server.py] [serve_webhooks] Scored %s answer(s).", processor.scored)